@@ -23,3 +23,10 @@ data class AndroidSyncPayload(
     val device_name: String,
     val days: Map<String, List<AndroidEventPayload>>
 )
+
+@Serializable
+data class AndroidDeltaPayload(
+    val device_id: String,
+    val device_name: String,
+    val events: List<AndroidEventPayload>
+)
@@ -8,20 +8,26 @@ import androidx.work.WorkManager
 import androidx.work.WorkerParameters
 import com.sans.atracker.data.repository.EventRepository
 import com.sans.atracker.data.repository.SettingsRepository
+import com.sans.atracker.network.AndroidDeltaPayload
 import com.sans.atracker.network.AndroidEventPayload
-import com.sans.atracker.network.AndroidSyncPayload
 import dagger.assisted.Assisted
 import dagger.assisted.AssistedInject
 import io.ktor.client.HttpClient
+import io.ktor.client.request.header
 import io.ktor.client.request.post
 import io.ktor.client.request.setBody
 import io.ktor.client.statement.HttpResponse
 import io.ktor.http.ContentType
+import io.ktor.http.HttpHeaders
 import io.ktor.http.contentType
 import io.ktor.http.isSuccess
+import java.io.ByteArrayOutputStream
 import java.time.Instant
 import java.time.ZoneId
 import java.time.format.DateTimeFormatter
+import java.util.zip.GZIPOutputStream
+import kotlinx.serialization.encodeToString
+import kotlinx.serialization.json.Json
 
 @HiltWorker
 class SyncWorker @AssistedInject constructor(
@@ -62,33 +68,39 @@ class SyncWorker @AssistedInject constructor(
                 dayFormatter.format(Instant.ofEpochMilli(event.startTimestamp))
             }
 
-            val payloadDays = byDay.mapValues { (_, events) ->
-                events.map { e ->
-                    AndroidEventPayload(
-                        id = e.id,
-                        device_id = deviceId,
-                        timestamp = isoFormatter.format(Instant.ofEpochMilli(e.startTimestamp)),
-                        end_timestamp = isoFormatter.format(Instant.ofEpochMilli(e.endTimestamp)),
-                        package_name = e.packageName,
-                        app_label = e.appLabel,
-                        duration_secs = e.durationSecs,
-                        is_idle = e.isIdle,
-                        source_type = e.sourceType,
-                        domain = e.domain,
-                        page_title = e.pageTitle,
-                        browser_package = e.browserPackage
-                    )
-                }
+            // Only unsynced events are sent; the delta endpoint upserts them in
+            // one transaction and skips events ending at or before its mark.
+            val payloadEvents = unsynced.map { e ->
+                AndroidEventPayload(
+                    id = e.id,
+                    device_id = deviceId,
+                    timestamp = isoFormatter.format(Instant.ofEpochMilli(e.startTimestamp)),
+                    end_timestamp = isoFormatter.format(Instant.ofEpochMilli(e.endTimestamp)),
+                    package_name = e.packageName,
+                    app_label = e.appLabel,
+                    duration_secs = e.durationSecs,
+                    is_idle = e.isIdle,
+                    source_type = e.sourceType,
+                    domain = e.domain,
+                    page_title = e.pageTitle,
+                    browser_package = e.browserPackage
+                )
             }
 
-            val response: HttpResponse = httpClient.post("$baseUrl/api/sync/android") {
-                contentType(ContentType.Application.Json)
-                setBody(
-                    AndroidSyncPayload(
+            val body = gzip(
+                Json.encodeToString(
+                    AndroidDeltaPayload(
+                        device_id = deviceId,
                         device_name = android.os.Build.MODEL,
-                        days = payloadDays
+                        events = payloadEvents
                     )
-                )
+                ).toByteArray()
+            )
+
+            val response: HttpResponse = httpClient.post("$baseUrl/api/sync/android/delta") {
+                contentType(ContentType.Application.Json)
+                header(HttpHeaders.ContentEncoding, "gzip")
+                setBody(body)
             }
 
             if (response.status.isSuccess()) {
@@ -116,6 +128,12 @@ class SyncWorker @AssistedInject constructor(
         }
     }
 
+    private fun gzip(bytes: ByteArray): ByteArray {
+        val out = ByteArrayOutputStream()
+        GZIPOutputStream(out).use { it.write(bytes) }
+        return out.toByteArray()
+    }
+
     companion object {
         private const val SYNC_WORK_NAME = "atracker_auto_sync"
 
@@ -0,0 +1,78 @@
+"""Measure per-poll D-Bus latency of the GNOME watcher.
+
+Exports a fake org.atracker.WindowTracker service on the session bus and
+times one poll the old way (introspect + build proxy + call) against a call
+through the watcher's cached proxy. Run it on a throwaway bus:
+
+    dbus-run-session -- python benchmark_dbus.py
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+from dbus_next.aio import MessageBus
+from dbus_next.service import ServiceInterface, method
+
+from atracker.watcher import TRACKER_BUS_NAME, TRACKER_PATH, DBusProxyCache
+
+POLLS = 2000
+
+
+class FakeTracker(ServiceInterface):
+    def __init__(self):
+        super().__init__(TRACKER_BUS_NAME)
+
+    @method()
+    def GetActiveWindow(self) -> "s":
+        return json.dumps({"wm_class": "code", "title": "benchmark.py", "pid": 1})
+
+
+async def _time(poll) -> list[float]:
+    samples = []
+    for _ in range(POLLS):
+        t0 = time.perf_counter()
+        await poll()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def _report(name: str, samples: list[float]):
+    samples.sort()
+    print(
+        f"{name:<24} median {statistics.median(samples):8.1f} us   "
+        f"p95 {samples[int(len(samples) * 0.95)]:8.1f} us"
+    )
+
+
+async def main():
+    service_bus = await MessageBus().connect()
+    service_bus.export(TRACKER_PATH, FakeTracker())
+    await service_bus.request_name(TRACKER_BUS_NAME)
+
+    bus = await MessageBus().connect()
+
+    async def uncached():
+        introspection = await bus.introspect(TRACKER_BUS_NAME, TRACKER_PATH)
+        proxy = bus.get_proxy_object(TRACKER_BUS_NAME, TRACKER_PATH, introspection)
+        iface = proxy.get_interface(TRACKER_BUS_NAME)
+        return json.loads(await iface.call_get_active_window())
+
+    proxies = DBusProxyCache(bus)
+    await proxies.watch(TRACKER_BUS_NAME)
+
+    async def cached():
+        iface = await proxies.interface(TRACKER_BUS_NAME, TRACKER_PATH, TRACKER_BUS_NAME)
+        return json.loads(await iface.call_get_active_window())
+
+    print(f"{POLLS} GetActiveWindow polls per variant\n")
+    _report("introspect every poll", await _time(uncached))
+    _report("cached proxy", await _time(cached))
+
+    bus.disconnect()
+    service_bus.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
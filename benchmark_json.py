@@ -0,0 +1,75 @@
+"""Cost of encoding a large /api/events response.
+
+Builds a synthetic 10k-event day in a temporary database, then times the
+FastAPI default (jsonable_encoder + JSONResponse) against FastJSONResponse
+over row dicts and over the columnar {"columns", "rows"} shape, reporting
+milliseconds per response and body size.
+"""
+
+import asyncio
+import random
+import tempfile
+import timeit
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from atracker import db, fastjson
+from atracker.fastjson import FastJSONResponse, columnar
+
+EVENTS = 10_000
+
+
+def synthetic_day(day: date, device_id: str, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    apps = ["code", "firefox", "gnome-terminal", "slack", "nautilus", "obsidian"]
+    t = datetime.combine(day, datetime.min.time())
+    events = []
+    for _ in range(EVENTS):
+        secs = rng.randint(2, 8)
+        end = t + timedelta(seconds=secs)
+        app = rng.choice(apps)
+        events.append({
+            "id": str(uuid.uuid4()),
+            "device_id": device_id,
+            "timestamp": t.isoformat(),
+            "end_timestamp": end.isoformat(),
+            "wm_class": app,
+            "title": f"{app} — window {rng.randint(1, 500)}",
+            "duration_secs": secs,
+        })
+        t = end
+    return events
+
+
+def report(name: str, render, number: int = 10):
+    body = render()
+    elapsed = timeit.timeit(render, number=number) / number
+    print(f"{name:<28} {elapsed * 1000:8.2f} ms  {len(body) / 1024:8.1f} KiB")
+
+
+async def main():
+    tmp = Path(tempfile.mkdtemp())
+    db.DB_PATH = tmp / "bench.db"
+    db.DB_DIR = tmp
+    await db.init_db()
+
+    day = date.today() - timedelta(days=1)
+    await db.import_events(synthetic_day(day, db.get_device_id()))
+    events = await db.get_events(day)
+    columns, rows = await db.get_events_columns(day)
+    await db.close_db()
+
+    d = day.isoformat()
+    backend = "orjson" if fastjson.orjson is not None else "json (stdlib)"
+    print(f"{len(events)} events, encoder: {backend}\n")
+    report("jsonable_encoder + JSON", lambda: JSONResponse(jsonable_encoder({"date": d, "events": events})).body)
+    report("FastJSONResponse (rows)", lambda: FastJSONResponse({"date": d, "events": events}).body)
+    report("FastJSONResponse (columns)", lambda: FastJSONResponse({"date": d, **columnar(columns, rows)}).body)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Compare the old combined_events CTE with the combined_events view.
+
+Builds a synthetic year of desktop + Android data in a temporary database,
+then prints query plans and timings for timeline-style range reads.
+"""
+
+import asyncio
+import random
+import sqlite3
+import tempfile
+import timeit
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from atracker import db
+
+DAYS = 365
+DESKTOP_EVENTS_PER_DAY = 250
+ANDROID_EVENTS_PER_DAY = 150
+
+OLD_QUERY = """WITH combined_events AS (
+    SELECT device_id, timestamp, end_timestamp, wm_class, title, duration_secs, is_idle FROM events
+    UNION ALL
+    SELECT device_id, timestamp, end_timestamp, package_name as wm_class, CASE WHEN source_type = 'BROWSER_TAB' THEN COALESCE(NULLIF(page_title, ''), NULLIF(domain, ''), app_label) ELSE app_label END as title, duration_secs, is_idle FROM android_events
+)
+SELECT timestamp, end_timestamp, wm_class, title, duration_secs, is_idle, device_id
+FROM combined_events
+WHERE timestamp >= ? AND timestamp < ?
+  AND (? = 0 OR device_id IN (SELECT value FROM json_each(?)))
+ORDER BY timestamp"""
+
+NEW_QUERY = """SELECT timestamp, end_timestamp, wm_class, title, duration_secs, is_idle, device_id, ts_start
+FROM combined_events
+WHERE device_id IN (SELECT value FROM json_each(?))
+  AND ts_start >= ? AND ts_start < ?
+ORDER BY ts_start"""
+
+# The indexes the old query was written against (dropped by schema version 4)
+LEGACY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_android_events_timestamp ON android_events(timestamp);
+"""
+
+
+def generate(conn: sqlite3.Connection, first_day: date):
+    rng = random.Random(42)
+    apps = ["code", "firefox", "gnome-terminal", "slack", "nautilus", "obsidian"]
+    packages = ["com.android.chrome", "com.whatsapp", "com.spotify.music"]
+    desktop, android = [], []
+    for n in range(DAYS):
+        day = datetime.combine(first_day + timedelta(days=n), datetime.min.time())
+        t = day + timedelta(hours=8)
+        for _ in range(DESKTOP_EVENTS_PER_DAY):
+            secs = rng.randint(5, 240)
+            end = t + timedelta(seconds=secs)
+            desktop.append(
+                (str(uuid.uuid4()), "desktop", t.isoformat(), end.isoformat(),
+                 rng.choice(apps), f"Window {rng.randint(1, 50)}", 0, secs, 0,
+                 int(t.timestamp() * 1000), int(end.timestamp() * 1000))
+            )
+            t = end
+        t = day + timedelta(hours=7)
+        for _ in range(ANDROID_EVENTS_PER_DAY):
+            secs = rng.randint(5, 300)
+            end = t + timedelta(seconds=secs)
+            is_tab = rng.random() < 0.5
+            android.append(
+                (str(uuid.uuid4()), "android-1", t.isoformat(), end.isoformat(),
+                 rng.choice(packages), "App", secs, 0,
+                 "BROWSER_TAB" if is_tab else "APP",
+                 "example.com" if is_tab else "", f"Page {rng.randint(1, 30)}" if is_tab else "",
+                 int(t.timestamp() * 1000), int(end.timestamp() * 1000),
+                 f"Page {rng.randint(1, 30)}" if is_tab else "App")
+            )
+            t = end
+    conn.executemany(
+        "INSERT INTO events (id, device_id, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle, ts_start, ts_end) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        desktop,
+    )
+    conn.executemany(
+        "INSERT INTO android_events (id, device_id, timestamp, end_timestamp, package_name, app_label, duration_secs, is_idle, source_type, domain, page_title, ts_start, ts_end, title) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        android,
+    )
+    conn.commit()
+    return len(desktop), len(android)
+
+
+def main():
+    tmp = Path(tempfile.mkdtemp())
+    db.DB_PATH = tmp / "bench.db"
+    db.DB_DIR = tmp
+    asyncio.run(db.init_db())
+
+    first_day = date.today() - timedelta(days=DAYS)
+    conn = sqlite3.connect(str(db.DB_PATH))
+    n_desktop, n_android = generate(conn, first_day)
+    conn.executescript(LEGACY_INDEXES)
+    conn.execute("ANALYZE")
+    print(f"Synthetic data: {n_desktop} desktop + {n_android} Android events over {DAYS} days\n")
+
+    devices = '["desktop", "android-1"]'
+    for span in (1, 7, 30):
+        start = first_day + timedelta(days=DAYS // 2)
+        end = start + timedelta(days=span)
+        old_params = (f"{start.isoformat()}T00:00:00", f"{end.isoformat()}T00:00:00", 0, "[]")
+        new_params = (devices, *db._range_ms(start, end - timedelta(days=1)))
+
+        print(f"=== {span}-day range ===")
+        for name, query, params in (("old", OLD_QUERY, old_params), ("new", NEW_QUERY, new_params)):
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+            rows = len(conn.execute(query, params).fetchall())
+            elapsed = timeit.timeit(lambda: conn.execute(query, params).fetchall(), number=20) / 20
+            print(f"{name}: {rows} rows, {elapsed * 1000:.2f} ms/query")
+            for step in plan:
+                print(f"    {step}")
+        print()
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import re
 import time
 import timeit
 
+from atracker.classify import Classifier
+
 
 def match_uncompiled(categories, wm_class, title):
     wm_lower = wm_class.lower()
@@ -136,6 +138,19 @@ def run_precompiled():
     match_precompiled(cats_precompiled, "wm99", "title99")
 
 
+classifier = Classifier(cats)
+
+
+def run_combined():
+    classifier._match("wm99", "title99")
+
+
+def run_combined_memoized():
+    classifier.match("wm99", "title99")
+
+
 print("Uncompiled:", timeit.timeit(run_uncompiled, number=10000))
 print("Compiled cache:", timeit.timeit(run_compiled_cache, number=10000))
 print("Precompiled dict:", timeit.timeit(run_precompiled, number=10000))
+print("Combined regex:", timeit.timeit(run_combined, number=10000))
+print("Combined + memo:", timeit.timeit(run_combined_memoized, number=10000))
@@ -0,0 +1,57 @@
+"""Throughput of the shared tracking engine on a replayed timeline.
+
+Feeds TrackerCore a synthetic day of window switches (with idle breaks)
+through ReplaySource, against a temporary database, and reports switches
+processed per second and the rows written.
+"""
+
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from atracker import db
+from atracker.tracker import Change, ReplaySource, TrackerCore
+
+SWITCHES = 50_000
+
+
+def synthetic_changes(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    apps = ["code", "firefox", "gnome-terminal", "slack", "nautilus", "obsidian"]
+    t = datetime(2026, 1, 5, 8, 0, 0)
+    for i in range(n):
+        t += timedelta(seconds=rng.randint(2, 120))
+        if i % 500 == 499:
+            yield Change(t, "idle")
+            t += timedelta(minutes=rng.randint(5, 60))
+            yield Change(t, "active", {"wm_class": "code", "title": "back", "pid": 1})
+            continue
+        app = rng.choice(apps)
+        yield Change(t, "window", {"wm_class": app, "title": f"{app} {rng.randint(1, 40)}", "pid": 1})
+    yield Change(t + timedelta(seconds=30), "idle")
+
+
+async def main():
+    tmp = Path(tempfile.mkdtemp())
+    db.DB_PATH = tmp / "bench.db"
+    db.DB_DIR = tmp
+    await db.init_db()
+
+    core = TrackerCore(ReplaySource(synthetic_changes(SWITCHES)), poll_interval=5)
+    t0 = time.perf_counter()
+    await core.start(handle_signals=False)
+    elapsed = time.perf_counter() - t0
+
+    await db.close_db()
+
+    rows = sqlite3.connect(str(db.DB_PATH)).execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    print(f"{SWITCHES} replayed switches in {elapsed:.2f}s "
+          f"({SWITCHES / elapsed:,.0f} switches/s), {rows} events written")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -12,6 +12,12 @@ let ws = null;
 let reconnectTimer = null;
 let datePicker = null;
 
+// Today's timeline, kept up to date from WebSocket deltas
+let today = null;  // { date, seq, deviceId, timeline }
+let deltaChain = Promise.resolve();
+let summaryTimer = null;
+const SUMMARY_REFRESH_MS = 15000;
+
 // ============ Init ============
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -170,9 +176,14 @@ function loadView(view) {
 
 // ============ Today View ============
 
+function isTodaySelected() {
+    const filterDate = document.getElementById('today-date-filter')?.value;
+    return !filterDate || filterDate === new Date().toISOString().split('T')[0];
+}
+
 async function loadToday() {
     const filterDate = document.getElementById('today-date-filter')?.value;
-    const isToday = !filterDate || filterDate === new Date().toISOString().split('T')[0];
+    const isToday = isTodaySelected();
     const dateParam = filterDate ? `date=${filterDate}` : '';
     const devicesParam = selectedDevices.length > 0 ? `devices=${selectedDevices.join(',')}` : '';
 
@@ -187,6 +198,12 @@ async function loadToday() {
         ]);
 
         updateDaemonStatus(true);
+        today = isToday && timelineRes.seq !== undefined ? {
+            date: timelineRes.date,
+            seq: timelineRes.seq,
+            deviceId: timelineRes.device_id,
+            timeline: timelineRes.timeline,
+        } : null;
         renderSummary(summaryRes.summary);
         renderTimeline(timelineRes.timeline);
         updateTotalTracked(summaryRes.summary);
@@ -960,21 +977,77 @@ function handleWsMessage(data) {
 
     if (data.type === 'activity') {
         // Update "Now Tracking" immediately
-        if (currentView === 'today') {
-            loadToday(); // Refresh all summaries/timeline for the change
-        }
+        if (currentView === 'today') queueTimelineDelta(data);
     } else if (data.type === 'idle') {
         notify('Idle Detected', 'You have been marked as idle.');
-        if (currentView === 'today') loadToday();
+        if (currentView === 'today') queueTimelineDelta(data);
     } else if (data.type === 'resume') {
         notify('Active Again', 'Welcome back! Activity tracking resumed.');
-        if (currentView === 'today') loadToday();
+        if (currentView === 'today') queueTimelineDelta(data);
     } else if (data.type === 'pause_state') {
         updatePauseUI(data.is_paused);
         if (currentView === 'today') loadToday();
     }
 }
 
+function queueTimelineDelta(delta) {
+    // One at a time, so deltas apply in order
+    deltaChain = deltaChain.then(() => applyTimelineDelta(delta)).catch(err => {
+        console.error('Failed to apply timeline delta:', err);
+        return loadToday();
+    });
+}
+
+// Patch today's timeline with the blocks recorded since our seq and the new
+// live row, instead of refetching the whole day on every switch.
+async function applyTimelineDelta(delta) {
+    if (!today) {
+        // A past day is shown: live changes don't affect it
+        if (isTodaySelected()) return loadToday();
+        return;
+    }
+    if (delta.date !== today.date) return loadToday();
+    if (!delta.blocks || delta.since !== today.seq) {
+        // Missed a message (coalesced or reconnected): fetch what we lack
+        delta = await fetchAPI(`/api/timeline?since=${today.seq}`);
+        if (!delta.blocks || delta.date !== today.date) return loadToday();
+    }
+
+    const localShown = selectedDevices.length === 0 || selectedDevices.includes(delta.device_id);
+    if (localShown) {
+        const stored = today.timeline.filter(b => !b.live);
+        const seen = new Set(stored.map(b => `${b.device_id}|${b.timestamp}`));
+        for (const block of delta.blocks) {
+            if (!seen.has(`${block.device_id}|${block.timestamp}`)) stored.push(block);
+        }
+        stored.sort((a, b) => a.ts_start - b.ts_start);
+        if (delta.current) stored.push(delta.current);
+        today.timeline = stored;
+        renderTimeline(today.timeline);
+        updateNowTracking(today.timeline);
+    }
+    today.seq = delta.seq;
+    scheduleSummaryRefresh();
+}
+
+// Totals and goals only need to follow along, not on every switch
+function scheduleSummaryRefresh() {
+    if (summaryTimer) return;
+    summaryTimer = setTimeout(async () => {
+        summaryTimer = null;
+        if (currentView !== 'today' || !today) return;
+        const devicesParam = selectedDevices.length > 0 ? `?devices=${selectedDevices.join(',')}` : '';
+        try {
+            const summaryRes = await fetchAPI(`/api/summary${devicesParam}`);
+            renderSummary(summaryRes.summary);
+            updateTotalTracked(summaryRes.summary);
+            renderGoals(summaryRes.summary);
+        } catch (err) {
+            console.error('Failed to refresh summary:', err);
+        }
+    }, SUMMARY_REFRESH_MS);
+}
+
 function checkNotificationPermission() {
     if (!("Notification" in window)) return;
 
@@ -18,6 +18,8 @@ const DBUS_INTERFACE = `
 export default class AtrackerExtension extends Extension {
     _dbusId = null;
     _focusSignalId = null;
+    _titleWindow = null;
+    _titleSignalId = null;
 
     enable() {
         this._dbusImpl = Gio.DBusExportedObject.wrapJSObject(DBUS_INTERFACE, this);
@@ -31,12 +33,10 @@ export default class AtrackerExtension extends Extension {
         );
 
         this._focusSignalId = global.display.connect('notify::focus-window', () => {
-            const json = this._getActiveWindowJson();
-            this._dbusImpl.emit_signal(
-                'ActiveWindowChanged',
-                new GLib.Variant('(s)', [json]),
-            );
+            this._watchFocusedTitle();
+            this._emitActiveWindowChanged();
         });
+        this._watchFocusedTitle();
 
         console.log('[atracker] Extension enabled');
     }
@@ -46,6 +46,7 @@ export default class AtrackerExtension extends Extension {
             global.display.disconnect(this._focusSignalId);
             this._focusSignalId = null;
         }
+        this._unwatchTitle();
 
         if (this._dbusImpl) {
             this._dbusImpl.unexport();
@@ -60,6 +61,39 @@ export default class AtrackerExtension extends Extension {
         console.log('[atracker] Extension disabled');
     }
 
+    _emitActiveWindowChanged() {
+        const json = this._getActiveWindowJson();
+        this._dbusImpl.emit_signal(
+            'ActiveWindowChanged',
+            new GLib.Variant('(s)', [json]),
+        );
+    }
+
+    // Title changes within the focused window (e.g. switching browser tabs)
+    // are reported as window changes too.
+    _watchFocusedTitle() {
+        this._unwatchTitle();
+        const win = global.display.focus_window;
+        if (win) {
+            this._titleWindow = win;
+            this._titleSignalId = win.connect('notify::title', () => {
+                this._emitActiveWindowChanged();
+            });
+        }
+    }
+
+    _unwatchTitle() {
+        if (this._titleWindow && this._titleSignalId) {
+            try {
+                this._titleWindow.disconnect(this._titleSignalId);
+            } catch (e) {
+                // The window may already be gone
+            }
+        }
+        this._titleWindow = null;
+        this._titleSignalId = null;
+    }
+
     _getActiveWindowJson() {
         const win = global.display.focus_window;
         if (!win) {
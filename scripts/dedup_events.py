@@ -9,6 +9,7 @@ from datetime import datetime
 from pathlib import Path
 
 from atracker.config import config
+from atracker.lock import acquire_watcher_lock, release_watcher_lock
 
 
 def _parse_ts(ts: str) -> datetime:
@@ -102,12 +103,20 @@ def main() -> None:
     )
 
     args = parser.parse_args()
-    deleted = dedup_events(
-        db_path=args.db,
-        max_end_delta_secs=args.max_end_delta_secs,
-        max_duration_delta_secs=args.max_duration_delta_secs,
-        dry_run=args.dry_run,
-    )
+    # A running daemon would keep serving cached responses for the old rows
+    locked = not args.dry_run and args.db.resolve() == config.db_path.resolve()
+    if locked and not acquire_watcher_lock():
+        raise SystemExit("Error: stop the running atracker daemon before deduplicating.")
+    try:
+        deleted = dedup_events(
+            db_path=args.db,
+            max_end_delta_secs=args.max_end_delta_secs,
+            max_duration_delta_secs=args.max_duration_delta_secs,
+            dry_run=args.dry_run,
+        )
+    finally:
+        if locked:
+            release_watcher_lock()
     action = "Would delete" if args.dry_run else "Deleted"
     print(f"{action} {deleted} duplicate event(s).")
 
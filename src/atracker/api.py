@@ -1,22 +1,31 @@
 """FastAPI REST API and static file server for the dashboard."""
 
-import re
 import csv
 import io
+import gzip
+import json
+import shutil
+import tempfile
+import zipfile
 from datetime import date, datetime
 from pathlib import Path
 
-from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
 
 import asyncio
 import logging
 
-from atracker import db
+from atracker import db, fastjson
+from atracker.broadcast import Broadcaster
+from atracker.cache import ResponseCache, etag_matches
+from atracker.classify import UNCATEGORIZED, validate_filter_rule
+from atracker.compression import CompressionMiddleware, PayloadMetrics, PrecompressedStaticFiles
 from atracker.config import config
+from atracker.fastjson import FastJSONResponse, columnar
 
 DASHBOARD_DIR = Path(__file__).parent.parent.parent / "dashboard"
 
@@ -66,6 +75,20 @@ class AndroidEvent(BaseModel):
     browser_package: str = ""
 
 
+class AndroidDeltaEvent(AndroidEvent):
+    # The device is given once per delta payload
+    device_id: str = ""
+    domain: str | None = ""
+    page_title: str | None = ""
+    browser_package: str | None = ""
+
+
+class AndroidDeltaPayload(BaseModel):
+    device_id: str
+    device_name: str = ""
+    events: list[AndroidDeltaEvent]
+
+
 class ManualEventCreate(BaseModel):
     start_time: str
     end_time: str
@@ -81,46 +104,22 @@ class AndroidSyncPayload(BaseModel):
 
 
 # --- Real-Time State ---
-_ws_clients: list[WebSocket] = []
 api_loop: asyncio.AbstractEventLoop | None = None
 logger = logging.getLogger("atracker.api")
 
+manager = Broadcaster()
+_responses = ResponseCache()
 
-class ConnectionManager:
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        _ws_clients.append(websocket)
-        logger.debug(f"WS client connected. Total: {len(_ws_clients)}")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in _ws_clients:
-            _ws_clients.remove(websocket)
-            logger.debug(f"WS client disconnected. Total: {len(_ws_clients)}")
-
-    async def broadcast(self, message: dict):
-        if not _ws_clients:
-            return
-
-        # Create a list of tasks for sending messages
-        disconnected = []
-        for ws in _ws_clients:
-            try:
-                await ws.send_json(message)
-            except Exception:
-                disconnected.append(ws)
 
-        # Cleanup any stale connections
-        for ws in disconnected:
-            self.disconnect(ws)
-
-
-manager = ConnectionManager()
+def live_updates_enabled() -> bool:
+    """Whether the API server is up to receive broadcasts."""
+    return api_loop is not None and api_loop.is_running()
 
 
 def broadcast_event(event_data: dict):
-    """Synchronous bridge to broadcast to WS clients from other threads."""
+    """Thread-safe bridge to broadcast to WS clients from other threads."""
     if api_loop and api_loop.is_running():
-        asyncio.run_coroutine_threadsafe(manager.broadcast(event_data), api_loop)
+        api_loop.call_soon_threadsafe(manager.publish, event_data)
 
 
 app = FastAPI(title="atracker", version="0.1.0")
@@ -132,6 +131,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+payloads = PayloadMetrics(config.payload_budgets)
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=config.compression_encodings,
+    min_size=config.compression_min_size,
+    metrics=payloads,
+)
+
 
 async def prune_loop():
     """Background task to periodically prune old events."""
@@ -155,6 +162,14 @@ async def startup():
     api_loop = asyncio.get_running_loop()
     await db.init_db()
     asyncio.create_task(prune_loop())
+    if dashboard_files is not None:
+        await asyncio.to_thread(dashboard_files.precompress)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    manager.close()
+    await db.close_db(all_loops=False)
 
 
 @app.websocket("/ws")
@@ -165,9 +180,10 @@ async def websocket_endpoint(websocket: WebSocket):
             # Keep connection alive
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
+    finally:
         manager.disconnect(websocket)
 
 
@@ -178,83 +194,104 @@ async def status():
         "status": "running",
         "timestamp": datetime.now().isoformat(),
         "db_path": str(db.DB_PATH),
+        "writer": db.get_event_queue().stats(),
+        "websocket": manager.stats(),
+        "response_cache": _responses.stats(),
+        "payloads": payloads.stats(),
     }
 
 
+@app.get("/api/current")
+async def current(since: int = Query(None)):
+    """What the watcher is tracking now; just the seq if unchanged since `since`."""
+    curr = db.get_current_state()
+    if since is not None and since == curr.seq:
+        return {"seq": curr.seq, "changed": False}
+    if not curr:
+        return {"seq": curr.seq, "changed": True, "current": None}
+    live = curr.as_dict()
+    live["duration_secs"] = curr.duration()
+    return {"seq": curr.seq, "changed": True, "current": live}
+
+
 @app.get("/api/events")
 async def events(
-    target_date: str = Query(None, alias="date"), devices: str = Query(None)
+    target_date: str = Query(None, alias="date"),
+    devices: str = Query(None),
+    shape: str = Query("rows"),
 ):
     """Get raw events for a date (defaults to today)."""
+    if shape not in SHAPES:
+        return _shape_error()
     d = _parse_date(target_date)
     device_ids = devices.split(",") if devices else None
-    rows = await db.get_events(d, device_ids=device_ids)
-    return {"date": d.isoformat(), "events": rows}
+    columns, rows = await db.get_events_columns(d, device_ids=device_ids)
+    if shape == "columns":
+        return FastJSONResponse({"date": d.isoformat(), **columnar(columns, rows)})
+    return FastJSONResponse(
+        {"date": d.isoformat(), "events": [dict(zip(columns, r)) for r in rows]}
+    )
 
 
 @app.get("/api/summary")
 async def summary(
-    target_date: str = Query(None, alias="date"), devices: str = Query(None)
+    request: Request,
+    target_date: str = Query(None, alias="date"),
+    devices: str = Query(None),
 ):
     """Get per-app usage summary for a date."""
     d = _parse_date(target_date)
     device_ids = devices.split(",") if devices else None
+    return await _cached(
+        request, "summary", d, d, device_ids, lambda: _summary(d, device_ids)
+    )
+
+
+async def _summary(d: date, device_ids: list[str] | None) -> dict:
     rows = await db.get_summary(d, device_ids=device_ids)
 
     # Only append local "Now Tracking" if local device is in device_ids or no filter
     local_id = db.get_device_id()
     if d == date.today() and (not device_ids or local_id in device_ids):
         curr = db.get_current_state()
-        if (
-            curr
-            and not curr.get("is_idle")
-            and curr.get("wm_class")
-            and curr.get("wm_class") != "__idle__"
-        ):
-            try:
-                curr_start = datetime.fromisoformat(curr["timestamp"])
-                duration = (datetime.now() - curr_start).total_seconds()
-
-                found = False
-                for r in rows:
-                    if r["wm_class"] == curr["wm_class"] and r.get(
-                        "title", ""
-                    ) == curr.get("title", ""):
-                        r["total_secs"] += duration
-                        r["event_count"] += 1
-                        r["last_seen"] = datetime.now().isoformat()
-                        found = True
-                        break
-
-                if not found:
-                    rows.append(
-                        {
-                            "wm_class": curr["wm_class"],
-                            "title": curr.get("title", ""),
-                            "total_secs": duration,
-                            "event_count": 1,
-                            "first_seen": curr["timestamp"],
-                            "last_seen": datetime.now().isoformat(),
-                        }
-                    )
-
-                rows.sort(key=lambda x: x["total_secs"], reverse=True)
-            except Exception as e:
-                logger.error(f"Error appending current state to summary: {e}")
-
-    categories = await _get_matchable_categories()
+        if curr and not curr.is_idle and curr.wm_class != "__paused__":
+            duration = curr.duration()
+            now_iso = datetime.now().isoformat()
+            row = next(
+                (
+                    r for r in rows
+                    if r["wm_class"] == curr.wm_class and r.get("title", "") == curr.title
+                ),
+                None,
+            )
+            if row is not None:
+                row["total_secs"] += duration
+                row["event_count"] += 1
+                row["last_seen"] = now_iso
+            else:
+                category = await _live_category(curr)
+                rows.append(
+                    {
+                        "wm_class": curr.wm_class,
+                        "title": curr.title,
+                        "category_id": category["id"] or "",
+                        "category_name": category["name"],
+                        "color": category.get("color", "#64748b"),
+                        "total_secs": duration,
+                        "event_count": 1,
+                        "first_seen": curr.timestamp,
+                        "last_seen": now_iso,
+                    }
+                )
+            rows.sort(key=lambda x: x["total_secs"], reverse=True)
+
     min_secs = float(await db.get_setting("min_app_usage_secs", "120"))
 
+    # Category name/color come from the stored category_id
     filtered_rows = []
-    # Enrich with category info
     for row in rows:
         if row["total_secs"] < min_secs:
             continue
-        matched_cat = _get_matched_category(
-            row["wm_class"], row.get("title", ""), categories
-        )
-        row["category_name"] = matched_cat["name"]
-        row["color"] = matched_cat.get("color", "#64748b")
         row["total_formatted"] = _format_duration(row["total_secs"])
         filtered_rows.append(row)
     return {"date": d.isoformat(), "summary": filtered_rows}
@@ -262,34 +299,91 @@ async def summary(
 
 @app.get("/api/timeline")
 async def timeline(
-    target_date: str = Query(None, alias="date"), devices: str = Query(None)
+    request: Request,
+    target_date: str = Query(None, alias="date"),
+    devices: str = Query(None),
+    since: int = Query(None),
+    shape: str = Query("rows"),
 ):
-    """Get timeline blocks for a date."""
+    """Get timeline blocks for a date.
+
+    For today, `since` (the `seq` of an earlier response or WebSocket
+    message) returns only the blocks recorded after it.
+    """
+    if shape not in SHAPES:
+        return _shape_error()
     d = _parse_date(target_date)
     device_ids = devices.split(",") if devices else None
-    rows = await db.get_timeline(d, device_ids=device_ids)
+    if since is not None and d == date.today():
+        return FastJSONResponse(await timeline_delta(since))
+    return await _cached(
+        request, f"timeline:{shape}", d, d, device_ids,
+        lambda: _timeline(d, device_ids, shape),
+    )
+
+
+async def _timeline(d: date, device_ids: list[str] | None, shape: str = "rows") -> dict:
+    # Read first: blocks logged while the query runs come again in a delta
+    seq = db.timeline_seq()
+    columns, rows = await db.get_timeline_columns(d, d, device_ids=device_ids)
+
+    classifier = await db.get_classifier()
+    colors = {c["id"]: c["color"] for c in classifier.categories}
+    category = columns.index("category_id")
+    columns.append("color")
+    rows = [(*r, colors.get(r[category], "#64748b")) for r in rows]
+
+    result = {"date": d.isoformat()}
+    if shape == "columns":
+        result.update(columnar(columns, rows))
+    else:
+        result["timeline"] = [dict(zip(columns, r)) for r in rows]
+    if d != date.today():
+        return result
 
     # Only append local current state if local device is in device_ids or no filter
     local_id = db.get_device_id()
-    if d == date.today() and (not device_ids or local_id in device_ids):
-        curr = db.get_current_state()
-        if curr:
-            try:
-                curr_start = datetime.fromisoformat(curr["timestamp"])
-                duration = (datetime.now() - curr_start).total_seconds()
-                curr_event = dict(curr)
-                curr_event["duration_secs"] = duration
-                curr_event["end_timestamp"] = datetime.now().isoformat()
-                rows.append(curr_event)
-            except Exception as e:
-                logger.error(f"Error appending current state to timeline: {e}")
-
-    categories = await _get_matchable_categories()
-    for row in rows:
-        row["color"] = _get_matched_category(
-            row["wm_class"], row.get("title", ""), categories
-        ).get("color", "#64748b")
-    return {"date": d.isoformat(), "timeline": rows}
+    result.update(seq=seq, device_id=local_id)
+    if not device_ids or local_id in device_ids:
+        live = await live_row(db.get_current_state())
+        if shape == "columns":
+            result["current"] = live
+        elif live is not None:
+            result["timeline"].append(live)
+    return result
+
+
+async def timeline_delta(since: int) -> dict:
+    """Today's local blocks recorded after `since`, plus the live row.
+
+    `blocks` is absent when the client must reload the full timeline.
+    """
+    seq, blocks = db.timeline_since(since)
+    delta = {
+        "date": date.today().isoformat(),
+        "since": since,
+        "seq": seq,
+        "device_id": db.get_device_id(),
+        "current": await live_row(db.get_current_state()),
+    }
+    if blocks is not None:
+        delta["blocks"] = blocks
+    return delta
+
+
+async def live_row(curr: db.CurrentState) -> dict | None:
+    """The live event as a timeline row (marked "live"), None if nothing is tracked."""
+    if not curr:
+        return None
+    category = await _live_category(curr)
+    row = curr.as_dict()
+    row["device_id"] = db.get_device_id()
+    row["category_id"] = category["id"] or ""
+    row["color"] = category.get("color", "#64748b")
+    row["duration_secs"] = curr.duration()
+    row["end_timestamp"] = datetime.now().isoformat()
+    row["live"] = True
+    return row
 
 
 @app.get("/api/history")
@@ -305,27 +399,31 @@ async def history(days: int = Query(7), devices: str = Query(None)):
 
 @app.get("/api/range/summary")
 async def range_summary(
-    start: str = Query(...), end: str = Query(...), devices: str = Query(None)
+    request: Request,
+    start: str = Query(...),
+    end: str = Query(...),
+    devices: str = Query(None),
 ):
     """Get per-app usage summary for a date range."""
     s = _parse_date(start)
     e = _parse_date(end)
     device_ids = devices.split(",") if devices else None
+    return await _cached(
+        request, "range_summary", s, e, device_ids,
+        lambda: _range_summary(s, e, device_ids),
+    )
+
+
+async def _range_summary(s: date, e: date, device_ids: list[str] | None) -> dict:
     rows = await db.get_summary_range(s, e, device_ids=device_ids)
 
     # We don't append "Now Tracking" for ranges as it's usually historical
-    categories = await _get_matchable_categories()
     min_secs = float(await db.get_setting("min_app_usage_secs", "120"))
 
     filtered_rows = []
     for row in rows:
         if row["total_secs"] < min_secs:
             continue
-        matched_cat = _get_matched_category(
-            row["wm_class"], row.get("title", ""), categories
-        )
-        row["category_name"] = matched_cat["name"]
-        row["color"] = matched_cat.get("color", "#64748b")
         row["total_formatted"] = _format_duration(row["total_secs"])
         filtered_rows.append(row)
     return {"start": s.isoformat(), "end": e.isoformat(), "summary": filtered_rows}
@@ -333,12 +431,22 @@ async def range_summary(
 
 @app.get("/api/range/history")
 async def range_history(
-    start: str = Query(...), end: str = Query(...), devices: str = Query(None)
+    request: Request,
+    start: str = Query(...),
+    end: str = Query(...),
+    devices: str = Query(None),
 ):
     """Get daily totals for a date range."""
     s = _parse_date(start)
     e = _parse_date(end)
     device_ids = devices.split(",") if devices else None
+    return await _cached(
+        request, "range_history", s, e, device_ids,
+        lambda: _range_history(s, e, device_ids),
+    )
+
+
+async def _range_history(s: date, e: date, device_ids: list[str] | None) -> dict:
     rows = await db.get_daily_totals_range(s, e, device_ids=device_ids)
     for row in rows:
         row["active_formatted"] = _format_duration(row["active_secs"])
@@ -346,52 +454,182 @@ async def range_history(
     return {"start": s.isoformat(), "end": e.isoformat(), "history": rows}
 
 
-@app.get("/api/export")
-async def export_data(
-    start: str = Query(...), end: str = Query(...), format: str = Query("csv")
+TIMELINE_BUCKETS = {"5m": 300, "15m": 900, "1h": 3600}
+BUCKET_COLUMNS = [
+    "start", "ts_start", "active_secs", "idle_secs", "app", "category_id", "categories",
+]
+
+
+@app.get("/api/range/timeline")
+async def range_timeline(
+    request: Request,
+    start: str = Query(...),
+    end: str = Query(...),
+    bucket: str = Query("15m"),
+    devices: str = Query(None),
+    shape: str = Query("rows"),
 ):
-    """Export raw events for a date range."""
+    """Get the timeline of a date range aggregated into fixed-size buckets."""
+    if bucket not in TIMELINE_BUCKETS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"bucket must be one of: {', '.join(TIMELINE_BUCKETS)}."},
+        )
+    if shape not in SHAPES:
+        return _shape_error()
     s = _parse_date(start)
     e = _parse_date(end)
+    device_ids = devices.split(",") if devices else None
+    return await _cached(
+        request, f"range_timeline:{bucket}:{shape}", s, e, device_ids,
+        lambda: _range_timeline(s, e, bucket, device_ids, shape),
+    )
 
-    # Get timeline blocks (which are merged/cleaner events)
-    rows = await db.get_timeline_range(s, e)
 
-    if format == "json":
-        return {"start": s.isoformat(), "end": e.isoformat(), "events": rows}
+async def _range_timeline(
+    s: date, e: date, bucket: str, device_ids: list[str] | None, shape: str
+) -> dict:
+    buckets = await db.get_timeline_buckets(s, e, TIMELINE_BUCKETS[bucket], device_ids=device_ids)
 
-    # CSV format
-    output = io.StringIO()
+    # Legend for the category ids the buckets use
+    classifier = await db.get_classifier()
+    used = {c for b in buckets for c in b["categories"]}
+    categories = {
+        c["id"]: {"name": c["name"], "color": c["color"]}
+        for c in classifier.categories
+        if c.get("id") in used
+    }
+    if "" in used:
+        categories[""] = {"name": UNCATEGORIZED["name"], "color": UNCATEGORIZED["color"]}
+
+    result = {
+        "start": s.isoformat(),
+        "end": e.isoformat(),
+        "bucket": bucket,
+        "bucket_secs": TIMELINE_BUCKETS[bucket],
+        "categories": categories,
+    }
+    if shape == "columns":
+        result.update(columnar(BUCKET_COLUMNS, [[b[c] for c in BUCKET_COLUMNS] for b in buckets]))
+    else:
+        result["buckets"] = buckets
+    return result
+
+
+EXPORT_PAGE_SIZE = 1000
+EXPORT_CSV_FIELDS = [
+    "timestamp",
+    "end_timestamp",
+    "wm_class",
+    "title",
+    "duration_secs",
+    "is_idle",
+]
+
+
+async def _export_csv_chunks(pages):
+    buffer = io.StringIO()
     writer = csv.DictWriter(
-        output,
-        fieldnames=[
-            "timestamp",
-            "end_timestamp",
-            "wm_class",
-            "title",
-            "duration_secs",
-            "is_idle",
-        ],
+        buffer, fieldnames=EXPORT_CSV_FIELDS, extrasaction="ignore"
     )
     writer.writeheader()
-    for r in rows:
-        writer.writerow(
-            {
-                "timestamp": r["timestamp"],
-                "end_timestamp": r["end_timestamp"],
-                "wm_class": r["wm_class"],
-                "title": r["title"],
-                "duration_secs": r["duration_secs"],
-                "is_idle": r["is_idle"],
-            }
+    async for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def _export_ndjson_chunks(pages):
+    async for page in pages:
+        yield "".join(fastjson.dumps(r).decode() + "\n" for r in page)
+
+
+async def _export_json_chunks(pages, s: date, e: date):
+    # Same document as before ({"start", "end", "events": [...]}), written
+    # one page at a time.
+    yield f'{{"start": "{s.isoformat()}", "end": "{e.isoformat()}", "events": ['
+    first = True
+    async for page in pages:
+        chunk = ", ".join(fastjson.dumps(r).decode() for r in page)
+        yield chunk if first else ", " + chunk
+        first = False
+    yield "]}"
+
+
+def _zip_files(archive: Path, root: Path, files: list[Path]):
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:
+        for f in files:
+            zf.write(f, f.relative_to(root).as_posix())
+
+
+async def _export_parquet_zip(s: date, e: date, partition: str):
+    # Parquet is already compressed, so the partition tree is zipped stored.
+    from atracker import columnar
+
+    if partition not in columnar.PARTITIONS:
+        return JSONResponse(
+            status_code=400, content={"error": "partition must be 'day' or 'month'."}
+        )
+
+    tmp = Path(tempfile.mkdtemp(prefix="atracker-export-"))
+    try:
+        try:
+            files = await columnar.export_parquet(tmp / "data", s, e, partition=partition)
+        except RuntimeError as err:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return JSONResponse(status_code=501, content={"error": str(err)})
+
+        archive = tmp / "export.zip"
+        await asyncio.to_thread(_zip_files, archive, tmp / "data", files)
+
+        return FileResponse(
+            archive,
+            media_type="application/zip",
+            filename=f"atracker_export_{s.isoformat()}_{e.isoformat()}_parquet.zip",
+            background=BackgroundTask(shutil.rmtree, tmp, ignore_errors=True),
+        )
+    except BaseException:
+        # Partly written files (a full disk, a database error) go too
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+@app.get("/api/export")
+async def export_data(
+    start: str = Query(...),
+    end: str = Query(...),
+    format: str = Query("csv"),
+    partition: str = Query("day"),
+):
+    """Stream raw events for a date range as CSV, NDJSON, JSON or Parquet."""
+    s = _parse_date(start)
+    e = _parse_date(end)
+
+    if format == "parquet":
+        return await _export_parquet_zip(s, e, partition)
+
+    pages = db.iter_timeline_range(s, e, page_size=EXPORT_PAGE_SIZE)
+    filename = f"atracker_export_{s.isoformat()}_{e.isoformat()}"
+
+    if format == "json":
+        return StreamingResponse(
+            _export_json_chunks(pages, s, e), media_type="application/json"
+        )
+
+    if format == "ndjson":
+        return StreamingResponse(
+            _export_ndjson_chunks(pages),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename={filename}.ndjson"},
         )
 
-    output.seek(0)
-    filename = f"atracker_export_{s.isoformat()}_{e.isoformat()}.csv"
     return StreamingResponse(
-        iter([output.getvalue()]),
+        _export_csv_chunks(pages),
         media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        headers={"Content-Disposition": f"attachment; filename={filename}.csv"},
     )
 
 
@@ -507,14 +745,14 @@ async def pause_tracking(req: PauseRequest):
     if req.duration_mins:
         until = datetime.now().timestamp() + (req.duration_mins * 60)
     db.set_paused(True, until)
-    manager.broadcast({"type": "pause_state", "is_paused": True, "until": until})
+    manager.publish({"type": "pause_state", "is_paused": True, "until": until})
     return {"status": "ok", "until": until}
 
 
 @app.post("/api/resume")
 async def resume_tracking():
     db.set_paused(False)
-    manager.broadcast({"type": "pause_state", "is_paused": False})
+    manager.publish({"type": "pause_state", "is_paused": False})
     return {"status": "ok"}
 
 
@@ -525,6 +763,10 @@ async def get_rules():
 
 @app.post("/api/rules")
 async def add_rule(rule: RuleCreate):
+    try:
+        validate_filter_rule(rule.rule_type, rule.wm_class_pattern, rule.title_pattern)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     rule_id = await db.add_filter_rule(
         rule.rule_type, rule.wm_class_pattern, rule.title_pattern
     )
@@ -542,22 +784,88 @@ async def delete_rule(rule_id: str):
 
 @app.post("/api/sync/android")
 async def sync_android(payload: AndroidSyncPayload):
-    """Full daily refresh: for each date in the payload, delete existing android_events
-    for that day and insert the provided events. Safe to call repeatedly.
+    """Full daily refresh: upsert every event in the payload (grouped by day) in
+    a single transaction. Safe to call repeatedly.
+    """
+    events = [e.model_dump() for day in payload.days.values() for e in day]
+    if not events:
+        return {"status": "ok", "synced_days": 0, "synced_events": 0}
+
+    # Each event keeps its own device
+    by_device: dict[str, list[dict]] = {}
+    for e in events:
+        by_device.setdefault(e["device_id"], []).append(e)
+    results = await db.sync_android_devices(payload.device_name, by_device)
+    return {
+        "status": "ok",
+        "synced_days": len(payload.days),
+        "synced_events": sum(r["accepted"] for r in results.values()),
+    }
+
+
+@app.get("/api/sync/android/state")
+async def sync_android_state(device_id: str = Query(...)):
+    """High-water mark for incremental sync: send events ending after it."""
+    return {"device_id": device_id, "sync_mark": await db.get_sync_mark(device_id)}
+
+
+def _body_error(status_code: int, message: str) -> tuple[None, JSONResponse]:
+    return None, JSONResponse(status_code=status_code, content={"error": message})
+
+
+async def _read_sync_body(request: Request) -> tuple[dict | bytes | None, JSONResponse | None]:
+    """Decode a (possibly gzip-compressed) JSON or msgpack request body.
+
+    Returns (payload, error_response). JSON is returned as raw bytes so
+    Pydantic can validate it without an intermediate dict.
     """
-    total = 0
-    # Register/update device info
-    if payload.days:
-        # Get device_id from the first event of the first day
-        first_day = next(iter(payload.days.values()), [])
-        if first_day:
-            device_id = first_day[0].device_id
-            await db.update_device(device_id, payload.device_name, "Android")
+    body = await request.body()
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError):
+            return _body_error(400, "Invalid gzip body.")
+
+    content_type = request.headers.get("content-type", "application/json").split(";")[0]
+    if content_type in ("application/msgpack", "application/x-msgpack"):
+        try:
+            import msgpack
+        except ImportError:
+            return _body_error(415, "msgpack bodies need the msgpack package on the server.")
+        try:
+            return msgpack.unpackb(body), None
+        except (ValueError, msgpack.UnpackException):
+            return _body_error(400, "Invalid msgpack body.")
+    return body, None
+
 
-    for day, events in payload.days.items():
-        count = await db.sync_android_day(day, [e.model_dump() for e in events])
-        total += count
-    return {"status": "ok", "synced_days": len(payload.days), "synced_events": total}
+@app.post("/api/sync/android/delta")
+async def sync_android_delta(request: Request):
+    """Incremental sync: upsert events newer than the device's sync mark.
+
+    Accepts JSON or msgpack (`Content-Type: application/msgpack`), optionally
+    with `Content-Encoding: gzip`. Everything commits in one transaction.
+    """
+    data, error = await _read_sync_body(request)
+    if error is not None:
+        return error
+    try:
+        if isinstance(data, bytes):
+            payload = AndroidDeltaPayload.model_validate_json(data)
+        else:
+            payload = AndroidDeltaPayload.model_validate(data)
+    except ValidationError as e:
+        return JSONResponse(
+            status_code=422, content={"error": "Invalid payload.", "detail": json.loads(e.json())}
+        )
+
+    result = await db.sync_android_events(
+        payload.device_id,
+        payload.device_name,
+        [e.model_dump(exclude_none=True) for e in payload.events],
+        delta=True,
+    )
+    return {"status": "ok", **result}
 
 
 @app.post("/api/events/manual")
@@ -601,18 +909,75 @@ async def get_devices():
 
 # --- Static files for dashboard ---
 
+dashboard_files = None
+
 if DASHBOARD_DIR.exists():
+    dashboard_files = PrecompressedStaticFiles(
+        directory=str(DASHBOARD_DIR),
+        encodings=config.compression_encodings,
+        min_size=config.compression_min_size,
+        metrics=payloads,
+    )
 
     @app.get("/")
-    async def serve_dashboard():
-        return FileResponse(DASHBOARD_DIR / "index.html")
+    async def serve_dashboard(request: Request):
+        return await dashboard_files.get_response("index.html", request.scope)
 
-    app.mount("/", StaticFiles(directory=str(DASHBOARD_DIR)), name="dashboard")
+    app.mount("/", dashboard_files, name="dashboard")
 
 
 # --- Helpers ---
 
 
+async def _cached(
+    request: Request,
+    endpoint: str,
+    start: date,
+    end: date,
+    device_ids: list[str] | None,
+    compute,
+):
+    """Serve a response for days before today from the response cache.
+
+    The key holds the category version and the range's data versions, which
+    every write path moves, so a hit needs no SQL. Ranges reaching today are
+    recomputed each time.
+    """
+    if end >= date.today():
+        return FastJSONResponse(await compute())
+    key = (
+        endpoint,
+        start,
+        end,
+        tuple(sorted(device_ids or ())),
+        db.get_category_version(),
+        db.data_versions(start, end),
+    )
+    entry = _responses.get(key)
+    if entry is None:
+        entry = _responses.put(key, fastjson.dumps(await compute()))
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def _live_category(curr: db.CurrentState) -> dict:
+    """Category of the live event: the watcher's, unless categories changed since."""
+    classifier = await db.get_classifier()
+    if curr.category_version == classifier.version:
+        return classifier.by_id.get(curr.category_id, UNCATEGORIZED)
+    return classifier.match(curr.wm_class, curr.title)
+
+
+SHAPES = ("rows", "columns")
+
+
+def _shape_error() -> JSONResponse:
+    return JSONResponse(status_code=400, content={"error": "shape must be 'rows' or 'columns'."})
+
+
 def _parse_date(date_str: str | None) -> date:
     if date_str:
         return date.fromisoformat(date_str)
@@ -625,103 +990,3 @@ def _format_duration(secs: float) -> str:
     if hours > 0:
         return f"{hours}h {minutes}m"
     return f"{minutes}m"
-
-
-_regex_cache: dict[tuple[str, int], re.Pattern] = {}
-
-
-def _get_compiled_regex(pattern: str, flags: int) -> re.Pattern:
-    key = (pattern, flags)
-    if key not in _regex_cache:
-        _regex_cache[key] = re.compile(pattern, flags)
-    return _regex_cache[key]
-
-
-def _prepare_categories(categories: list[dict]) -> list[dict]:
-    """Precompile regex patterns for a list of categories."""
-    for cat in categories:
-        is_cs = bool(cat.get("is_case_sensitive"))
-        flags = 0 if is_cs else re.IGNORECASE
-
-        tp = cat.get("title_pattern", "")
-        if tp:
-            try:
-                cat["_compiled_title"] = re.compile(tp, flags)
-            except re.error:
-                pass
-
-        wp = cat.get("wm_class_pattern", "")
-        if wp:
-            try:
-                cat["_compiled_wm"] = re.compile(wp, flags)
-            except re.error:
-                pass
-    return categories
-
-
-_prepared_categories_cache: list[dict] = []
-_prepared_categories_version: int = -1
-
-
-async def _get_matchable_categories() -> list[dict]:
-    """Get categories with precompiled regex, using versioned caching."""
-    global _prepared_categories_cache, _prepared_categories_version
-    current_version = db.get_category_version()
-    if current_version != _prepared_categories_version:
-        cats = await db.get_categories()
-        _prepared_categories_cache = _prepare_categories(cats)
-        _prepared_categories_version = current_version
-    return _prepared_categories_cache
-
-
-def _get_matched_category(wm_class: str, title: str, categories: list[dict]) -> dict:
-    """Match a wm_class or title against category patterns and return the category dict.
-    Title patterns are checked first for all categories to allow more granular matching
-    (e.g. YouTube in a Browser should match Media, not Browser).
-    """
-    wm_lower = wm_class.lower()
-    title_lower = title.lower()
-
-    # First pass: Check all title patterns
-    for cat in categories:
-        compiled = cat.get("_compiled_title")
-        if compiled:
-            if cat.get("is_case_sensitive"):
-                if compiled.search(title):
-                    return cat
-            elif compiled.search(title_lower):
-                return cat
-        elif cat.get("title_pattern"):
-            # Fallback for robustness if categories were not pre-prepared
-            is_cs = bool(cat.get("is_case_sensitive"))
-            reg = _get_compiled_regex(
-                cat["title_pattern"], 0 if is_cs else re.IGNORECASE
-            )
-            if is_cs:
-                if reg.search(title):
-                    return cat
-            elif reg.search(title_lower):
-                return cat
-
-    # Second pass: Check all wm_class patterns
-    for cat in categories:
-        compiled = cat.get("_compiled_wm")
-        if compiled:
-            if cat.get("is_case_sensitive"):
-                if compiled.search(wm_class):
-                    return cat
-            elif compiled.search(wm_lower):
-                return cat
-        elif cat.get("wm_class_pattern"):
-            # Fallback
-            is_cs = bool(cat.get("is_case_sensitive"))
-            reg = _get_compiled_regex(
-                cat["wm_class_pattern"], 0 if is_cs else re.IGNORECASE
-            )
-            if is_cs:
-                if reg.search(wm_class):
-                    return cat
-            elif reg.search(wm_lower):
-                return cat
-
-    return {"name": "Uncategorized", "color": "#64748b"}
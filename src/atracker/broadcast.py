@@ -0,0 +1,120 @@
+"""WebSocket fan-out for real-time dashboard updates.
+
+Every client gets its own bounded send queue drained by its own task, so one
+slow dashboard tab never holds up the others. A message is JSON-encoded once,
+whatever the number of clients. State messages ("activity", "pause_state")
+coalesce: a client that has not been sent the previous one yet only gets the
+latest. A full queue drops its oldest message, and a client whose send takes
+longer than SEND_TIMEOUT is disconnected.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+
+from starlette.websockets import WebSocket
+
+logger = logging.getLogger("atracker.broadcast")
+
+CLIENT_QUEUE_SIZE = 64
+SEND_TIMEOUT = 10.0  # seconds
+COALESCED_TYPES = frozenset({"activity", "pause_state"})
+
+
+class _Client:
+    __slots__ = ("ws", "pending", "wakeup", "task", "dropped")
+
+    def __init__(self, ws: WebSocket):
+        self.ws = ws
+        self.pending: deque[tuple[str, str]] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.dropped = 0
+
+    def offer(self, kind: str, text: str, queue_size: int):
+        if kind in COALESCED_TYPES:
+            for i, (pending_kind, _) in enumerate(self.pending):
+                if pending_kind == kind:
+                    del self.pending[i]
+                    self.dropped += 1
+                    break
+        if len(self.pending) >= queue_size:
+            self.pending.popleft()
+            self.dropped += 1
+        self.pending.append((kind, text))
+        self.wakeup.set()
+
+
+class Broadcaster:
+    """Connected WebSocket clients and their send queues (API loop only)."""
+
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._clients: dict[WebSocket, _Client] = {}
+        self._published = 0
+        self._evicted = 0
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = _Client(websocket)
+        client.task = asyncio.create_task(self._sender(client))
+        self._clients[websocket] = client
+        logger.debug("WS client connected. Total: %d", len(self._clients))
+
+    def disconnect(self, websocket: WebSocket):
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+        logger.debug("WS client disconnected. Total: %d", len(self._clients))
+
+    def close(self):
+        """Stop every client's sender (on shutdown)."""
+        for websocket in list(self._clients):
+            self.disconnect(websocket)
+
+    def publish(self, message: dict):
+        """Queue `message` for every client without waiting on any of them."""
+        if not self._clients:
+            return
+        self._published += 1
+        text = json.dumps(message)
+        kind = message.get("type", "")
+        for client in self._clients.values():
+            client.offer(kind, text, self.queue_size)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "published": self._published,
+            "dropped": sum(c.dropped for c in self._clients.values()),
+            "evicted": self._evicted,
+        }
+
+    async def _sender(self, client: _Client):
+        try:
+            while True:
+                await client.wakeup.wait()
+                client.wakeup.clear()
+                while client.pending:
+                    _, text = client.pending.popleft()
+                    await asyncio.wait_for(client.ws.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.info("Disconnecting a WS client that stopped reading")
+            self._evicted += 1
+            await self._close(client)
+        except Exception as e:
+            logger.debug("WS send failed: %s", e)
+            await self._close(client)
+
+    async def _close(self, client: _Client):
+        self.disconnect(client.ws)
+        try:
+            await asyncio.wait_for(client.ws.close(code=1013), 1.0)
+        except Exception:
+            pass
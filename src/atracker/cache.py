@@ -0,0 +1,54 @@
+"""In-memory cache of encoded API responses with strong ETags.
+
+Keys carry everything a response depends on (endpoint, range, devices, the
+category version and the data versions of the days it covers), so entries
+are never invalidated explicitly: a write moves the versions, and the next
+request misses and recomputes. Old entries age out of the LRU.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+RESPONSE_CACHE_SIZE = 256
+
+
+class ResponseCache:
+    """LRU of (etag, body) by key."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[str, bytes]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> tuple[str, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: tuple, body: bytes) -> tuple[str, bytes]:
+        """Store `body` and return (etag, body); the ETag is a hash of the body."""
+        entry = (f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (or is "*")."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
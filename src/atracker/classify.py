@@ -0,0 +1,186 @@
+"""Category classification engine.
+
+All title patterns are compiled into one combined regex and all wm_class
+patterns into another. Each category is one named alternative,
+``(?=.*?(?:pattern))(?P<cN>)``, anchored at the start of the string, so the
+first category (in priority order) whose pattern matches anywhere wins,
+exactly like checking the patterns one by one. Results are memoized per
+distinct (wm_class, title) pair; a Classifier is built per category version
+and thrown away when categories change.
+
+Ignore/redact filter rules get the same treatment in FilterRules, shared by
+the watcher's flush path and the Android sync.
+"""
+
+import logging
+import re
+from functools import lru_cache
+
+logger = logging.getLogger("atracker.classify")
+
+UNCATEGORIZED = {"id": None, "name": "Uncategorized", "color": "#64748b"}
+
+RULE_TYPES = ("ignore", "redact")
+REDACTED = "[Redacted]"
+
+# Distinct (wm_class, title) pairs remembered per category version
+MATCH_CACHE_SIZE = 65536
+
+# Backreferences break when patterns are renumbered inside the combined regex
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _compile(pattern: str, case_sensitive: bool) -> re.Pattern | None:
+    try:
+        return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+    except re.error:
+        logger.warning("Ignoring invalid category pattern %r", pattern)
+        return None
+
+
+class _PatternSet:
+    """Ordered (pattern, category) pairs matched as a single regex."""
+
+    def __init__(self, entries: list[tuple[str, bool, dict]]):
+        self.categories: list[dict] = []
+        self.patterns: list[re.Pattern] = []
+        alternatives = []
+        for pattern, case_sensitive, cat in entries:
+            compiled = _compile(pattern, case_sensitive)
+            if compiled is None:
+                continue
+            flag = "" if case_sensitive else "(?i:"
+            body = f"{flag}{pattern})" if flag else f"(?:{pattern})"
+            alternatives.append(f"(?=.*?{body})(?P<c{len(self.categories)}>)")
+            self.categories.append(cat)
+            self.patterns.append(compiled)
+
+        self.combined = None
+        if alternatives and not any(_BACKREF.search(p.pattern) for p in self.patterns):
+            try:
+                self.combined = re.compile("|".join(alternatives), re.DOTALL)
+            except re.error:
+                # e.g. global inline flags or clashing group names in a pattern
+                logger.debug("Falling back to per-pattern category matching")
+
+    def match(self, text: str) -> dict | None:
+        if self.combined is not None:
+            m = self.combined.match(text)
+            return self.categories[int(m.lastgroup[1:])] if m else None
+        for compiled, cat in zip(self.patterns, self.categories):
+            if compiled.search(text):
+                return cat
+        return None
+
+
+class Classifier:
+    """Match (wm_class, title) pairs to categories.
+
+    Title patterns are checked first for all categories to allow more granular
+    matching (e.g. YouTube in a Browser should match Media, not Browser).
+    """
+
+    def __init__(self, categories: list[dict], version: int = 0):
+        self.version = version
+        self.categories = categories
+        self.by_id = {c.get("id"): c for c in categories}
+        self._titles = _PatternSet([
+            (c["title_pattern"], bool(c.get("is_case_sensitive")), c)
+            for c in categories
+            if c.get("title_pattern")
+        ])
+        self._wm_classes = _PatternSet([
+            (c["wm_class_pattern"], bool(c.get("is_case_sensitive")), c)
+            for c in categories
+            if c.get("wm_class_pattern")
+        ])
+        self.match = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match)
+
+    def _match(self, wm_class: str, title: str) -> dict:
+        return (
+            self._titles.match(title or "")
+            or self._wm_classes.match(wm_class or "")
+            or UNCATEGORIZED
+        )
+
+
+def validate_filter_rule(rule_type: str, wm_class_pattern: str, title_pattern: str):
+    """Raise ValueError unless the rule has a known type and valid patterns."""
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"rule_type must be one of {', '.join(RULE_TYPES)}")
+    if not wm_class_pattern and not title_pattern:
+        raise ValueError("A rule needs a wm_class or title pattern")
+    for pattern in (wm_class_pattern, title_pattern):
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern {pattern!r}: {e}") from None
+
+
+class _AnyPattern:
+    """Case-insensitive patterns of which any may match, as one regex when possible."""
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = [c for c in (_compile(p, False) for p in patterns) if c is not None]
+        self.combined = None
+        if self.patterns and not any(_BACKREF.search(p.pattern) for p in self.patterns):
+            try:
+                self.combined = re.compile(
+                    "|".join(f"(?:{p.pattern})" for p in self.patterns), re.IGNORECASE
+                )
+            except re.error:
+                logger.debug("Falling back to per-pattern rule matching")
+
+    def search(self, text: str) -> bool:
+        if self.combined is not None:
+            return self.combined.search(text) is not None
+        return any(p.search(text) for p in self.patterns)
+
+
+class FilterRules:
+    """Ignore/redact rules, compiled once and evaluated in one pass.
+
+    A rule applies when both of its patterns match (case-insensitively; an
+    empty pattern matches anything). Any matching ignore rule drops the
+    event, otherwise any matching redact rule redacts its title. Rules with a
+    single pattern are merged into one regex per rule type and field.
+    """
+
+    def __init__(self, rules: list[dict], version: int = 0):
+        self.version = version
+        self.rules = rules
+        self._checks = {}
+        for rule_type in RULE_TYPES:
+            always = False
+            wm_only, title_only, pairs = [], [], []
+            for rule in rules:
+                if rule["rule_type"] != rule_type:
+                    continue
+                wm, title = rule["wm_class_pattern"], rule["title_pattern"]
+                if wm and title:
+                    pair = (_compile(wm, False), _compile(title, False))
+                    if None not in pair:
+                        pairs.append(pair)
+                elif wm:
+                    wm_only.append(wm)
+                elif title:
+                    title_only.append(title)
+                else:
+                    always = True
+            self._checks[rule_type] = (
+                always, _AnyPattern(wm_only), _AnyPattern(title_only), pairs
+            )
+        self.evaluate = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._evaluate)
+
+    def _evaluate(self, wm_class: str, title: str) -> str | None:
+        """The rule type applying to a window ("ignore", "redact") or None."""
+        for rule_type in RULE_TYPES:
+            always, wm_classes, titles, pairs = self._checks[rule_type]
+            if (
+                always
+                or wm_classes.search(wm_class)
+                or titles.search(title)
+                or any(wm.search(wm_class) and t.search(title) for wm, t in pairs)
+            ):
+                return rule_type
+        return None
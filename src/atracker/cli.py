@@ -40,6 +40,10 @@ def main():
     poll_interval = None
     idle_threshold = None
     open_browser = True
+    target_path = None
+    start_date = None
+    end_date = None
+    partition = "day"
 
     i = 0
     while i < len(args):
@@ -54,6 +58,22 @@ def main():
             command = "install"
         elif arg == "uninstall":
             command = "uninstall"
+        elif arg == "rebuild-rollups":
+            command = "rebuild-rollups"
+        elif arg in ("export-parquet", "import-parquet"):
+            command = arg
+            if i + 1 < len(args) and not args[i + 1].startswith("--"):
+                target_path = Path(args[i + 1])
+                i += 1
+        elif arg == "--start" and i + 1 < len(args):
+            start_date = args[i + 1]
+            i += 1
+        elif arg == "--end" and i + 1 < len(args):
+            end_date = args[i + 1]
+            i += 1
+        elif arg == "--partition" and i + 1 < len(args):
+            partition = args[i + 1]
+            i += 1
         elif arg == "--poll-interval" and i + 1 < len(args):
             poll_interval = int(args[i + 1])
             i += 1
@@ -119,6 +139,44 @@ def main():
             sys.exit(1)
         _uninstall_windows_startup()
 
+    elif command == "rebuild-rollups":
+        if not acquire_watcher_lock():
+            print("Error: stop the running atracker daemon before rebuilding rollups.")
+            sys.exit(1)
+        try:
+            rows = asyncio.run(_rebuild_rollups())
+            print(f"Rebuilt daily rollups ({rows} rows).")
+        finally:
+            release_watcher_lock()
+
+    elif command == "export-parquet":
+        from datetime import date
+
+        if target_path is None:
+            print("Usage: atracker export-parquet OUT_DIR [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--partition day|month]")
+            sys.exit(1)
+        end = date.fromisoformat(end_date) if end_date else date.today()
+        start = date.fromisoformat(start_date) if start_date else date(2000, 1, 1)
+        files = asyncio.run(_export_parquet(target_path, start, end, partition))
+        print(f"Wrote {len(files)} Parquet files to {target_path}")
+
+    elif command == "import-parquet":
+        if target_path is None:
+            print("Usage: atracker import-parquet PATH")
+            sys.exit(1)
+        # The daemon's response cache only sees its own writes
+        if not acquire_watcher_lock():
+            print("Error: stop the running atracker daemon before importing.")
+            sys.exit(1)
+        try:
+            counts = asyncio.run(_import_parquet(target_path))
+        finally:
+            release_watcher_lock()
+        print(
+            f"Imported {counts['events']} desktop and "
+            f"{counts['android_events']} Android events."
+        )
+
     elif command == "status":
         import urllib.request
 
@@ -145,6 +203,9 @@ def main():
         if sys.platform == "win32":
             print("  install    Register atracker to start automatically on Windows login")
             print("  uninstall  Remove the Windows auto-start registration")
+        print("  rebuild-rollups  Recompute the daily rollup table from raw events")
+        print("  export-parquet OUT_DIR  Export events as partitioned Parquet (needs pyarrow)")
+        print("  import-parquet PATH     Import a Parquet export into the database")
         print("  help       Show this help message")
         print("")
         print("Options (for 'start'):")
@@ -155,6 +216,10 @@ def main():
             f"  --idle-threshold SECS   How long to wait before marking as idle (default: {config.idle_threshold})"
         )
         print(f"  --no-browser            Do not open the dashboard in a browser on start")
+        print("")
+        print("Options (for 'export-parquet'):")
+        print("  --start / --end YYYY-MM-DD   Date range to export (default: everything up to today)")
+        print("  --partition day|month       One file per day (default) or per month")
 
     else:
         print(f"Unknown command: {command}")
@@ -162,6 +227,36 @@ def main():
         sys.exit(1)
 
 
+async def _rebuild_rollups() -> int:
+    from atracker import db
+
+    await db.init_db()
+    try:
+        return await db.rebuild_rollups()
+    finally:
+        await db.close_db()
+
+
+async def _export_parquet(out_dir: Path, start, end, partition: str) -> list[Path]:
+    from atracker import columnar, db
+
+    await db.init_db()
+    try:
+        return await columnar.export_parquet(out_dir, start, end, partition=partition)
+    finally:
+        await db.close_db()
+
+
+async def _import_parquet(path: Path) -> dict[str, int]:
+    from atracker import columnar, db
+
+    await db.init_db()
+    try:
+        return await columnar.import_parquet(path)
+    finally:
+        await db.close_db()
+
+
 def _run_api_server():
     """Run the FastAPI server in a separate thread."""
     from atracker.api import app
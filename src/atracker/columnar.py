@@ -0,0 +1,205 @@
+"""Columnar (Parquet/Arrow) export and import of the event store.
+
+Exports are written as a Hive-style partitioned tree that pandas, DuckDB and
+pyarrow.dataset read directly:
+
+    <out>/events/day=2026-02-25/part-0.parquet
+    <out>/android_events/day=2026-02-25/part-0.parquet
+
+pyarrow is an optional dependency (``pip install atracker[parquet]``).
+"""
+
+import asyncio
+import logging
+from datetime import date
+from pathlib import Path
+
+from atracker import db
+
+logger = logging.getLogger("atracker.columnar")
+
+TABLES = ("events", "android_events")
+PARTITIONS = ("day", "month")
+
+# Rows per Parquet row group; export and import both stream in these units.
+ROW_GROUP_SIZE = 10000
+
+# Low-cardinality text columns stored dictionary-encoded.
+DICTIONARY_COLUMNS = {
+    "events": ("device_id", "wm_class", "title"),
+    "android_events": (
+        "device_id", "package_name", "app_label", "source_type", "domain",
+        "browser_package", "title",
+    ),
+}
+
+
+# Columns read back on import; the rest are derived by the store.
+_IMPORT_COLUMNS = {
+    table: tuple(
+        c for c in columns
+        if c not in ("ts_start", "ts_end") and not (table == "android_events" and c == "title")
+    )
+    for table, columns in db.RAW_EVENT_COLUMNS.items()
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(
+            "Parquet support needs pyarrow: pip install 'atracker[parquet]'"
+        ) from e
+    return pyarrow, pyarrow.parquet
+
+
+def arrow_schema(table: str):
+    """Arrow schema for a raw event table."""
+    pa, _ = _require_pyarrow()
+    types = {
+        "pid": pa.int64(),
+        "duration_secs": pa.float64(),
+        "is_idle": pa.bool_(),
+        "ts_start": pa.timestamp("ms", tz="UTC"),
+        "ts_end": pa.timestamp("ms", tz="UTC"),
+    }
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    fields = []
+    for name in db.RAW_EVENT_COLUMNS[table]:
+        if name in DICTIONARY_COLUMNS[table]:
+            fields.append(pa.field(name, dictionary))
+        else:
+            fields.append(pa.field(name, types.get(name, pa.string())))
+    return pa.schema(fields)
+
+
+def _record_batch(pa, schema, rows: list[dict]):
+    arrays = []
+    for field in schema:
+        values = [r[field.name] for r in rows]
+        if field.name == "is_idle":
+            values = [bool(v) for v in values]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _PartitionWriter:
+    """One table's Parquet files, opened and closed as partitions go by."""
+
+    def __init__(self, pa, pq, out_dir: Path, table: str, partition: str):
+        self.pa, self.pq = pa, pq
+        self.out_dir = Path(out_dir)
+        self.table = table
+        self.partition = partition
+        self.schema = arrow_schema(table)
+        self.written: list[Path] = []
+        self._writer = None
+        self._current = None
+
+    def write(self, page: list[dict]):
+        # Pages are ts_start ordered, so each partition is one contiguous run
+        start = 0
+        while start < len(page):
+            key = page[start]["partition"]
+            stop = start
+            while stop < len(page) and page[stop]["partition"] == key:
+                stop += 1
+            if key != self._current:
+                self.close()
+                path = self.out_dir / self.table / f"{self.partition}={key}" / "part-0.parquet"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = self.pq.ParquetWriter(
+                    path, self.schema,
+                    use_dictionary=list(DICTIONARY_COLUMNS[self.table]),
+                    compression="zstd",
+                )
+                self.written.append(path)
+                self._current = key
+            self._writer.write_batch(_record_batch(self.pa, self.schema, page[start:stop]))
+            start = stop
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+async def export_parquet(
+    out_dir: Path,
+    start_date: date,
+    end_date: date,
+    device_ids: list[str] | None = None,
+    partition: str = "day",
+) -> list[Path]:
+    """Write events and android_events for a date range as partitioned Parquet.
+
+    Rows are streamed from the database one row group at a time; a partition
+    file is closed as soon as the cursor moves past its day/month. Encoding
+    and file writes run in a worker thread, so the event loop is only busy
+    with the database reads. Returns the written files.
+    """
+    pa, pq = _require_pyarrow()
+    if partition not in PARTITIONS:
+        raise ValueError(f"partition must be one of {PARTITIONS}")
+
+    written = []
+    for table in TABLES:
+        writer = _PartitionWriter(pa, pq, out_dir, table, partition)
+        try:
+            async for page in db.iter_raw_events(
+                table, start_date, end_date, device_ids,
+                partition=partition, page_size=ROW_GROUP_SIZE,
+            ):
+                await asyncio.to_thread(writer.write, page)
+        finally:
+            await asyncio.to_thread(writer.close)
+        written.extend(writer.written)
+
+    logger.info("Exported %d Parquet files to %s", len(written), out_dir)
+    return written
+
+
+def _table_for(schema) -> str | None:
+    names = set(schema.names)
+    for table in TABLES:
+        if set(_IMPORT_COLUMNS[table]) <= names:
+            return table
+    return None
+
+
+async def import_parquet(path: Path, batch_size: int = ROW_GROUP_SIZE) -> dict[str, int]:
+    """Bulk-load a Parquet export directory (or a single file) into the store.
+
+    Rows are upserted by (device_id, id) one batch at a time, like an Android
+    day sync, so re-importing the same export is idempotent. Derived columns
+    (ts_start/ts_end, the Android display title) are recomputed on insert.
+    """
+    _, pq = _require_pyarrow()
+    path = Path(path)
+    files = [path] if path.is_file() else sorted(path.rglob("*.parquet"))
+    counts = {table: 0 for table in TABLES}
+
+    for file in files:
+        parquet = pq.ParquetFile(file)
+        table = _table_for(parquet.schema_arrow)
+        if table is None:
+            logger.warning("Skipping %s: not an atracker event file", file)
+            continue
+        for batch in parquet.iter_batches(
+            batch_size=batch_size, columns=list(_IMPORT_COLUMNS[table])
+        ):
+            rows = batch.to_pylist()
+            if not rows:
+                continue
+            if table == "events":
+                counts[table] += await db.import_events(rows)
+            else:
+                counts[table] += await db.sync_android_day(rows[0]["timestamp"][:10], rows)
+
+    logger.info("Imported %s from %s", counts, path)
+    return counts
@@ -0,0 +1,319 @@
+"""HTTP response compression and payload-size metrics.
+
+`CompressionMiddleware` compresses API responses (JSON, NDJSON, CSV, the
+dashboard's text assets) with the best encoding both sides support: zstd
+and brotli when their packages are installed (the `compression` extra),
+gzip always. Bodies below `min_size` go out as they are, and streamed
+bodies (exports) are compressed chunk by chunk. `PrecompressedStaticFiles`
+compresses each dashboard asset once, at the highest level, and serves it
+from memory until the file changes. Both record what each endpoint sent in
+a `PayloadMetrics`, so a payload that grows shows up in `/api/status`.
+"""
+
+import logging
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("atracker.compression")
+
+ENCODINGS = ("zstd", "br", "gzip")  # server preference
+MIN_SIZE = 1024  # bytes
+
+# (per-response level, static-asset level)
+_LEVELS = {"zstd": (3, 19), "br": (5, 11), "gzip": (6, 9)}
+
+_COMPRESSIBLE = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+class _Brotli:
+    def __init__(self, level: int):
+        self._c = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.finish()
+
+
+def available(encodings) -> tuple[str, ...]:
+    """The configured encodings this process can produce, in order."""
+    found = []
+    for name in encodings:
+        if name == "gzip" or (name == "br" and brotli) or (name == "zstd" and zstandard):
+            found.append(name)
+        elif name in _LEVELS:
+            logger.info("%s compression disabled: its package is not installed", name)
+        else:
+            logger.warning("Unknown compression encoding %r", name)
+    return tuple(found)
+
+
+def compressor(encoding: str, level: int | None = None):
+    """A streaming compressor with compress(data) and flush()."""
+    level = _LEVELS[encoding][0] if level is None else level
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if encoding == "br":
+        return _Brotli(level)
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+def compress(encoding: str, data: bytes, best: bool = False) -> bytes:
+    c = compressor(encoding, _LEVELS[encoding][1] if best else None)
+    return c.compress(data) + c.flush()
+
+
+def negotiate(accept_encoding: str | None, encodings: tuple[str, ...]) -> str | None:
+    """Pick the first of `encodings` that an Accept-Encoding header allows."""
+    if not accept_encoding or not encodings:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    for name in encodings:
+        if accepted.get(name, wildcard) > 0:
+            return name
+    return None
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith(_COMPRESSIBLE)
+
+
+class PayloadMetrics:
+    """Response sizes per endpoint, with optional byte budgets.
+
+    A response whose uncompressed body is over its endpoint's budget is
+    counted, and logged the first time it happens for that endpoint.
+    """
+
+    def __init__(self, budgets: dict[str, int] | None = None):
+        self.budgets = dict(budgets or {})
+        self._endpoints: dict[str, dict] = {}
+
+    def record(self, endpoint: str, size: int, sent: int):
+        m = self._endpoints.get(endpoint)
+        if m is None:
+            m = self._endpoints[endpoint] = {
+                "responses": 0, "bytes": 0, "sent": 0, "max_bytes": 0, "over_budget": 0,
+            }
+        m["responses"] += 1
+        m["bytes"] += size
+        m["sent"] += sent
+        m["max_bytes"] = max(m["max_bytes"], size)
+        budget = self.budgets.get(endpoint)
+        if budget is not None and size > budget:
+            if not m["over_budget"]:
+                logger.warning("%s sent %d bytes, over its %d byte budget", endpoint, size, budget)
+            m["over_budget"] += 1
+
+    def stats(self) -> dict:
+        return {
+            endpoint: {**m, "ratio": round(m["sent"] / m["bytes"], 3) if m["bytes"] else 1.0}
+            for endpoint, m in sorted(self._endpoints.items())
+        }
+
+
+def endpoint_name(scope: Scope) -> str:
+    """The route template a request was served by (after routing)."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "other")
+    if isinstance(scope.get("endpoint"), StaticFiles):
+        return "static"
+    return "other"
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings=ENCODINGS,
+        min_size: int = MIN_SIZE,
+        metrics: PayloadMetrics | None = None,
+    ):
+        self.app = app
+        self.encodings = available(encodings)
+        self.min_size = min_size
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        responder = _Responder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding):
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.encoding = encoding
+        self.start: Message | None = None
+        self.compressor = None
+        self.precompressed = False
+        self.size = 0
+        self.sent = 0
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        self.size += len(body)
+        if self.start is not None:
+            body = self._begin(body, more_body)
+            await self._send(self.start)
+            self.start = None
+        elif self.compressor is not None:
+            body = self.compressor.compress(body)
+            if not more_body:
+                body += self.compressor.flush()
+
+        if self.compressor is not None:
+            message = {"type": "http.response.body", "body": body, "more_body": more_body}
+        self.sent += len(body)
+        await self._send(message)
+        if not more_body:
+            self._record()
+
+    def _begin(self, body: bytes, more_body: bool) -> bytes:
+        headers = MutableHeaders(raw=self.start["headers"])
+        if "content-encoding" in headers:
+            # Compressed upstream (a pre-compressed asset), which recorded it
+            self.precompressed = True
+            return body
+        if (
+            self.encoding is None
+            or not _compressible(headers.get("content-type", ""))
+            or (not more_body and len(body) < self.middleware.min_size)
+        ):
+            return body
+
+        self.compressor = compressor(self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # Equivalent to the uncompressed body, not byte-identical
+            headers["ETag"] = f"W/{etag}"
+        body = self.compressor.compress(body)
+        if more_body:
+            if "content-length" in headers:
+                del headers["Content-Length"]
+        else:
+            body += self.compressor.flush()
+            headers["Content-Length"] = str(len(body))
+        return body
+
+    def _record(self):
+        if self.middleware.metrics is not None and not self.precompressed:
+            self.middleware.metrics.record(endpoint_name(self.scope), self.size, self.sent)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves each asset compressed once at the best level.
+
+    Compressed bodies are kept in memory by (path, encoding) and rebuilt when
+    the file's mtime or size changes. Each encoding gets its own ETag.
+    """
+
+    def __init__(
+        self,
+        *args,
+        encodings=ENCODINGS,
+        min_size: int = MIN_SIZE,
+        metrics: PayloadMetrics | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.encodings = available(encodings)
+        self.min_size = min_size
+        self.metrics = metrics
+        self._compressed: dict[tuple[str, str], tuple[int, int, bytes]] = {}
+
+    def precompress(self):
+        """Compress every asset up front (blocking; run it in a thread)."""
+        for directory in self.all_directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    stat_result = os.stat(path)
+                    for encoding in self.encodings:
+                        self._body(path, stat_result, encoding)
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if (
+            encoding is None
+            or status_code != 200
+            or stat_result.st_size < self.min_size
+            or not _compressible(response.media_type or "")
+        ):
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        body = self._body(os.fspath(full_path), stat_result, encoding)
+        headers = {
+            "Content-Encoding": encoding,
+            "Vary": "Accept-Encoding",
+            "ETag": response.headers["etag"][:-1] + f'-{encoding}"',
+            "Last-Modified": response.headers["last-modified"],
+        }
+        compressed = Response(body, media_type=response.media_type, headers=headers)
+        if self.is_not_modified(compressed.headers, Headers(scope=scope)):
+            return NotModifiedResponse(compressed.headers)
+        if self.metrics is not None:
+            self.metrics.record("static", stat_result.st_size, len(body))
+        return compressed
+
+    def _body(self, path: str, stat_result, encoding: str) -> bytes:
+        key = (path, encoding)
+        entry = self._compressed.get(key)
+        if entry is None or entry[:2] != (stat_result.st_mtime_ns, stat_result.st_size):
+            with open(path, "rb") as f:
+                data = f.read()
+            entry = (stat_result.st_mtime_ns, stat_result.st_size, compress(encoding, data, best=True))
+            self._compressed[key] = entry
+        return entry[2]
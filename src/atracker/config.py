@@ -8,14 +8,31 @@ DEFAULT_CONFIG = {
     "dashboard": {
         "port": 8932,
         "host": "0.0.0.0",
+        "compression": {
+            "encodings": ["zstd", "br", "gzip"],
+            "min_size": 1024,
+        },
+        "payload_budgets": {},
     },
     "database": {
         "path": str(Path.home() / ".local" / "share" / "atracker" / "atracker.db"),
         "retention_days": 90,
+        "write_batch_size": 50,
+        "write_flush_interval": 30,
+        "reader_pool_size": 4,
+        "pragmas": {
+            "journal_mode": "wal",
+            "synchronous": "normal",
+            "busy_timeout": 5000,
+            "cache_size": -16000,
+            "mmap_size": 268435456,
+            "temp_store": "memory",
+        },
     },
     "tracking": {
         "poll_interval": 5,
         "idle_threshold": 120,
+        "safety_poll_interval": 30,
     },
     "logging": {
         "level": "INFO",
@@ -62,6 +79,18 @@ class Config:
     def dashboard_host(self) -> str:
         return self._config["dashboard"]["host"]
 
+    @property
+    def compression_encodings(self) -> list[str]:
+        return self._config["dashboard"]["compression"]["encodings"]
+
+    @property
+    def compression_min_size(self) -> int:
+        return self._config["dashboard"]["compression"]["min_size"]
+
+    @property
+    def payload_budgets(self) -> dict[str, int]:
+        return self._config["dashboard"]["payload_budgets"]
+
     @property
     def db_path(self) -> Path:
         return Path(os.path.expanduser(self._config["database"]["path"]))
@@ -70,6 +99,22 @@ class Config:
     def retention_days(self) -> int:
         return self._config["database"]["retention_days"]
 
+    @property
+    def write_batch_size(self) -> int:
+        return self._config["database"]["write_batch_size"]
+
+    @property
+    def write_flush_interval(self) -> float:
+        return self._config["database"]["write_flush_interval"]
+
+    @property
+    def reader_pool_size(self) -> int:
+        return self._config["database"]["reader_pool_size"]
+
+    @property
+    def db_pragmas(self) -> dict:
+        return self._config["database"]["pragmas"]
+
     @property
     def poll_interval(self) -> int:
         return self._config["tracking"]["poll_interval"]
@@ -78,6 +123,10 @@ class Config:
     def idle_threshold(self) -> int:
         return self._config["tracking"]["idle_threshold"]
 
+    @property
+    def safety_poll_interval(self) -> int:
+        return self._config["tracking"]["safety_poll_interval"]
+
     @property
     def log_level(self) -> str:
         return self._config["logging"]["level"]
@@ -1,14 +1,24 @@
 """SQLite database layer for activity events."""
 
+import asyncio
 import json
+import logging
+import re
 import sqlite3
+import threading
+import time
 import uuid
+from collections import deque
+from contextlib import asynccontextmanager as _acm
 from datetime import date, datetime, timedelta
 
 import aiosqlite
 
+from atracker.classify import REDACTED, Classifier, FilterRules
 from atracker.config import config
 
+logger = logging.getLogger("atracker.db")
+
 DB_PATH = config.db_path
 DB_DIR = DB_PATH.parent
 
@@ -23,6 +33,9 @@ CREATE TABLE IF NOT EXISTS events (
     pid INTEGER NOT NULL DEFAULT 0,
     duration_secs REAL NOT NULL DEFAULT 0,
     is_idle INTEGER NOT NULL DEFAULT 0,
+    ts_start INTEGER NOT NULL DEFAULT 0, -- epoch milliseconds
+    ts_end INTEGER NOT NULL DEFAULT 0,
+    category_id TEXT NOT NULL DEFAULT '', -- '' when uncategorized
     PRIMARY KEY(device_id, id)
 );
 
@@ -62,6 +75,10 @@ CREATE TABLE IF NOT EXISTS android_events (
     domain TEXT NOT NULL DEFAULT '',
     page_title TEXT NOT NULL DEFAULT '',
     browser_package TEXT NOT NULL DEFAULT '',
+    ts_start INTEGER NOT NULL DEFAULT 0, -- epoch milliseconds
+    ts_end INTEGER NOT NULL DEFAULT 0,
+    title TEXT NOT NULL DEFAULT '', -- display title, see ANDROID_TITLE_SQL
+    category_id TEXT NOT NULL DEFAULT '',
     PRIMARY KEY(device_id, id)
 );
 
@@ -69,15 +86,227 @@ CREATE TABLE IF NOT EXISTS devices (
     id TEXT PRIMARY KEY NOT NULL,
     name TEXT NOT NULL DEFAULT '',
     platform TEXT NOT NULL DEFAULT '',
-    last_seen TEXT NOT NULL DEFAULT ''
+    last_seen TEXT NOT NULL DEFAULT '',
+    sync_mark INTEGER NOT NULL DEFAULT 0 -- high-water mark: max ts_end synced (epoch ms)
 );
 
-CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    device_id TEXT NOT NULL,
+    day TEXT NOT NULL, -- local date of ts_start
+    wm_class TEXT NOT NULL,
+    title TEXT NOT NULL,
+    is_idle INTEGER NOT NULL,
+    active_secs REAL NOT NULL DEFAULT 0,
+    idle_secs REAL NOT NULL DEFAULT 0,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    first_seen TEXT NOT NULL DEFAULT '',
+    last_seen TEXT NOT NULL DEFAULT '',
+    category_id TEXT NOT NULL DEFAULT '', -- same for every event of a (wm_class, title)
+    PRIMARY KEY(device_id, day, wm_class, title, is_idle)
+) WITHOUT ROWID;
+
 CREATE INDEX IF NOT EXISTS idx_events_wm_class ON events(wm_class);
-CREATE INDEX IF NOT EXISTS idx_events_time_idle ON events(timestamp, is_idle);
-CREATE INDEX IF NOT EXISTS idx_android_events_timestamp ON android_events(timestamp);
 """
 
+# Range indexes over the epoch columns. They are created by the version 4
+# migration, since older databases don't have ts_start/ts_end yet when SCHEMA runs.
+# duration_secs and is_idle are included so daily totals are index-only.
+RANGE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_events_device_ts ON events(device_id, ts_start, ts_end, is_idle, duration_secs);
+CREATE INDEX IF NOT EXISTS idx_android_events_device_ts ON android_events(device_id, ts_start, ts_end, is_idle, duration_secs);
+"""
+
+# Covering indexes for finding the distinct (wm_class, title, category_id)
+# triples that reclassify_events has to check (schema version 9).
+CATEGORY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_events_category ON events(wm_class, title, category_id);
+CREATE INDEX IF NOT EXISTS idx_android_events_category ON android_events(package_name, title, category_id);
+"""
+
+EPOCH_BACKFILL_CHUNK = 5000
+
+# --- Daily rollups ---
+# daily_rollups is kept in step with events and android_events by triggers,
+# so every writer (watcher batches, manual events, Android sync, pruning and
+# the maintenance scripts) updates it in the same transaction.
+
+_ROLLUP_DAY = "date({r}.ts_start / 1000, 'unixepoch', 'localtime')"
+
+_ROLLUP_ADD = """
+    INSERT INTO daily_rollups (device_id, day, wm_class, title, is_idle, active_secs, idle_secs, event_count, first_seen, last_seen, category_id)
+    VALUES ({r}.device_id, {day}, {wm_class}, {title}, {r}.is_idle,
+            CASE WHEN {r}.is_idle = 0 THEN {r}.duration_secs ELSE 0 END,
+            CASE WHEN {r}.is_idle = 1 THEN {r}.duration_secs ELSE 0 END,
+            1, {r}.timestamp, {r}.end_timestamp, {r}.category_id)
+    ON CONFLICT(device_id, day, wm_class, title, is_idle) DO UPDATE SET
+        active_secs = active_secs + excluded.active_secs,
+        idle_secs = idle_secs + excluded.idle_secs,
+        event_count = event_count + 1,
+        first_seen = MIN(first_seen, excluded.first_seen),
+        last_seen = MAX(last_seen, excluded.last_seen),
+        category_id = excluded.category_id;
+"""
+
+# first_seen/last_seen are not narrowed on removal; a key disappears
+# entirely once its last event is gone.
+_ROLLUP_REMOVE = """
+    UPDATE daily_rollups SET
+        active_secs = active_secs - CASE WHEN {r}.is_idle = 0 THEN {r}.duration_secs ELSE 0 END,
+        idle_secs = idle_secs - CASE WHEN {r}.is_idle = 1 THEN {r}.duration_secs ELSE 0 END,
+        event_count = event_count - 1
+    WHERE device_id = {r}.device_id AND day = {day} AND wm_class = {wm_class}
+      AND title = {title} AND is_idle = {r}.is_idle;
+    DELETE FROM daily_rollups
+    WHERE device_id = {r}.device_id AND day = {day} AND wm_class = {wm_class}
+      AND title = {title} AND is_idle = {r}.is_idle AND event_count <= 0;
+"""
+
+# Display title of an Android event: the page title (or domain) for browser
+# tabs, the app label otherwise. Stored in android_events.title.
+ANDROID_TITLE_SQL = "CASE WHEN {r}.source_type = 'BROWSER_TAB' THEN COALESCE(NULLIF({r}.page_title, ''), NULLIF({r}.domain, ''), {r}.app_label) ELSE {r}.app_label END"
+
+_ROLLUP_SOURCES = {
+    "events": ("{r}.wm_class", "{r}.title"),
+    "android_events": ("{r}.package_name", ANDROID_TITLE_SQL),
+}
+
+# Columns whose changes move an event between rollup keys or change its totals
+_ROLLUP_COLUMNS = {
+    "events": "device_id, ts_start, timestamp, end_timestamp, wm_class, title, is_idle, duration_secs",
+    "android_events": "device_id, ts_start, timestamp, end_timestamp, package_name, app_label, source_type, page_title, domain, is_idle, duration_secs",
+}
+
+
+def _rollup_statement(template: str, table: str, row: str) -> str:
+    wm_class, title = _ROLLUP_SOURCES[table]
+    return template.format(
+        r=row,
+        day=_ROLLUP_DAY.format(r=row),
+        wm_class=wm_class.format(r=row),
+        title=title.format(r=row),
+    )
+
+
+def _rollup_triggers_sql() -> str:
+    script = []
+    for table in _ROLLUP_SOURCES:
+        add_new = _rollup_statement(_ROLLUP_ADD, table, "NEW")
+        remove_old = _rollup_statement(_ROLLUP_REMOVE, table, "OLD")
+        script.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_insert AFTER INSERT ON {table} BEGIN{add_new}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_delete AFTER DELETE ON {table} BEGIN{remove_old}END;\n"
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_update AFTER UPDATE OF {_ROLLUP_COLUMNS[table]} ON {table} BEGIN{remove_old}{add_new}END;\n"
+        )
+    return "".join(script)
+
+
+def _drop_rollup_triggers_sql() -> str:
+    return "".join(
+        f"DROP TRIGGER IF EXISTS trg_{table}_rollup_{kind};\n"
+        for table in _ROLLUP_SOURCES
+        for kind in ("insert", "delete", "update")
+    )
+
+
+# android_events.title is normally written by sync_android_day; these
+# triggers keep it correct for any other writer. The inequality check makes
+# them a no-op when the title is already right.
+ANDROID_TITLE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_android_events_title_insert AFTER INSERT ON android_events BEGIN
+    UPDATE android_events SET title = {new_title}
+    WHERE rowid = NEW.rowid AND title != {new_title};
+END;
+CREATE TRIGGER IF NOT EXISTS trg_android_events_title_update
+AFTER UPDATE OF source_type, page_title, domain, app_label ON android_events BEGIN
+    UPDATE android_events SET title = {new_title}
+    WHERE rowid = NEW.rowid AND title != {new_title};
+END;
+""".format(new_title=ANDROID_TITLE_SQL.format(r="NEW"))
+
+# Both event tables as one relation. Every column is a plain column (no
+# per-row expressions) with matching affinity in both arms, which lets
+# SQLite flatten the view and answer range predicates on it with the
+# (device_id, ts_start) indexes. For that, ORDER BY terms must also appear
+# in the select list. Aggregate queries over the view are not flattened;
+# use daily_rollups for those.
+COMBINED_EVENTS_VIEW = """
+DROP VIEW IF EXISTS combined_events;
+CREATE VIEW combined_events AS
+    SELECT id, device_id, 'local' as platform, timestamp, end_timestamp, ts_start, ts_end,
+           wm_class, title, pid, duration_secs, is_idle, category_id
+    FROM events
+    UNION ALL
+    SELECT id, device_id, 'android' as platform, timestamp, end_timestamp, ts_start, ts_end,
+           package_name as wm_class, title, CAST(0 AS INTEGER) as pid, duration_secs, is_idle, category_id
+    FROM android_events;
+"""
+
+
+REBUILD_ROLLUPS_SQL = """
+DELETE FROM daily_rollups;
+INSERT INTO daily_rollups (device_id, day, wm_class, title, is_idle, active_secs, idle_secs, event_count, first_seen, last_seen, category_id)
+SELECT device_id, day, wm_class, title, is_idle,
+       SUM(CASE WHEN is_idle = 0 THEN duration_secs ELSE 0 END),
+       SUM(CASE WHEN is_idle = 1 THEN duration_secs ELSE 0 END),
+       COUNT(*), MIN(timestamp), MAX(end_timestamp), MAX(category_id)
+FROM (
+    SELECT device_id, {events_day} as day, wm_class, title, is_idle, duration_secs, timestamp, end_timestamp, category_id FROM events
+    UNION ALL
+    SELECT device_id, {android_day} as day, package_name as wm_class, {android_title} as title, is_idle, duration_secs, timestamp, end_timestamp, category_id FROM android_events
+)
+GROUP BY device_id, day, wm_class, title, is_idle;
+""".format(
+    events_day=_ROLLUP_DAY.format(r="events"),
+    android_day=_ROLLUP_DAY.format(r="android_events"),
+    android_title=_ROLLUP_SOURCES["android_events"][1].format(r="android_events"),
+)
+
+# --- Persisted categories ---
+# events, android_events and daily_rollups carry the category_id of their
+# (wm_class, title) pair, assigned on insert. When categories change, only
+# pairs whose category moved are rewritten, via the temp.reclassify map.
+# category_id is not in _ROLLUP_COLUMNS, so these updates leave the rollup
+# totals alone.
+
+RECLASSIFY_TEMP_TABLE = """CREATE TEMP TABLE IF NOT EXISTS reclassify (
+    wm_class TEXT NOT NULL, title TEXT NOT NULL, category_id TEXT NOT NULL,
+    PRIMARY KEY(wm_class, title)
+)"""
+
+# Candidates come from the event tables, not daily_rollups: a rollup's
+# category_id is overwritten by its latest insert, so it can already show the
+# new category while older events of the same key still carry the old one.
+RECLASSIFY_CANDIDATES = """SELECT DISTINCT wm_class, title, category_id FROM events
+UNION
+SELECT DISTINCT package_name, title, category_id FROM android_events"""
+
+RECLASSIFY_STATEMENTS = tuple(
+    f"""UPDATE {table} SET category_id = (
+            SELECT m.category_id FROM temp.reclassify m
+            WHERE m.wm_class = {table}.{wm_class} AND m.title = {table}.title)
+        WHERE ({wm_class}, title) IN (SELECT wm_class, title FROM temp.reclassify)"""
+    for table, wm_class in (
+        ("events", "wm_class"),
+        ("android_events", "package_name"),
+        ("daily_rollups", "wm_class"),
+    )
+) + ("DELETE FROM temp.reclassify",)
+
+
+def _category_id(classifier: Classifier, wm_class: str, title: str) -> str:
+    return classifier.match(wm_class, title)["id"] or ""
+
+
+def _category_changes(classifier: Classifier, pairs) -> list[tuple[str, str, str]]:
+    """(wm_class, title, new category_id) for pairs stored under another category."""
+    changes = {}
+    for wm_class, title, current in pairs:
+        new = _category_id(classifier, wm_class, title)
+        if new != current:
+            changes[(wm_class, title)] = new
+    return [(w, t, c) for (w, t), c in changes.items()]
+
+
 DEFAULT_CATEGORIES = [
     ("Browser", "firefox|chromium|google-chrome|brave|zen", "", "#3b82f6", 0, 0, 0),
     ("Terminal", "gnome-terminal|kitty|alacritty|java", "", "#10b981", 0, 0, 0),
@@ -156,6 +385,10 @@ def _get_device_id() -> str:
 DEVICE_ID = None  # Lazy-initialized
 _category_cache = None
 _category_version = 0
+_classifier: Classifier | None = None
+_reclassify_task: asyncio.Task | None = None
+_filter_rules_version = 0
+_filter_rules: FilterRules | None = None
 
 
 def get_device_id() -> str:
@@ -165,18 +398,87 @@ def get_device_id() -> str:
     return DEVICE_ID
 
 
-_current_tracking_state = None
+class CurrentState:
+    """Immutable snapshot of what the watcher is tracking right now.
+
+    The watcher publishes a new snapshot by swapping the module reference, so
+    the API thread always reads a consistent one without locking. `seq` grows
+    with every publish; a snapshot is falsy when nothing is being tracked.
+    """
+
+    __slots__ = (
+        "seq", "wm_class", "title", "timestamp", "start_epoch",
+        "is_idle", "category_id", "category_version",
+    )
+
+    def __init__(
+        self,
+        seq: int,
+        wm_class: str = "",
+        title: str = "",
+        start: datetime | None = None,
+        is_idle: bool = False,
+        category_id: str = "",
+        category_version: int = 0,
+    ):
+        values = {
+            "seq": seq,
+            "wm_class": wm_class,
+            "title": title,
+            "timestamp": start.isoformat() if start else "",
+            "start_epoch": start.timestamp() if start else 0.0,
+            "is_idle": is_idle,
+            "category_id": category_id,
+            "category_version": category_version,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CurrentState is immutable")
+
+    def __bool__(self) -> bool:
+        return bool(self.wm_class)
+
+    def duration(self, now: float | None = None) -> float:
+        """Seconds tracked so far."""
+        return max(0.0, (now if now is not None else time.time()) - self.start_epoch)
+
+    def as_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "wm_class": self.wm_class,
+            "title": self.title,
+            "timestamp": self.timestamp,
+            "is_idle": self.is_idle,
+            "category_id": self.category_id,
+        }
+
+
+_current_state = CurrentState(0)
 _is_paused = False
 _pause_until = 0.0  # timestamp
 
 
-def set_current_state(state: dict | None):
-    global _current_tracking_state
-    _current_tracking_state = state
+def set_current_state(
+    wm_class: str = "",
+    title: str = "",
+    start: datetime | None = None,
+    is_idle: bool = False,
+    category_id: str = "",
+    category_version: int = 0,
+) -> CurrentState:
+    """Publish a new snapshot (no arguments: nothing is being tracked)."""
+    global _current_state
+    _current_state = CurrentState(
+        _current_state.seq + 1, wm_class, title, start, is_idle,
+        category_id, category_version,
+    )
+    return _current_state
 
 
-def get_current_state() -> dict | None:
-    return _current_tracking_state
+def get_current_state() -> CurrentState:
+    return _current_state
 
 
 def set_paused(paused: bool, until: float = 0.0):
@@ -199,6 +501,137 @@ def get_category_version() -> int:
     return _category_version
 
 
+# Per-day data versions for response caching. A day's version moves on every
+# committed write that may change its events; the epoch moves on writes that
+# may touch any day. Both live in memory, so reading them costs no SQL.
+_data_lock = threading.Lock()
+_data_counter = 0
+_data_epoch = 0
+_day_versions: dict[date, int] = {}
+
+
+def _touch_days(*timestamps: str) -> None:
+    """Move the versions of the days `timestamps` fall on.
+
+    A write touching today also resets the timeline log, which did not see it.
+    """
+    if _touch_epochs(_to_epoch_ms(ts) for ts in timestamps):
+        _reset_timeline_log()
+
+
+def _touch_epochs(epochs_ms) -> bool:
+    """Move the versions of the days of these epoch-ms times; True if today is one."""
+    global _data_counter
+    today = date.today()
+    touches_today = False
+    with _data_lock:
+        _data_counter += 1
+        for ms in epochs_ms:
+            day = date.fromtimestamp(ms / 1000)
+            _day_versions[day] = _data_counter
+            touches_today = touches_today or day == today
+    return touches_today
+
+
+def _touch_all() -> None:
+    global _data_epoch
+    with _data_lock:
+        _data_epoch += 1
+    _reset_timeline_log()
+
+
+# Today's timeline as a log of the blocks the watcher recorded, numbered by a
+# monotonic seq, so dashboards can fetch only what they are missing. Writes
+# the log does not see (syncs, manual events, category edits) reset it, and
+# clients holding an older seq then reload the full timeline.
+TIMELINE_LOG_SIZE = 512
+_timeline_lock = threading.Lock()
+_timeline_log: deque[tuple[int, dict]] = deque(maxlen=TIMELINE_LOG_SIZE)
+_timeline_seq = 0
+_timeline_base = 0
+
+
+def _log_block(block: dict) -> None:
+    global _timeline_seq
+    with _timeline_lock:
+        _timeline_seq += 1
+        _timeline_log.append((_timeline_seq, block))
+
+
+def _reset_timeline_log() -> None:
+    global _timeline_seq, _timeline_base
+    with _timeline_lock:
+        _timeline_seq += 1
+        _timeline_base = _timeline_seq
+        _timeline_log.clear()
+
+
+def timeline_seq() -> int:
+    return _timeline_seq
+
+
+def timeline_since(seq: int) -> tuple[int, list[dict] | None]:
+    """The current seq and the blocks recorded after `seq`.
+
+    The blocks are None when the log cannot tell (reset since, or `seq` is
+    too old or from another run) and the client must reload.
+    """
+    with _timeline_lock:
+        oldest = _timeline_log[0][0] if _timeline_log else _timeline_seq + 1
+        if seq < _timeline_base or seq > _timeline_seq or seq < oldest - 1:
+            return _timeline_seq, None
+        return _timeline_seq, [block for n, block in _timeline_log if n > seq]
+
+
+def data_versions(start: date, end: date) -> tuple[int, int]:
+    """(epoch, newest day version) of a date range; changes whenever its data may have."""
+    with _data_lock:
+        newest = max(
+            (v for d, v in _day_versions.items() if start <= d <= end), default=0
+        )
+        return _data_epoch, newest
+
+
+def _to_epoch_ms(ts: str) -> int:
+    """Convert an ISO 8601 timestamp to epoch milliseconds.
+
+    Naive timestamps (what the watchers write) are interpreted as local time.
+    Unparseable values map to 0.
+    """
+    try:
+        return int(datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp() * 1000)
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+def _day_start_ms(d: date) -> int:
+    """Epoch milliseconds of local midnight at the start of `d`."""
+    return int(datetime(d.year, d.month, d.day).timestamp() * 1000)
+
+
+def _range_ms(start_date: date, end_date: date) -> tuple[int, int]:
+    """Half-open [start, end) epoch-millisecond bounds covering whole local days."""
+    return _day_start_ms(start_date), _day_start_ms(end_date + timedelta(days=1))
+
+
+def _backfill_epoch_columns(conn: sqlite3.Connection, table: str) -> None:
+    """Fill ts_start/ts_end from the ISO columns, committing in chunks."""
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT rowid, timestamp, end_timestamp FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, EPOCH_BACKFILL_CHUNK),
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            f"UPDATE {table} SET ts_start = ?, ts_end = ? WHERE rowid = ?",
+            [(_to_epoch_ms(ts), _to_epoch_ms(end_ts), rowid) for rowid, ts, end_ts in rows],
+        )
+        conn.commit()
+        last_rowid = rows[-1][0]
+
+
 async def init_db() -> None:
     """Initialize database and migrate if needed."""
     global _category_cache, _category_version
@@ -208,6 +641,10 @@ async def init_db() -> None:
 
     conn = sqlite3.connect(str(DB_PATH), uri=True)
     try:
+        # journal_mode=WAL is persistent, so setting it here covers every
+        # connection opened later (including the read-only ones).
+        for statement in _pragma_statements(writer=True):
+            conn.execute(statement)
         conn.executescript(SCHEMA)
 
         # Seed default categories if empty
@@ -327,6 +764,103 @@ async def init_db() -> None:
                 )
             conn.execute("PRAGMA user_version = 3")
 
+        if version < 8:
+            # Added ahead of the other migrations: the rollup triggers and
+            # rebuild SQL they install read category_id.
+            for table in ("events", "android_events", "daily_rollups"):
+                existing_cols = [
+                    r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()
+                ]
+                if "category_id" not in existing_cols:
+                    conn.execute(
+                        f"ALTER TABLE {table} ADD COLUMN category_id TEXT NOT NULL DEFAULT ''"
+                    )
+
+        if version < 4:
+            for table in ("events", "android_events"):
+                existing_cols = [
+                    r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()
+                ]
+                if "ts_start" not in existing_cols:
+                    conn.execute(
+                        f"ALTER TABLE {table} ADD COLUMN ts_start INTEGER NOT NULL DEFAULT 0"
+                    )
+                if "ts_end" not in existing_cols:
+                    conn.execute(
+                        f"ALTER TABLE {table} ADD COLUMN ts_end INTEGER NOT NULL DEFAULT 0"
+                    )
+                conn.commit()
+                _backfill_epoch_columns(conn, table)
+
+            conn.executescript("""
+                DROP INDEX IF EXISTS idx_events_timestamp;
+                DROP INDEX IF EXISTS idx_events_time_idle;
+                DROP INDEX IF EXISTS idx_android_events_timestamp;
+            """)
+            conn.executescript(RANGE_INDEXES)
+            conn.execute("PRAGMA user_version = 4")
+
+        if version < 5:
+            conn.executescript(_rollup_triggers_sql())
+            conn.executescript(REBUILD_ROLLUPS_SQL)
+            conn.execute("PRAGMA user_version = 5")
+
+        if version < 6:
+            existing_cols = [
+                r[1]
+                for r in conn.execute("PRAGMA table_info(android_events)").fetchall()
+            ]
+            if "title" not in existing_cols:
+                conn.execute(
+                    "ALTER TABLE android_events ADD COLUMN title TEXT NOT NULL DEFAULT ''"
+                )
+            # Recreate the rollup triggers so their UPDATE trigger only fires for
+            # the columns it depends on (not for the title backfill below).
+            conn.executescript(_drop_rollup_triggers_sql())
+            conn.executescript(_rollup_triggers_sql())
+            conn.execute(
+                "UPDATE android_events SET title = "
+                + ANDROID_TITLE_SQL.format(r="android_events")
+            )
+            conn.executescript(ANDROID_TITLE_TRIGGERS)
+            conn.executescript(COMBINED_EVENTS_VIEW)
+            conn.execute("PRAGMA user_version = 6")
+
+        if version < 7:
+            existing_cols = [
+                r[1] for r in conn.execute("PRAGMA table_info(devices)").fetchall()
+            ]
+            if "sync_mark" not in existing_cols:
+                conn.execute(
+                    "ALTER TABLE devices ADD COLUMN sync_mark INTEGER NOT NULL DEFAULT 0"
+                )
+            conn.execute(
+                """UPDATE devices SET sync_mark = COALESCE(
+                       (SELECT MAX(ts_end) FROM android_events WHERE device_id = devices.id), 0)"""
+            )
+            conn.execute("PRAGMA user_version = 7")
+
+        if version < 8:
+            conn.executescript(_drop_rollup_triggers_sql())
+            conn.executescript(_rollup_triggers_sql())
+            conn.executescript(COMBINED_EVENTS_VIEW)
+            cursor = conn.execute("SELECT * FROM categories ORDER BY name")
+            names = [d[0] for d in cursor.description]
+            classifier = Classifier([dict(zip(names, r)) for r in cursor.fetchall()])
+            pairs = conn.execute(RECLASSIFY_CANDIDATES).fetchall()
+            conn.execute(RECLASSIFY_TEMP_TABLE)
+            conn.executemany(
+                "INSERT INTO temp.reclassify VALUES (?, ?, ?)",
+                _category_changes(classifier, pairs),
+            )
+            for statement in RECLASSIFY_STATEMENTS:
+                conn.execute(statement)
+            conn.execute("PRAGMA user_version = 8")
+
+        if version < 9:
+            conn.executescript(CATEGORY_INDEXES)
+            conn.execute("PRAGMA user_version = 9")
+
         # Seed default settings if empty
         settings_defaults = [
             ("poll_interval", str(config.poll_interval)),
@@ -351,39 +885,155 @@ async def init_db() -> None:
         conn.commit()
     finally:
         conn.close()
+    _touch_all()  # migrations may have rewritten anything
 
 
-_db_conn = None
+_PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+_PRAGMA_VALUE = re.compile(r"^-?\d+$|^[A-Za-z_]+$")
+# Pragmas that only make sense on the connection that writes
+_WRITER_ONLY_PRAGMAS = {"journal_mode", "synchronous"}
 
 
-async def close_db():
-    """Close the async database connection."""
-    global _db_conn
-    if _db_conn is not None:
-        await _db_conn.close()
-        _db_conn = None
+def _pragma_statements(writer: bool) -> list[str]:
+    """Build PRAGMA statements from the `database.pragmas` config section."""
+    statements = []
+    for name, value in config.db_pragmas.items():
+        name = str(name).lower()
+        value = str(value)
+        if not _PRAGMA_NAME.match(name) or not _PRAGMA_VALUE.match(value):
+            logger.warning("Ignoring invalid pragma %s = %s", name, value)
+            continue
+        if not writer and name in _WRITER_ONLY_PRAGMAS:
+            continue
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
 
 
-async def get_db() -> aiosqlite.Connection:
-    """Get an async database connection."""
-    global _db_conn
-    if _db_conn is None:
-        _db_conn = await aiosqlite.connect(str(DB_PATH), uri=True)
-        _db_conn.row_factory = aiosqlite.Row
-    return _db_conn
+class ConnectionPool:
+    """SQLite connections owned by a single event loop.
 
+    Each loop gets one writer connection and up to `reader_pool_size`
+    read-only connections. With WAL enabled, readers never block behind
+    the writer, and no connection is shared between loops.
+    """
 
-from contextlib import asynccontextmanager as _acm
+    def __init__(self, reader_pool_size: int):
+        self.reader_pool_size = max(1, int(reader_pool_size))
+        self._writer: aiosqlite.Connection | None = None
+        self._writer_lock = asyncio.Lock()
+        # Held for each _aconn() block, so a block is one transaction
+        self.write_lock = asyncio.Lock()
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._readers: list[aiosqlite.Connection] = []
+
+    async def _open(self, writer: bool) -> aiosqlite.Connection:
+        if writer:
+            conn = await aiosqlite.connect(str(DB_PATH), uri=True)
+        else:
+            conn = await aiosqlite.connect(
+                f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True
+            )
+        conn.row_factory = aiosqlite.Row
+        for statement in _pragma_statements(writer):
+            await conn.execute(statement)
+        if not writer:
+            await conn.execute("PRAGMA query_only = 1")
+        return conn
+
+    async def writer(self) -> aiosqlite.Connection:
+        if self._writer is None:
+            async with self._writer_lock:
+                if self._writer is None:
+                    self._writer = await self._open(writer=True)
+        return self._writer
+
+    @_acm
+    async def reader(self):
+        if self._idle_readers.empty() and len(self._readers) < self.reader_pool_size:
+            conn = await self._open(writer=False)
+            self._readers.append(conn)
+        else:
+            conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            self._idle_readers.put_nowait(conn)
+
+    async def close(self):
+        conns = list(self._readers)
+        if self._writer is not None:
+            conns.append(self._writer)
+        self._writer = None
+        self._readers = []
+        self._idle_readers = asyncio.Queue()
+        for conn in conns:
+            await conn.close()
+
+
+_pools: dict[asyncio.AbstractEventLoop, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    """Get the connection pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pool = _pools.get(loop)
+        if pool is None:
+            pool = _pools[loop] = ConnectionPool(config.reader_pool_size)
+        return pool
+
+
+async def close_db(all_loops: bool = True):
+    """Drain buffered events and close database connections.
+
+    By default the connections of every event loop are closed; pass
+    ``all_loops=False`` to close only those of the running loop.
+    """
+    if _pools:
+        try:
+            await _event_queue.flush()
+        except Exception as e:
+            logger.error("Failed to drain event queue on close: %s", e)
+    with _pools_lock:
+        if all_loops:
+            pools = list(_pools.values())
+            _pools.clear()
+        else:
+            pool = _pools.pop(asyncio.get_running_loop(), None)
+            pools = [pool] if pool else []
+    for pool in pools:
+        await pool.close()
+
+
+async def get_db() -> aiosqlite.Connection:
+    """Get the writer connection for the running event loop."""
+    return await _get_pool().writer()
 
 
 @_acm
 async def _aconn():
-    """Async context manager for an aiosqlite connection."""
-    db = await get_db()
-    try:
+    """Async context manager for the loop's writer connection.
+
+    Blocks are serialized per loop, so statements from other coroutines never
+    interleave with (or commit) a block's transaction. Uncommitted work is
+    rolled back if the block raises.
+    """
+    pool = _get_pool()
+    db = await pool.writer()
+    async with pool.write_lock:
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+
+
+@_acm
+async def _rconn():
+    """Async context manager for a pooled read-only connection."""
+    async with _get_pool().reader() as db:
         yield db
-    finally:
-        pass
 
 
 async def insert_event(
@@ -399,9 +1049,11 @@ async def insert_event(
     event_id = str(uuid.uuid4())
     device_id = get_device_id()
     async with _aconn() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        classifier = await get_classifier()
         await db.execute(
-            """INSERT INTO events (id, device_id, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            """INSERT INTO events (id, device_id, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle, ts_start, ts_end, category_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (
                 event_id,
                 device_id,
@@ -412,83 +1064,283 @@ async def insert_event(
                 pid,
                 duration_secs,
                 int(is_idle),
+                _to_epoch_ms(timestamp),
+                _to_epoch_ms(end_timestamp),
+                _category_id(classifier, wm_class, title),
             ),
         )
         await db.commit()
-        return event_id
+    _touch_days(timestamp, end_timestamp)
+    return event_id
+
+
+class EventWriteQueue:
+    """Write-behind buffer for watcher events.
+
+    Events are held in memory and written with a single ``executemany`` and a
+    single commit once ``batch_size`` rows are pending or ``flush_interval``
+    seconds have passed, instead of one fsync per window switch.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self._pending: list[tuple] = []
+        self._lock = threading.Lock()
+
+        # Counters
+        self.enqueued = 0
+        self.flushed = 0
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def put(self, row: tuple) -> int:
+        """Buffer an events row and return the new queue depth."""
+        with self._lock:
+            self._pending.append(row)
+            self.enqueued += 1
+            return len(self._pending)
+
+    async def flush(self) -> int:
+        """Write all pending rows in one transaction. Returns the number written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            async with _aconn() as db:
+                await db.execute("BEGIN IMMEDIATE")
+                classifier = await get_classifier()
+                await db.executemany(
+                    """INSERT INTO events (id, device_id, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle, ts_start, ts_end, category_id)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [row + (_category_id(classifier, row[4], row[5]),) for row in batch],
+                )
+                await db.commit()
+            # Already in the timeline log (queue_event)
+            _touch_epochs(ms for row in batch for ms in (row[9], row[10]))
+        except Exception:
+            # Put the batch back in front so nothing is lost; the next flush retries.
+            with self._lock:
+                self._pending[:0] = batch
+            raise
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushed += len(batch)
+        self.flush_count += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+        return len(batch)
+
+    async def run(self):
+        """Flush periodically until cancelled, draining the queue on the way out."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error("Failed to flush event queue: %s", e)
+        finally:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flush_count": self.flush_count,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 3)
+            if self.flush_count
+            else 0.0,
+        }
+
+
+_event_queue = EventWriteQueue(config.write_batch_size, config.write_flush_interval)
+
+
+def get_event_queue() -> EventWriteQueue:
+    return _event_queue
+
+
+async def queue_event(
+    timestamp: str,
+    end_timestamp: str,
+    wm_class: str,
+    title: str,
+    pid: int,
+    duration_secs: float,
+    is_idle: bool = False,
+) -> str:
+    """Buffer an activity event for a batched write and return its UUID.
+
+    The queue is flushed immediately once it reaches its batch size.
+    """
+    event_id = str(uuid.uuid4())
+    ts_start = _to_epoch_ms(timestamp)
+    depth = _event_queue.put(
+        (
+            event_id,
+            get_device_id(),
+            timestamp,
+            end_timestamp,
+            wm_class,
+            title,
+            pid,
+            duration_secs,
+            int(is_idle),
+            ts_start,
+            _to_epoch_ms(end_timestamp),
+        )
+    )
+    classifier = await get_classifier()
+    category_id = _category_id(classifier, wm_class, title)
+    _log_block(
+        {
+            "timestamp": timestamp,
+            "end_timestamp": end_timestamp,
+            "wm_class": wm_class,
+            "title": title,
+            "duration_secs": duration_secs,
+            "is_idle": int(is_idle),
+            "device_id": get_device_id(),
+            "ts_start": ts_start,
+            "category_id": category_id,
+            "color": classifier.by_id.get(category_id, {}).get("color", "#64748b"),
+        }
+    )
+    if depth >= _event_queue.batch_size:
+        await _event_queue.flush()
+    return event_id
+
+
+async def flush_events() -> int:
+    """Write any buffered events to the database."""
+    return await _event_queue.flush()
+
+
+async def _flush_pending():
+    """Make buffered watcher events visible before a read."""
+    if _event_queue.depth:
+        await _event_queue.flush()
+
+
+async def event_started_at(timestamp: str) -> bool:
+    """Whether this device already has an event starting at `timestamp`."""
+    await _flush_pending()
+    async with _rconn() as db:
+        cursor = await db.execute(
+            "SELECT 1 FROM events WHERE device_id = ? AND ts_start = ? LIMIT 1",
+            (get_device_id(), _to_epoch_ms(timestamp)),
+        )
+        return await cursor.fetchone() is not None
 
 
 async def prune_events(days_to_keep: int) -> int:
     """Delete events older than a specific number of days."""
+    cutoff = _day_start_ms(date.today() - timedelta(days=days_to_keep))
     async with _aconn() as db:
         cursor = await db.execute(
-            "DELETE FROM events WHERE timestamp < DATE('now', ?)",
-            (f"-{days_to_keep} days",),
+            """DELETE FROM events
+               WHERE device_id IN (SELECT value FROM json_each(?)) AND ts_start < ?""",
+            (await _resolve_device_ids(db, None), cutoff),
         )
         deleted_count = cursor.rowcount
         await db.commit()
-        return deleted_count
+    if deleted_count:
+        _touch_all()
+    return deleted_count
+
+
+async def _resolve_device_ids(db: aiosqlite.Connection, device_ids: list[str] | None) -> str:
+    """Return the JSON list of device IDs a range query should scan.
+
+    The range indexes lead with device_id, so "all devices" is expanded into
+    an explicit list with a loose index scan (one seek per distinct device).
+    """
+    if device_ids is not None:
+        return json.dumps(device_ids)
+
+    found = set()
+    for table in ("events", "android_events"):
+        cursor = await db.execute(f"SELECT MIN(device_id) FROM {table}")
+        row = await cursor.fetchone()
+        while row and row[0] is not None:
+            found.add(row[0])
+            cursor = await db.execute(
+                f"SELECT MIN(device_id) FROM {table} WHERE device_id > ?", (row[0],)
+            )
+            row = await cursor.fetchone()
+    return json.dumps(sorted(found))
 
 
 async def get_events(
     target_date: date, device_ids: list[str] | None = None
 ) -> list[dict]:
     """Get all events for a specific date (unified)."""
-    day_start = f"{target_date.isoformat()}T00:00:00"
-    next_day = target_date + timedelta(days=1)
-    next_day_start = f"{next_day.isoformat()}T00:00:00"
+    columns, rows = await get_events_columns(target_date, device_ids)
+    return [dict(zip(columns, r)) for r in rows]
 
-    device_filter_active = device_ids is not None
-    device_json = json.dumps(device_ids or [])
 
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
+async def get_events_columns(
+    target_date: date, device_ids: list[str] | None = None
+) -> tuple[list[str], list[tuple]]:
+    """get_events as column names and plain row tuples."""
+    await _flush_pending()
+    range_start, range_end = _range_ms(target_date, target_date)
+
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
         cursor = await db.execute(
-            """WITH combined_events AS (
-                SELECT id, device_id, 'local' as platform, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle FROM events
-                UNION ALL
-                SELECT id, device_id, 'android' as platform, timestamp, end_timestamp, package_name as wm_class, CASE WHEN source_type = 'BROWSER_TAB' THEN COALESCE(NULLIF(page_title, ''), NULLIF(domain, ''), app_label) ELSE app_label END as title, 0 as pid, duration_secs, is_idle FROM android_events
-            )
-            SELECT * FROM combined_events
-            WHERE timestamp >= ? AND timestamp < ?
-              AND (? = 0 OR device_id IN (SELECT value FROM json_each(?)))
-            ORDER BY timestamp""",
-            (day_start, next_day_start, int(device_filter_active), device_json),
+            """SELECT id, device_id, platform, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle, ts_start, category_id
+            FROM combined_events
+            WHERE device_id IN (SELECT value FROM json_each(?))
+              AND ts_start >= ? AND ts_start < ?
+            ORDER BY ts_start""",
+            (device_json, range_start, range_end),
         )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        return _columns(cursor), [tuple(r) for r in await cursor.fetchall()]
+
+
+def _columns(cursor) -> list[str]:
+    return [d[0] for d in cursor.description]
 
 
 async def get_summary_range(
     start_date: date, end_date: date, device_ids: list[str] | None = None
 ) -> list[dict]:
     """Get per-app usage summary for a date range (unified)."""
-    range_start = f"{start_date.isoformat()}T00:00:00"
-    next_day = end_date + timedelta(days=1)
-    range_end = f"{next_day.isoformat()}T00:00:00"
-
-    device_filter_active = device_ids is not None
-    device_json = json.dumps(device_ids or [])
+    await _flush_pending()
 
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
         cursor = await db.execute(
-            """WITH combined_events AS (
-                SELECT device_id, timestamp, end_timestamp, wm_class, title, duration_secs, is_idle FROM events
-                UNION ALL
-                SELECT device_id, timestamp, end_timestamp, package_name as wm_class, CASE WHEN source_type = 'BROWSER_TAB' THEN COALESCE(NULLIF(page_title, ''), NULLIF(domain, ''), app_label) ELSE app_label END as title, duration_secs, is_idle FROM android_events
-            )
-            SELECT wm_class, title,
-                   SUM(duration_secs) as total_secs,
-                   COUNT(*) as event_count,
-                   MIN(timestamp) as first_seen,
-                   MAX(end_timestamp) as last_seen
-            FROM combined_events
-            WHERE timestamp >= ? AND timestamp < ? AND is_idle = 0 AND wm_class != ''
-              AND (? = 0 OR device_id IN (SELECT value FROM json_each(?)))
-            GROUP BY wm_class, title
+            """SELECT r.wm_class, r.title, r.category_id,
+                   COALESCE(c.name, 'Uncategorized') as category_name,
+                   COALESCE(c.color, '#64748b') as color,
+                   SUM(r.active_secs) as total_secs,
+                   SUM(r.event_count) as event_count,
+                   MIN(r.first_seen) as first_seen,
+                   MAX(r.last_seen) as last_seen
+            FROM daily_rollups r
+            LEFT JOIN categories c ON c.id = r.category_id
+            WHERE r.device_id IN (SELECT value FROM json_each(?))
+              AND r.day >= ? AND r.day <= ?
+              AND r.is_idle = 0 AND r.wm_class != ''
+            GROUP BY r.wm_class, r.title, r.category_id
             ORDER BY total_secs DESC""",
-            (range_start, range_end, int(device_filter_active), device_json),
+            (device_json, start_date.isoformat(), end_date.isoformat()),
         )
         rows = await cursor.fetchall()
         return [dict(r) for r in rows]
@@ -498,30 +1350,182 @@ async def get_timeline_range(
     start_date: date, end_date: date, device_ids: list[str] | None = None
 ) -> list[dict]:
     """Get timeline blocks for a date range (unified)."""
-    range_start = f"{start_date.isoformat()}T00:00:00"
-    next_day = end_date + timedelta(days=1)
-    range_end = f"{next_day.isoformat()}T00:00:00"
+    columns, rows = await get_timeline_columns(start_date, end_date, device_ids)
+    return [dict(zip(columns, r)) for r in rows]
 
-    device_filter_active = device_ids is not None
-    device_json = json.dumps(device_ids or [])
 
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
+async def get_timeline_columns(
+    start_date: date, end_date: date, device_ids: list[str] | None = None
+) -> tuple[list[str], list[tuple]]:
+    """get_timeline_range as column names and plain row tuples."""
+    await _flush_pending()
+    range_start, range_end = _range_ms(start_date, end_date)
+
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
         cursor = await db.execute(
-            """WITH combined_events AS (
-                SELECT device_id, timestamp, end_timestamp, wm_class, title, duration_secs, is_idle FROM events
-                UNION ALL
-                SELECT device_id, timestamp, end_timestamp, package_name as wm_class, CASE WHEN source_type = 'BROWSER_TAB' THEN COALESCE(NULLIF(page_title, ''), NULLIF(domain, ''), app_label) ELSE app_label END as title, duration_secs, is_idle FROM android_events
-            )
-            SELECT timestamp, end_timestamp, wm_class, title, duration_secs, is_idle, device_id
+            """SELECT timestamp, end_timestamp, wm_class, title, duration_secs, is_idle, device_id, ts_start, category_id
             FROM combined_events
-            WHERE timestamp >= ? AND timestamp < ?
-              AND (? = 0 OR device_id IN (SELECT value FROM json_each(?)))
-            ORDER BY timestamp""",
-            (range_start, range_end, int(device_filter_active), device_json),
+            WHERE device_id IN (SELECT value FROM json_each(?))
+              AND ts_start >= ? AND ts_start < ?
+            ORDER BY ts_start""",
+            (device_json, range_start, range_end),
         )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        return _columns(cursor), [tuple(r) for r in await cursor.fetchall()]
+
+
+async def iter_timeline_range(
+    start_date: date,
+    end_date: date,
+    device_ids: list[str] | None = None,
+    page_size: int = 1000,
+):
+    """Yield the rows of get_timeline_range in pages of at most `page_size`.
+
+    Rows are pulled from a single cursor as the consumer asks for them, so
+    memory use stays bounded by the page size regardless of the range.
+    """
+    await _flush_pending()
+    range_start, range_end = _range_ms(start_date, end_date)
+
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
+        cursor = await db.execute(
+            """SELECT timestamp, end_timestamp, wm_class, title, duration_secs, is_idle, device_id, ts_start, category_id
+            FROM combined_events
+            WHERE device_id IN (SELECT value FROM json_each(?))
+              AND ts_start >= ? AND ts_start < ?
+            ORDER BY ts_start""",
+            (device_json, range_start, range_end),
+        )
+        try:
+            while True:
+                rows = await cursor.fetchmany(page_size)
+                if not rows:
+                    break
+                yield [dict(r) for r in rows]
+        finally:
+            await cursor.close()
+
+
+async def get_timeline_buckets(
+    start_date: date,
+    end_date: date,
+    bucket_secs: int,
+    device_ids: list[str] | None = None,
+) -> list[dict]:
+    """Aggregate a date range's timeline into fixed buckets in one pass.
+
+    Buckets are `bucket_secs` wide and aligned to local midnight of
+    `start_date`. An event spanning several buckets is split between them.
+    Rows stream from a single cursor, so memory is bounded by the number of
+    buckets, not events. Only buckets with tracked time are returned, each
+    with its active and idle seconds, the app and category with the most
+    active time, and active seconds per category ('' is uncategorized).
+    """
+    await _flush_pending()
+    range_start, range_end = _range_ms(start_date, end_date)
+    size = bucket_secs * 1000
+    buckets: dict[int, list] = {}  # index -> [idle_ms, {app: ms}, {category: ms}]
+
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
+        cursor = await db.execute(
+            """SELECT ts_start, ts_end, wm_class, is_idle, category_id
+            FROM combined_events
+            WHERE device_id IN (SELECT value FROM json_each(?))
+              AND ts_start >= ? AND ts_start < ?""",
+            (device_json, range_start, range_end),
+        )
+        try:
+            while rows := await cursor.fetchmany(1000):
+                for ts_start, ts_end, wm_class, is_idle, category_id in rows:
+                    t = ts_start - range_start
+                    end = min(ts_end, range_end) - range_start
+                    while t < end:
+                        index = t // size
+                        span = min(end, (index + 1) * size) - t
+                        bucket = buckets.get(index)
+                        if bucket is None:
+                            bucket = buckets[index] = [0, {}, {}]
+                        if is_idle:
+                            bucket[0] += span
+                        else:
+                            bucket[1][wm_class] = bucket[1].get(wm_class, 0) + span
+                            category = category_id or ""
+                            bucket[2][category] = bucket[2].get(category, 0) + span
+                        t += span
+        finally:
+            await cursor.close()
+
+    result = []
+    for index in sorted(buckets):
+        idle_ms, apps, categories = buckets[index]
+        ts = range_start + index * size
+        result.append({
+            "start": datetime.fromtimestamp(ts / 1000).isoformat(),
+            "ts_start": ts,
+            "active_secs": round(sum(apps.values()) / 1000, 1),
+            "idle_secs": round(idle_ms / 1000, 1),
+            "app": max(apps, key=apps.get) if apps else None,
+            "category_id": max(categories, key=categories.get) if categories else None,
+            "categories": {c: round(ms / 1000, 1) for c, ms in categories.items()},
+        })
+    return result
+
+
+RAW_EVENT_COLUMNS = {
+    "events": (
+        "id", "device_id", "timestamp", "end_timestamp", "wm_class", "title",
+        "pid", "duration_secs", "is_idle", "ts_start", "ts_end",
+    ),
+    "android_events": (
+        "id", "device_id", "timestamp", "end_timestamp", "package_name",
+        "app_label", "duration_secs", "is_idle", "source_type", "domain",
+        "page_title", "browser_package", "ts_start", "ts_end", "title",
+    ),
+}
+
+_PARTITION_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+
+async def iter_raw_events(
+    table: str,
+    start_date: date,
+    end_date: date,
+    device_ids: list[str] | None = None,
+    partition: str = "day",
+    page_size: int = 10000,
+):
+    """Yield raw rows of `table` in ts_start order, in pages of `page_size`.
+
+    Each row carries a `partition` key (local day or month of ts_start, the
+    same bucketing as daily_rollups) for partitioned exports.
+    """
+    columns = RAW_EVENT_COLUMNS[table]
+    fmt = _PARTITION_FORMATS[partition]
+    await _flush_pending()
+    range_start, range_end = _range_ms(start_date, end_date)
+
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
+        cursor = await db.execute(
+            f"""SELECT {", ".join(columns)},
+                   strftime('{fmt}', ts_start / 1000, 'unixepoch', 'localtime') as partition
+            FROM {table}
+            WHERE device_id IN (SELECT value FROM json_each(?))
+              AND ts_start >= ? AND ts_start < ?
+            ORDER BY ts_start""",
+            (device_json, range_start, range_end),
+        )
+        try:
+            while True:
+                rows = await cursor.fetchmany(page_size)
+                if not rows:
+                    break
+                yield [dict(r) for r in rows]
+        finally:
+            await cursor.close()
 
 
 async def get_timeline(
@@ -542,72 +1546,52 @@ async def get_daily_totals(
     days: int = 7, device_ids: list[str] | None = None
 ) -> list[dict]:
     """Get daily usage totals over last N days (unified)."""
-    device_filter_active = device_ids is not None
-    device_json = json.dumps(device_ids or [])
-
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            """WITH combined_events AS (
-                SELECT device_id, timestamp, duration_secs, is_idle FROM events
-                UNION ALL
-                SELECT device_id, timestamp, duration_secs, is_idle FROM android_events
-            )
-            SELECT DATE(timestamp) as day,
-                   SUM(CASE WHEN is_idle = 0 THEN duration_secs ELSE 0 END) as active_secs,
-                   SUM(CASE WHEN is_idle = 1 THEN duration_secs ELSE 0 END) as idle_secs,
-                   COUNT(*) as event_count
-            FROM combined_events
-            WHERE timestamp >= DATE('now', ?)
-              AND (? = 0 OR device_id IN (SELECT value FROM json_each(?)))
-            GROUP BY DATE(timestamp)
-            ORDER BY day DESC""",
-            (f"-{days} days", int(device_filter_active), device_json),
-        )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+    today = date.today()
+    return await get_daily_totals_range(
+        today - timedelta(days=days), today, device_ids
+    )
 
 
 async def get_daily_totals_range(
     start_date: date, end_date: date, device_ids: list[str] | None = None
 ) -> list[dict]:
     """Get daily usage totals over a specific range (unified)."""
-    range_start = f"{start_date.isoformat()}T00:00:00"
-    next_day = end_date + timedelta(days=1)
-    range_end = f"{next_day.isoformat()}T00:00:00"
+    await _flush_pending()
 
-    device_filter_active = device_ids is not None
-    device_json = json.dumps(device_ids or [])
-
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
+    async with _rconn() as db:
+        device_json = await _resolve_device_ids(db, device_ids)
         cursor = await db.execute(
-            """WITH combined_events AS (
-                SELECT device_id, timestamp, duration_secs, is_idle FROM events
-                UNION ALL
-                SELECT device_id, timestamp, duration_secs, is_idle FROM android_events
-            )
-            SELECT DATE(timestamp) as day,
-                   SUM(CASE WHEN is_idle = 0 THEN duration_secs ELSE 0 END) as active_secs,
-                   SUM(CASE WHEN is_idle = 1 THEN duration_secs ELSE 0 END) as idle_secs,
-                   COUNT(*) as event_count
-            FROM combined_events
-            WHERE timestamp >= ? AND timestamp < ?
-              AND (? = 0 OR device_id IN (SELECT value FROM json_each(?)))
-            GROUP BY DATE(timestamp)
+            """SELECT day,
+                   SUM(active_secs) as active_secs,
+                   SUM(idle_secs) as idle_secs,
+                   SUM(event_count) as event_count
+            FROM daily_rollups
+            WHERE device_id IN (SELECT value FROM json_each(?))
+              AND day >= ? AND day <= ?
+            GROUP BY day
             ORDER BY day DESC""",
-            (range_start, range_end, int(device_filter_active), device_json),
+            (device_json, start_date.isoformat(), end_date.isoformat()),
         )
         rows = await cursor.fetchall()
         return [dict(r) for r in rows]
 
 
+async def rebuild_rollups() -> int:
+    """Recompute daily_rollups from the raw event tables. Returns the row count."""
+    await _flush_pending()
+    async with _aconn() as db:
+        await db.executescript(REBUILD_ROLLUPS_SQL)
+        cursor = await db.execute("SELECT COUNT(*) FROM daily_rollups")
+        row = await cursor.fetchone()
+    _touch_all()
+    return row[0]
+
+
 async def get_categories() -> list[dict]:
     """Get all categories."""
     global _category_cache
     if _category_cache is None:
-        async with _aconn() as db:
-            db.row_factory = aiosqlite.Row
+        async with _rconn() as db:
             cursor = await db.execute("SELECT * FROM categories ORDER BY name")
             rows = await cursor.fetchall()
             _category_cache = [dict(r) for r in rows]
@@ -615,6 +1599,71 @@ async def get_categories() -> list[dict]:
     return [cat.copy() for cat in _category_cache]
 
 
+def _categories_changed() -> None:
+    """Invalidate category caches after a committed change and reclassify stored events."""
+    global _category_cache, _category_version
+    _category_cache = None
+    _category_version += 1
+    _reset_timeline_log()  # logged blocks carry the old colors
+    _schedule_reclassify()
+
+
+def _schedule_reclassify() -> None:
+    global _reclassify_task
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _reclassify_task is None or _reclassify_task.done():
+        _reclassify_task = loop.create_task(_reclassify_until_current())
+
+
+async def _reclassify_until_current():
+    # Edits made while a pass is running are picked up by another pass.
+    version = None
+    while version != _category_version:
+        version = _category_version
+        try:
+            moved = await reclassify_events()
+        except Exception as e:
+            logger.error("Failed to reclassify events: %s", e)
+            return
+        if moved:
+            logger.info("Reclassified %d (app, title) pairs", moved)
+
+
+async def reclassify_events() -> int:
+    """Rewrite category_id for stored (wm_class, title) pairs whose category changed.
+
+    Returns the number of pairs moved.
+    """
+    async with _aconn() as db:
+        # Inserts classify inside their write transaction too, so once this
+        # lock is held no row can still be written with an older classifier.
+        await db.execute("BEGIN IMMEDIATE")
+        classifier = await get_classifier()
+        cursor = await db.execute(RECLASSIFY_CANDIDATES)
+        changes = _category_changes(classifier, await cursor.fetchall())
+        if changes:
+            await db.execute(RECLASSIFY_TEMP_TABLE)
+            await db.executemany("INSERT INTO temp.reclassify VALUES (?, ?, ?)", changes)
+            for statement in RECLASSIFY_STATEMENTS:
+                await db.execute(statement)
+        await db.commit()
+    if changes:
+        _touch_all()
+    return len(changes)
+
+
+async def get_classifier() -> Classifier:
+    """Classifier for the current categories, rebuilt when the category version changes."""
+    global _classifier
+    version = _category_version
+    if _classifier is None or _classifier.version != version:
+        _classifier = Classifier(await get_categories(), version)
+    return _classifier
+
+
 async def add_category(
     name: str,
     wm_class_pattern: str,
@@ -625,9 +1674,6 @@ async def add_category(
     is_case_sensitive: bool = False,
 ) -> str:
     """Add a new category and return its UUID."""
-    global _category_cache, _category_version
-    _category_cache = None
-    _category_version += 1
     cat_id = str(uuid.uuid4())
     async with _aconn() as db:
         await db.execute(
@@ -644,6 +1690,7 @@ async def add_category(
             ),
         )
         await db.commit()
+    _categories_changed()
     return cat_id
 
 
@@ -658,9 +1705,6 @@ async def update_category(
     is_case_sensitive: bool = False,
 ):
     """Update an existing category."""
-    global _category_cache, _category_version
-    _category_cache = None
-    _category_version += 1
     async with _aconn() as db:
         await db.execute(
             "UPDATE categories SET name = ?, wm_class_pattern = ?, title_pattern = ?, color = ?, daily_goal_secs = ?, daily_limit_secs = ?, is_case_sensitive = ? WHERE id = ?",
@@ -676,31 +1720,28 @@ async def update_category(
             ),
         )
         await db.commit()
+    _categories_changed()
 
 
 async def delete_category(cat_id: str) -> None:
     """Delete a category."""
-    global _category_cache, _category_version
-    _category_cache = None
-    _category_version += 1
     async with _aconn() as db:
         await db.execute("DELETE FROM categories WHERE id = ?", (cat_id,))
         await db.commit()
+    _categories_changed()
 
 
 async def clear_categories() -> None:
     """Delete all categories."""
-    global _category_cache, _category_version
-    _category_cache = None
-    _category_version += 1
     async with _aconn() as db:
         await db.execute("DELETE FROM categories")
         await db.commit()
+    _categories_changed()
 
 
 async def get_settings() -> dict[str, str]:
     """Get all settings as a dict."""
-    async with _aconn() as db:
+    async with _rconn() as db:
         cursor = await db.execute("SELECT key, value FROM settings")
         rows = await cursor.fetchall()
         return {r["key"]: r["value"] for r in rows}
@@ -708,7 +1749,7 @@ async def get_settings() -> dict[str, str]:
 
 async def get_setting(key: str, default: str = "") -> str:
     """Get a single setting."""
-    async with _aconn() as db:
+    async with _rconn() as db:
         cursor = await db.execute("SELECT value FROM settings WHERE key = ?", (key,))
         row = await cursor.fetchone()
         return row["value"] if row else default
@@ -721,17 +1762,79 @@ async def set_setting(key: str, value: str) -> None:
             "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value)
         )
         await db.commit()
+    _touch_all()  # e.g. min_app_usage_secs shapes summaries
+    _publish_settings_change("settings")
+
+
+# In-process change notifications for settings and filter rules. The API and
+# the watcher run on different event loops, so each listener is called on the
+# loop it subscribed from.
+_settings_listeners: list[tuple[asyncio.AbstractEventLoop, object]] = []
+_settings_listeners_lock = threading.Lock()
+
+
+def subscribe_settings(callback) -> object:
+    """Call `callback(kind)` on the running loop whenever settings ("settings")
+    or filter rules ("rules") change in this process. Returns an unsubscribe
+    function.
+    """
+    entry = (asyncio.get_running_loop(), callback)
+    with _settings_listeners_lock:
+        _settings_listeners.append(entry)
+
+    def unsubscribe():
+        with _settings_listeners_lock:
+            if entry in _settings_listeners:
+                _settings_listeners.remove(entry)
+
+    return unsubscribe
+
+
+def _publish_settings_change(kind: str):
+    with _settings_listeners_lock:
+        listeners = list(_settings_listeners)
+    for loop, callback in listeners:
+        try:
+            loop.call_soon_threadsafe(callback, kind)
+        except RuntimeError:
+            pass  # loop already closed
+
+
+async def data_version() -> int:
+    """PRAGMA data_version of this loop's writer connection.
+
+    It changes whenever another connection (another loop's, or another
+    process's) commits, so a cheap check tells whether anything needs
+    re-reading.
+    """
+    async with _aconn() as db:
+        cursor = await db.execute("PRAGMA data_version")
+        return (await cursor.fetchone())[0]
 
 
 async def get_filter_rules() -> list[dict]:
     """Get all filter rules."""
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
+    async with _rconn() as db:
         cursor = await db.execute("SELECT * FROM filter_rules")
         rows = await cursor.fetchall()
         return [dict(r) for r in rows]
 
 
+async def get_filter_rule_set() -> FilterRules:
+    """Compiled filter rules, rebuilt when rules are added or deleted."""
+    global _filter_rules
+    version = _filter_rules_version
+    if _filter_rules is None or _filter_rules.version != version:
+        _filter_rules = FilterRules(await get_filter_rules(), version)
+    return _filter_rules
+
+
+def _filter_rules_changed():
+    global _filter_rules_version
+    _filter_rules_version += 1
+    _publish_settings_change("rules")
+
+
 async def add_filter_rule(
     rule_type: str, wm_class_pattern: str = "", title_pattern: str = ""
 ) -> str:
@@ -743,6 +1846,7 @@ async def add_filter_rule(
             (rule_id, rule_type, wm_class_pattern, title_pattern),
         )
         await db.commit()
+    _filter_rules_changed()
     return rule_id
 
 
@@ -751,65 +1855,222 @@ async def delete_filter_rule(rule_id: str) -> None:
     async with _aconn() as db:
         await db.execute("DELETE FROM filter_rules WHERE id = ?", (rule_id,))
         await db.commit()
+    _filter_rules_changed()
+
+
+def _android_title(event: dict) -> str:
+    """Python twin of ANDROID_TITLE_SQL."""
+    app_label = event.get("app_label", "")
+    if event.get("source_type", "APP") == "BROWSER_TAB":
+        return event.get("page_title") or event.get("domain") or app_label
+    return app_label
+
+
+_ANDROID_UPSERT_SQL = """INSERT INTO android_events
+   (id, device_id, timestamp, end_timestamp, package_name, app_label, duration_secs, is_idle, source_type, domain, page_title, browser_package, ts_start, ts_end, title, category_id)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+   ON CONFLICT(device_id, id) DO UPDATE SET
+       timestamp = excluded.timestamp,
+       end_timestamp = excluded.end_timestamp,
+       package_name = excluded.package_name,
+       app_label = excluded.app_label,
+       duration_secs = excluded.duration_secs,
+       is_idle = excluded.is_idle,
+       source_type = excluded.source_type,
+       domain = excluded.domain,
+       page_title = excluded.page_title,
+       browser_package = excluded.browser_package,
+       ts_start = excluded.ts_start,
+       ts_end = excluded.ts_end,
+       title = excluded.title,
+       category_id = excluded.category_id"""
+
+_DEVICE_UPSERT_SQL = """INSERT INTO devices (id, name, platform, last_seen)
+   VALUES (?, ?, ?, ?)
+   ON CONFLICT(id) DO UPDATE SET
+   name = CASE WHEN ? != '' THEN ? ELSE name END,
+   platform = ?,
+   last_seen = ?"""
+
+
+def _android_row(e: dict, classifier: Classifier) -> tuple:
+    title = _android_title(e)
+    return (
+        e["id"],
+        e.get("device_id", ""),
+        e["timestamp"],
+        e["end_timestamp"],
+        e["package_name"],
+        e.get("app_label", ""),
+        e["duration_secs"],
+        int(e.get("is_idle", False)),
+        e.get("source_type", "APP"),
+        e.get("domain", ""),
+        e.get("page_title", ""),
+        e.get("browser_package", ""),
+        _to_epoch_ms(e["timestamp"]),
+        _to_epoch_ms(e["end_timestamp"]),
+        title,
+        _category_id(classifier, e["package_name"], title),
+    )
+
+
+def _filter_android(e: dict, rules: FilterRules) -> dict | None:
+    """Apply filter rules to an Android event: None if ignored, else the (redacted) event."""
+    action = rules.evaluate(e["package_name"], _android_title(e))
+    if action == "ignore":
+        return None
+    if action == "redact":
+        if e.get("source_type", "APP") == "BROWSER_TAB":
+            return {**e, "page_title": REDACTED, "domain": ""}
+        return {**e, "app_label": REDACTED}
+    return e
+
+
+def _device_params(device_id: str, name: str, platform: str) -> tuple:
+    now = datetime.now().isoformat()
+    return (device_id, name, platform, now, name, name, platform, now)
 
 
 async def sync_android_day(day: str, events: list[dict]) -> int:
     """Insert or update android_events for a given date.
     `day` is an ISO date string like '2026-02-25'.
-    Returns the number of rows inserted.
+    Events matching an ignore rule are dropped. Returns the number of rows
+    inserted.
     """
+    rules = await get_filter_rule_set()
+    kept = [k for k in (_filter_android(e, rules) for e in events) if k is not None]
     async with _aconn() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        classifier = await get_classifier()
         await db.executemany(
-            """INSERT OR REPLACE INTO android_events
-               (id, device_id, timestamp, end_timestamp, package_name, app_label, duration_secs, is_idle, source_type, domain, page_title, browser_package)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            _ANDROID_UPSERT_SQL, [_android_row(e, classifier) for e in kept]
+        )
+        await db.commit()
+    _touch_days(day, *(ts for e in kept for ts in (e["timestamp"], e["end_timestamp"])))
+    return len(kept)
+
+
+async def sync_android_events(
+    device_id: str, device_name: str, events: list[dict], delta: bool = False
+) -> dict:
+    """Upsert a batch of Android events and advance the device's sync mark.
+
+    Registering the device, the upsert and the mark update commit as one
+    transaction. With `delta`, events ending at or before the stored mark are
+    skipped, so a client may resend overlapping windows cheaply. Filter rules
+    apply as on the desktop; filtered events still advance the mark.
+    """
+    results = await sync_android_devices(device_name, {device_id: events}, delta)
+    return results[device_id]
+
+
+async def sync_android_devices(
+    device_name: str, events_by_device: dict[str, list[dict]], delta: bool = False
+) -> dict[str, dict]:
+    """sync_android_events for several devices in a single transaction.
+
+    Each event is stored under its device; returns the result per device.
+    """
+    rules = await get_filter_rule_set()
+    results = {}
+    touched = []
+    async with _aconn() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        classifier = await get_classifier()
+        for device_id, events in events_by_device.items():
+            await db.execute(_DEVICE_UPSERT_SQL, _device_params(device_id, device_name, "Android"))
+            cursor = await db.execute("SELECT sync_mark FROM devices WHERE id = ?", (device_id,))
+            mark = (await cursor.fetchone())[0]
+
+            ends = [_to_epoch_ms(e["end_timestamp"]) for e in events]
+            fresh = [i for i, end in enumerate(ends) if not delta or end > mark]
+            kept = [
+                k for k in (_filter_android({**events[i], "device_id": device_id}, rules) for i in fresh)
+                if k is not None
+            ]
+            if kept:
+                await db.executemany(
+                    _ANDROID_UPSERT_SQL, [_android_row(e, classifier) for e in kept]
+                )
+            if fresh:
+                mark = max(mark, max(ends[i] for i in fresh))
+                await db.execute(
+                    "UPDATE devices SET sync_mark = ? WHERE id = ?", (mark, device_id)
+                )
+            touched.extend(ts for e in kept for ts in (e["timestamp"], e["end_timestamp"]))
+            results[device_id] = {
+                "accepted": len(kept),
+                "skipped": len(events) - len(fresh),
+                "filtered": len(fresh) - len(kept),
+                "sync_mark": mark,
+            }
+        await db.commit()
+    _touch_days(*touched)
+    return results
+
+
+async def get_sync_mark(device_id: str) -> int:
+    """Return the max ts_end (epoch ms) synced from a device, 0 if none."""
+    async with _rconn() as db:
+        cursor = await db.execute("SELECT sync_mark FROM devices WHERE id = ?", (device_id,))
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def import_events(events: list[dict]) -> int:
+    """Insert or update desktop events by (device_id, id), keeping their device.
+
+    The desktop counterpart of sync_android_day, used by bulk imports.
+    """
+    async with _aconn() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        classifier = await get_classifier()
+        await db.executemany(
+            """INSERT INTO events
+               (id, device_id, timestamp, end_timestamp, wm_class, title, pid, duration_secs, is_idle, ts_start, ts_end, category_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(device_id, id) DO UPDATE SET
+                   timestamp = excluded.timestamp,
+                   end_timestamp = excluded.end_timestamp,
+                   wm_class = excluded.wm_class,
+                   title = excluded.title,
+                   pid = excluded.pid,
+                   duration_secs = excluded.duration_secs,
+                   is_idle = excluded.is_idle,
+                   ts_start = excluded.ts_start,
+                   ts_end = excluded.ts_end,
+                   category_id = excluded.category_id""",
             [(
                 e["id"],
                 e.get("device_id", ""),
                 e["timestamp"],
                 e["end_timestamp"],
-                e["package_name"],
-                e.get("app_label", ""),
+                e.get("wm_class", ""),
+                e.get("title", ""),
+                int(e.get("pid", 0)),
                 e["duration_secs"],
                 int(e.get("is_idle", False)),
-                e.get("source_type", "APP"),
-                e.get("domain", ""),
-                e.get("page_title", ""),
-                e.get("browser_package", "")
+                _to_epoch_ms(e["timestamp"]),
+                _to_epoch_ms(e["end_timestamp"]),
+                _category_id(classifier, e.get("wm_class", ""), e.get("title", "")),
             ) for e in events]
         )
         await db.commit()
+    _touch_days(*(ts for e in events for ts in (e["timestamp"], e["end_timestamp"])))
     return len(events)
 
 
 async def update_device(device_id: str, name: str, platform: str):
     """Register or update a device info."""
     async with _aconn() as db:
-        await db.execute(
-            """INSERT INTO devices (id, name, platform, last_seen)
-               VALUES (?, ?, ?, ?)
-               ON CONFLICT(id) DO UPDATE SET
-               name = CASE WHEN ? != '' THEN ? ELSE name END,
-               platform = ?,
-               last_seen = ?""",
-            (
-                device_id,
-                name,
-                platform,
-                datetime.now().isoformat(),
-                name,
-                name,
-                platform,
-                datetime.now().isoformat(),
-            ),
-        )
+        await db.execute(_DEVICE_UPSERT_SQL, _device_params(device_id, name, platform))
         await db.commit()
 
 
 async def get_devices() -> list[dict]:
     """Get all unique devices tracked."""
-    async with _aconn() as db:
-        db.row_factory = aiosqlite.Row
+    async with _rconn() as db:
         local_id = get_device_id()
 
         # Prefer names from 'devices' table, fallback to platform, then hardcoded defaults
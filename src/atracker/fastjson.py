@@ -0,0 +1,35 @@
+"""Fast JSON encoding for large API responses.
+
+orjson is used when it is installed (the `fastjson` extra), the standard
+library's compact encoder otherwise. Either way a `FastJSONResponse` skips
+FastAPI's `jsonable_encoder` walk over every row, which is most of the cost
+of returning a day of events. `columnar()` is the compact shape: column
+names once, then each row as a plain list straight from SQLite.
+"""
+
+import json
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """Encode `content` (dicts, lists, tuples, str/int/float/bool/None) as UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def columnar(columns: list[str], rows: list[tuple]) -> dict:
+    return {"columns": columns, "rows": rows}
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
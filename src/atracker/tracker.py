@@ -0,0 +1,689 @@
+"""Platform-independent tracking engine.
+
+A WindowSource answers polls for the active window and idle time, and may
+push changes (window switches, idle transitions) through `events()`.
+TrackerCore turns both into events: idle and pause handling, time-jump
+detection, filter rules and write-behind flushing live here once for every
+platform. ReplaySource feeds the engine a scripted timeline for tests and
+benchmarks.
+"""
+
+import asyncio
+import logging
+import signal
+from collections.abc import AsyncIterator, Iterable
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Protocol
+
+from atracker import db
+from atracker.api import broadcast_event, live_row, live_updates_enabled
+from atracker.classify import REDACTED, FilterRules
+from atracker.config import config
+from atracker.journal import InflightJournal
+
+logger = logging.getLogger("atracker.tracker")
+
+DEFAULT_POLL_INTERVAL = config.poll_interval  # seconds
+DEFAULT_IDLE_THRESHOLD = config.idle_threshold * 1000  # milliseconds
+MAX_MISSING_WINDOW_SECS = 60
+
+# Pushed changes waiting for the engine; a fast source blocks beyond this
+CHANGE_QUEUE_SIZE = 1024
+
+# How often edits made by other processes are looked for (PRAGMA data_version)
+SETTINGS_FALLBACK_SECS = 60
+
+
+class Change(NamedTuple):
+    """A pushed change: kind is "window", "idle", "active" or "state".
+
+    "state" carries no data; the source's `pushes_*` flags changed and the
+    engine should re-plan its polling. The engine itself queues "settings"
+    to wake up when settings or filter rules were edited.
+    """
+
+    at: datetime
+    kind: str
+    window: dict | None = None
+
+
+class WindowSource(Protocol):
+    """Where a TrackerCore gets window and idle information from.
+
+    The `pushes_*` flags say which changes currently arrive through
+    `events()` and so need not be polled for: window switches, entering idle,
+    and leaving idle. A source that is not `realtime` runs on its own
+    timeline: the engine takes "now" from its changes and never polls it.
+    """
+
+    name: str
+    realtime: bool
+
+    @property
+    def pushes_windows(self) -> bool: ...
+
+    @property
+    def pushes_idle(self) -> bool: ...
+
+    @property
+    def pushes_return(self) -> bool: ...
+
+    async def start(self) -> None: ...
+
+    async def stop(self) -> None: ...
+
+    def events(self) -> AsyncIterator[Change]: ...
+
+    async def maintain(self, idle_threshold: int, is_idle: bool) -> None:
+        """Before each poll and on entering idle: re-subscribe, re-arm watches."""
+        ...
+
+    async def get_active_window(self) -> dict | None: ...
+
+    async def get_idle_time(self) -> int: ...
+
+
+class TrackerCore:
+    """Records events from a WindowSource."""
+
+    def __init__(
+        self,
+        source: WindowSource,
+        poll_interval=None,
+        idle_threshold=None,
+        journal: InflightJournal | None = None,
+    ):
+        self.source = source
+        self._journal = journal
+        self._running = False
+        self._current_wm_class = ""
+        self._current_title = ""
+        self._current_pid = 0
+        self._current_start: datetime | None = None
+        self._last_poll_time: datetime | None = None
+        self._is_idle = False
+        self._missing_window_since: datetime | None = None
+        self._filter_rules = FilterRules([])
+        self._stop_event = asyncio.Event()
+        self._stop_requested = False
+        self._writer_task: asyncio.Task | None = None
+        self._broadcast_seq = db.timeline_seq()
+
+        self._changes: asyncio.Queue[Change] = asyncio.Queue(maxsize=CHANGE_QUEUE_SIZE)
+        self._pump_task: asyncio.Task | None = None
+        self._source_done = False
+        self._replay_time = datetime.min
+        self._last_idle_ms = 0
+        self._wait_timeout: float | None = 0.0
+
+        # Configuration
+        self._poll_interval = poll_interval or DEFAULT_POLL_INTERVAL
+        self._safety_poll_interval = max(config.safety_poll_interval, self._poll_interval)
+        self._idle_threshold = idle_threshold or DEFAULT_IDLE_THRESHOLD
+        self._last_settings_refresh = 0
+        self._settings_stale = True
+        self._data_version: int | None = None
+        self._unsubscribe_settings = None
+        self._manual_poll = poll_interval is not None
+        self._manual_idle = idle_threshold is not None
+
+    def _now(self) -> datetime:
+        return datetime.now() if self.source.realtime else self._replay_time
+
+    async def start(self, handle_signals: bool = True):
+        """Run the tracking loop until stopped or the source runs out of changes."""
+        logger.info("Initializing database...")
+        await db.init_db()
+        await self.source.start()
+        await self._refresh_settings()
+        await self._recover_inflight()
+
+        self._running = True
+        now = self._now()
+        self._current_start = now
+        self._last_poll_time = now
+
+        # Batched, write-behind event inserts
+        self._writer_task = asyncio.create_task(db.get_event_queue().run())
+        self._pump_task = asyncio.create_task(self._pump())
+        self._unsubscribe_settings = db.subscribe_settings(self._on_settings_changed)
+
+        loop = asyncio.get_running_loop()
+        signals = ()
+        if handle_signals:
+            try:
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    loop.add_signal_handler(sig, self._request_stop)
+                signals = (signal.SIGINT, signal.SIGTERM)
+            except NotImplementedError:
+                # add_signal_handler is not implemented on Windows ProactorEventLoop
+                pass
+
+        await self.source.maintain(self._idle_threshold, False)
+        logger.info(
+            "Watcher started (%s) — %s, idle threshold %ds (%s)",
+            self.source.name,
+            "windows pushed"
+            if self.source.pushes_windows
+            else f"polling every {self._poll_interval}s",
+            self._idle_threshold // 1000,
+            "pushed" if self.source.pushes_idle else "polled",
+        )
+
+        next_poll = 0.0 if self.source.realtime else None
+        while self._running and not self._stop_requested:
+            # Periodically refresh settings from DB
+            await self._refresh_settings()
+
+            # Check for time jumps (suspend/resume): a wake-up far later than
+            # the wait we asked for. Unbounded idle waits can't tell.
+            now = self._now()
+            if self.source.realtime and self._last_poll_time and self._wait_timeout is not None:
+                delta = (now - self._last_poll_time).total_seconds()
+                if delta > self._wait_timeout + self._poll_interval * 3:
+                    logger.warning(
+                        "Time jump detected (%.1fs). Ending previous event at %s.",
+                        delta,
+                        self._last_poll_time,
+                    )
+                    await self._flush_current_event(end_time=self._last_poll_time)
+                    self._current_start = now
+                    next_poll = 0.0
+
+            if next_poll is not None and loop.time() >= next_poll:
+                try:
+                    await self._poll()
+                except Exception:
+                    logger.exception("Poll error (will retry)")
+                delay = self._next_poll_delay()
+                next_poll = None if delay is None else loop.time() + delay
+            self._last_poll_time = self._now()
+            self._checkpoint()
+
+            self._wait_timeout = (
+                None if next_poll is None else max(0.0, next_poll - loop.time())
+            )
+            change = await self._next_change(self._wait_timeout)
+            if change is not None:
+                try:
+                    await self._on_change(change)
+                except Exception:
+                    logger.exception("Error handling %s change", change.kind)
+                self._last_poll_time = self._now()
+                self._checkpoint()
+                if next_poll is None:
+                    delay = self._next_poll_delay()
+                    next_poll = None if delay is None else loop.time() + delay
+            elif self._source_done and self._changes.empty():
+                break
+
+        # Stopped here rather than in the signal handler, so that the whole
+        # shutdown (flush, source.stop()) finishes before start() returns
+        await self.stop()
+        for sig in signals:
+            loop.remove_signal_handler(sig)
+
+    def _request_stop(self):
+        """SIGINT/SIGTERM: end the tracking loop; start() then stops cleanly."""
+        self._stop_requested = True
+        self._stop_event.set()
+
+    async def _pump(self):
+        """Move the source's pushed changes onto the engine's queue."""
+        try:
+            async for change in self.source.events():
+                await self._changes.put(change)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Window source %s failed", self.source.name)
+        self._source_done = True
+        self._stop_event.set()
+
+    def _next_poll_delay(self) -> float | None:
+        """Seconds until the next poll is needed (None: only pushed changes)."""
+        if not self.source.realtime:
+            return None
+        if db.get_paused():
+            return self._poll_interval
+        if self._is_idle:
+            # With a return watch armed nothing needs polling while away
+            return None if self.source.pushes_return else self._poll_interval
+        if self.source.pushes_idle:
+            until_idle = self._safety_poll_interval
+        else:
+            # Poll just after the earliest moment idle could begin
+            until_idle = (self._idle_threshold - self._last_idle_ms) / 1000 + 0.5
+        if not self.source.pushes_windows:
+            return self._poll_interval
+        # Switches and title changes are pushed; poll as a safety net.
+        return max(1.0, min(self._safety_poll_interval, until_idle))
+
+    async def _next_change(self, timeout: float | None) -> Change | None:
+        """Wait up to `timeout` seconds (None: indefinitely) for a pushed change (or stop)."""
+        if not self._changes.empty():
+            return self._changes.get_nowait()
+        if self._stop_event.is_set():
+            return None
+        getter = asyncio.ensure_future(self._changes.get())
+        stopper = asyncio.ensure_future(self._stop_event.wait())
+        try:
+            await asyncio.wait(
+                (getter, stopper), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            stopper.cancel()
+            if not getter.done():
+                getter.cancel()
+        if getter.done() and not getter.cancelled():
+            return getter.result()
+        return None
+
+    async def _on_change(self, change: Change):
+        """Apply a pushed window switch or idle transition."""
+        if change.kind == "settings":
+            return  # applied by _refresh_settings at the top of the loop
+        at = change.at
+        if not self.source.realtime:
+            self._replay_time = max(self._replay_time, at)
+        if change.kind == "state":
+            return
+        if change.kind == "idle":
+            if not self._is_idle and not db.get_paused():
+                await self._enter_idle(at)
+            return
+        if change.kind == "active":
+            if self._is_idle:
+                await self._leave_idle(at)
+                win_info = change.window or await self.source.get_active_window()
+                if win_info is not None:
+                    await self._apply_window(win_info, at)
+            return
+        if self._is_idle and self.source.pushes_idle:
+            return  # leaving idle is pushed too
+        if db.get_paused() or self._is_idle:
+            # A full poll handles leaving idle/pause
+            await self._poll()
+            return
+        await self._apply_window(change.window, at)
+
+    async def _enter_idle(self, since: datetime):
+        """Flush the active event and start an idle event at `since`."""
+        if self._current_start and since < self._current_start:
+            since = self._current_start
+        await self._flush_current_event(end_time=since)
+        self._is_idle = True
+        self._current_wm_class = "__idle__"
+        self._current_title = "Idle"
+        self._current_pid = 0
+        self._current_start = since
+        await self._publish_state()
+        await self._broadcast("idle")
+        logger.debug("User went idle at %s", since)
+        if self.source.pushes_idle:
+            await self.source.maintain(self._idle_threshold, True)
+
+    async def _leave_idle(self, at: datetime):
+        """Flush the idle event, ending it at `at`."""
+        if self._current_start and at < self._current_start:
+            at = self._current_start
+        self._is_idle = False
+        await self._flush_current_event(end_time=at)
+        self._current_wm_class = ""
+        self._current_title = ""
+        await self._broadcast("resume")
+        logger.debug("User returned from idle at %s", at)
+
+    def _on_settings_changed(self, kind: str):
+        """Settings or filter rules were edited in this process: apply them now."""
+        self._settings_stale = True
+        try:
+            self._changes.put_nowait(Change(datetime.now(), "settings"))
+        except asyncio.QueueFull:
+            pass  # the loop is busy and will see the flag anyway
+
+    async def _refresh_settings(self):
+        """Reload poll_interval, idle_threshold and filter rules when they changed.
+
+        In-process edits are published and applied right away; edits from
+        other processes are picked up within SETTINGS_FALLBACK_SECS when the
+        database's data_version moved.
+        """
+        now = datetime.now().timestamp()
+        if not self._settings_stale and now - self._last_settings_refresh < SETTINGS_FALLBACK_SECS:
+            return
+
+        try:
+            version = await db.data_version()
+            if not self._settings_stale and version == self._data_version:
+                return
+            self._settings_stale = False
+            self._data_version = version
+
+            settings = await db.get_settings()
+            if not self._manual_poll and "poll_interval" in settings:
+                new_interval = int(settings["poll_interval"])
+                if new_interval != self._poll_interval:
+                    logger.info(
+                        "Settings updated from DB: poll_interval = %ds", new_interval
+                    )
+                    self._poll_interval = new_interval
+            if not self._manual_idle and "idle_threshold" in settings:
+                # Dashboard saves idle_threshold in seconds
+                new_threshold = int(settings["idle_threshold"]) * 1000
+                if new_threshold != self._idle_threshold:
+                    logger.info(
+                        "Settings updated from DB: idle_threshold = %ds",
+                        new_threshold // 1000,
+                    )
+                    self._idle_threshold = new_threshold
+                    await self.source.maintain(new_threshold, self._is_idle)
+
+            # Refresh filter rules; recompile only when they changed
+            rules = await db.get_filter_rules()
+            if rules != self._filter_rules.rules:
+                self._filter_rules = FilterRules(rules)
+        except Exception as e:
+            logger.error("Failed to refresh settings: %s", e)
+            self._data_version = None  # retry on the next fallback check
+        finally:
+            self._last_settings_refresh = now
+
+    async def stop(self):
+        """Stop the watcher and flush the current event."""
+        if not self._running:
+            return
+        logger.info("Stopping watcher...")
+        self._running = False
+        self._stop_event.set()
+        if self._unsubscribe_settings is not None:
+            self._unsubscribe_settings()
+            self._unsubscribe_settings = None
+        await self._flush_current_event()
+        db.set_current_state()
+        for task in (self._pump_task, self._writer_task):
+            if task is None:
+                continue
+            # Cancelling the writer drains whatever is still buffered
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._pump_task = self._writer_task = None
+        await db.flush_events()
+        if self._journal is not None:
+            self._journal.clear()
+            self._journal.close()
+        await self.source.stop()
+        logger.info("Watcher stopped.")
+
+    def _checkpoint(self):
+        """Journal the in-flight event so a crash loses at most one poll of it."""
+        if self._journal is None or not self._running:
+            return
+        if not self._current_wm_class or self._current_start is None:
+            self._journal.write(None)
+            return
+        self._journal.write(
+            {
+                "timestamp": self._current_start.isoformat(),
+                "last_seen": self._now().isoformat(),
+                "wm_class": self._current_wm_class,
+                "title": self._current_title,
+                "pid": self._current_pid,
+            }
+        )
+
+    async def _recover_inflight(self):
+        """Record the event a crashed watcher was tracking, up to its last checkpoint."""
+        if self._journal is None:
+            return
+        try:
+            self._journal.open()
+        except OSError as e:
+            logger.warning("In-flight journal unavailable (%s), continuing without it", e)
+            self._journal = None
+            return
+        record = self._journal.read()
+        if not record:
+            return
+        try:
+            if await db.event_started_at(record["timestamp"]):
+                # Flushed before the journal moved on
+                logger.debug("In-flight event already recorded")
+            else:
+                self._current_wm_class = record["wm_class"]
+                self._current_title = record["title"]
+                self._current_pid = record["pid"]
+                self._current_start = datetime.fromisoformat(record["timestamp"])
+                await self._flush_current_event(
+                    end_time=datetime.fromisoformat(record["last_seen"])
+                )
+                await db.flush_events()
+                logger.info(
+                    "Recovered in-flight event: %s from %s to %s",
+                    record["wm_class"],
+                    record["timestamp"],
+                    record["last_seen"],
+                )
+        except Exception:
+            logger.exception("Could not recover the in-flight event")
+        finally:
+            self._current_wm_class = ""
+            self._current_title = ""
+            self._current_pid = 0
+            self._current_start = None
+        self._journal.clear()
+
+    async def _poll(self):
+        """Poll active window and idle state."""
+        # Check if paused
+        if db.get_paused():
+            # If we were tracking something, flush it
+            if self._current_wm_class != "__paused__":
+                await self._flush_current_event()
+                self._current_wm_class = "__paused__"
+                self._current_title = "Paused"
+                self._current_start = self._now()
+                await self._publish_state()
+                broadcast_event({"type": "pause_state", "is_paused": True})
+            return
+
+        # Idle state: pushed by the source when it can, otherwise polled and
+        # back-dated to the threshold crossing / last input
+        at = self._now()
+        await self.source.maintain(self._idle_threshold, self._is_idle)
+        if self.source.pushes_idle:
+            if self._is_idle:
+                return  # Still idle, nothing to do
+        else:
+            idle_ms = await self.source.get_idle_time()
+            self._last_idle_ms = idle_ms
+            if idle_ms > self._idle_threshold:
+                if not self._is_idle:
+                    crossed = at - timedelta(milliseconds=idle_ms - self._idle_threshold)
+                    await self._enter_idle(crossed)
+                return  # Still idle, nothing to do
+            if self._is_idle:
+                at -= timedelta(milliseconds=idle_ms)
+                await self._leave_idle(at)
+
+        # Get active window
+        win_info = await self.source.get_active_window()
+        if win_info is None:
+            if self._missing_window_since is None:
+                self._missing_window_since = self._now()
+            else:
+                missing_secs = (self._now() - self._missing_window_since).total_seconds()
+                if missing_secs >= MAX_MISSING_WINDOW_SECS:
+                    # Avoid extremely long events if window info disappears.
+                    await self._flush_current_event()
+                    self._current_wm_class = ""
+                    self._current_title = ""
+                    self._current_pid = 0
+                    self._current_start = self._now()
+                    await self._publish_state()
+            return
+        else:
+            self._missing_window_since = None
+
+        await self._apply_window(win_info, at)
+
+    async def _apply_window(self, win_info: dict, at: datetime):
+        """Start a new event at `at` if the window differs from the current one."""
+        wm_class = win_info.get("wm_class", "")
+        title = win_info.get("title", "")
+        pid = win_info.get("pid", 0)
+
+        # Window changed?
+        if wm_class != self._current_wm_class or title != self._current_title:
+            if self._current_start and at < self._current_start:
+                at = self._current_start  # a pushed change handled after a later poll
+            await self._flush_current_event(end_time=at)
+            self._current_wm_class = wm_class
+            self._current_title = title
+            self._current_pid = pid
+            self._current_start = at
+            await self._publish_state()
+            await self._broadcast("activity")
+            logger.debug("Window changed: %s — %s", wm_class, title)
+
+    async def _broadcast(self, kind: str):
+        """Send dashboards the blocks recorded since the last message and the live row.
+
+        `since`/`seq` let a client that missed a message (coalesced, or
+        reconnecting) fetch `/api/timeline?since=...` instead.
+        """
+        if not live_updates_enabled():
+            return
+        since = self._broadcast_seq
+        seq, blocks = db.timeline_since(since)
+        self._broadcast_seq = seq
+        message = {
+            "type": kind,
+            "date": date.today().isoformat(),
+            "since": since,
+            "seq": seq,
+            "device_id": db.get_device_id(),
+            "current": await live_row(db.get_current_state()),
+        }
+        if blocks is not None:
+            message["blocks"] = blocks
+        broadcast_event(message)
+
+    async def _publish_state(self):
+        """Publish the current event as the snapshot the API merges in.
+
+        It is classified here, once per change, and filter rules apply to it
+        as they will to the stored event.
+        """
+        wm_class = self._current_wm_class
+        title = self._current_title
+        if wm_class in ("__idle__", "__paused__"):
+            db.set_current_state(
+                wm_class,
+                title,
+                self._current_start,
+                is_idle=wm_class == "__idle__",
+                category_version=db.get_category_version(),
+            )
+            return
+        action = self._filter_rules.evaluate(wm_class, title) if wm_class else "ignore"
+        if action == "ignore":
+            db.set_current_state()
+            return
+        if action == "redact":
+            title = REDACTED
+        classifier = await db.get_classifier()
+        db.set_current_state(
+            wm_class,
+            title,
+            self._current_start,
+            category_id=classifier.match(wm_class, title)["id"] or "",
+            category_version=classifier.version,
+        )
+
+    async def _flush_current_event(self, end_time: datetime | None = None):
+        """Save the current tracked event to the database."""
+        if self._current_start is None or not self._current_wm_class:
+            self._current_start = end_time or self._now()
+            return
+
+        now = end_time or self._now()
+        duration = (now - self._current_start).total_seconds()
+
+        if duration < 1:
+            return  # Skip sub-second events
+
+        wm_class = self._current_wm_class
+        title = self._current_title
+
+        # Special cases (idle, paused) don't get filtered
+        if wm_class not in ("__idle__", "__paused__"):
+            if self._settings_stale:
+                await self._refresh_settings()  # a rule edited since the last refresh
+            action = self._filter_rules.evaluate(wm_class, title)
+            if action == "ignore":
+                logger.debug("Ignoring event (matched a filter rule)")
+                self._current_start = now
+                return
+            elif action == "redact":
+                logger.debug("Redacting event (matched a filter rule)")
+                title = REDACTED
+
+        await db.queue_event(
+            timestamp=self._current_start.isoformat(),
+            end_timestamp=now.isoformat(),
+            wm_class=wm_class,
+            title=title,
+            pid=self._current_pid,
+            duration_secs=round(duration, 1),
+            is_idle=wm_class == "__idle__",
+        )
+        logger.debug(
+            "Recorded: %s — %.1fs %s",
+            self._current_wm_class,
+            duration,
+            "(idle)" if self._current_wm_class == "__idle__" else "",
+        )
+        self._current_start = now
+
+
+class ReplaySource:
+    """Deterministic source replaying a scripted sequence of changes.
+
+    Everything is pushed and the engine runs on the script's timeline, as fast
+    as it can; it stops once the script is exhausted.
+    """
+
+    name = "replay"
+    realtime = False
+    pushes_windows = True
+    pushes_idle = True
+    pushes_return = True
+
+    def __init__(self, changes: Iterable[Change]):
+        self._changes = changes
+        self.window: dict | None = None
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def events(self) -> AsyncIterator[Change]:
+        for change in self._changes:
+            if change.window is not None:
+                self.window = change.window
+            yield change
+
+    async def maintain(self, idle_threshold: int, is_idle: bool):
+        pass
+
+    async def get_active_window(self) -> dict | None:
+        return self.window
+
+    async def get_idle_time(self) -> int:
+        return 0
@@ -1,380 +1,333 @@
-"""Core watcher daemon — polls active window and detects idle state."""
+"""GNOME watcher — follows the active window and idle state over D-Bus.
+
+With the GNOME extension running, window switches arrive as
+ActiveWindowChanged signals and are recorded at the moment they happen; the
+poll loop then only runs as a slow safety net. Without it, the watcher polls
+every `poll_interval` seconds, taking windows from an event-driven X11
+helper (see atracker.x11) where one is available. The state machine itself
+is the shared TrackerCore (see atracker.tracker).
+"""
 
 import asyncio
 import json
 import logging
-import signal
-import sys
-import re
-from datetime import datetime
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
 
 from dbus_next.aio import MessageBus
-from dbus_next import BusType, Variant
+from dbus_next import BusType, Message, MessageType
 
 from atracker import db
 from atracker.config import config
-from atracker.api import broadcast_event
+from atracker.journal import InflightJournal
+from atracker.tracker import Change, TrackerCore
+from atracker.x11 import X11ActiveWindow
 
 logger = logging.getLogger("atracker.watcher")
 
-DEFAULT_POLL_INTERVAL = config.poll_interval  # seconds
-DEFAULT_IDLE_THRESHOLD = config.idle_threshold * 1000  # milliseconds
-MAX_MISSING_WINDOW_SECS = 60
+TRACKER_BUS_NAME = "org.atracker.WindowTracker"
+TRACKER_PATH = "/org/atracker/WindowTracker"
+IDLE_MONITOR_BUS_NAME = "org.gnome.Mutter.IdleMonitor"
+IDLE_MONITOR_PATH = "/org/gnome/Mutter/IdleMonitor/Core"
+
+
+class DBusProxyCache:
+    """Introspects each remote object once and reuses its proxy interface.
+
+    Entries for a bus name are dropped when its owner changes (extension
+    reload, gnome-shell restart), which the bus reports with NameOwnerChanged.
+    Listeners registered with `watch()` are told about the new owner ("" when
+    the name went away).
+    """
+
+    def __init__(self, bus: MessageBus):
+        self._bus = bus
+        self._interfaces: dict[tuple[str, str, str], object] = {}
+        self._listeners: dict[str, list] = {}
+        self._bus.add_message_handler(self._on_message)
+
+    async def watch(self, bus_name: str, listener=None):
+        """Follow owner changes of `bus_name` (only its NameOwnerChanged is matched)."""
+        if bus_name not in self._listeners:
+            self._listeners[bus_name] = []
+            await self._bus.call(
+                Message(
+                    destination="org.freedesktop.DBus",
+                    path="/org/freedesktop/DBus",
+                    interface="org.freedesktop.DBus",
+                    member="AddMatch",
+                    signature="s",
+                    body=[
+                        "type='signal',sender='org.freedesktop.DBus',"
+                        "interface='org.freedesktop.DBus',member='NameOwnerChanged',"
+                        f"arg0='{bus_name}'"
+                    ],
+                )
+            )
+        if listener is not None:
+            self._listeners[bus_name].append(listener)
+
+    async def interface(self, bus_name: str, path: str, interface: str):
+        key = (bus_name, path, interface)
+        iface = self._interfaces.get(key)
+        if iface is None:
+            introspection = await self._bus.introspect(bus_name, path)
+            proxy = self._bus.get_proxy_object(bus_name, path, introspection)
+            iface = self._interfaces[key] = proxy.get_interface(interface)
+        return iface
+
+    def invalidate(self, bus_name: str):
+        for key in [k for k in self._interfaces if k[0] == bus_name]:
+            del self._interfaces[key]
+
+    def _on_message(self, msg: Message):
+        if (
+            msg.message_type == MessageType.SIGNAL
+            and msg.member == "NameOwnerChanged"
+            and msg.sender == "org.freedesktop.DBus"
+            and msg.body
+            and msg.body[0] in self._listeners
+        ):
+            name, _, new_owner = msg.body
+            logger.debug("Owner of %s changed to %r", name, new_owner)
+            self.invalidate(name)
+            for listener in self._listeners[name]:
+                listener(new_owner)
+        return None
+
+
+class GnomeSource:
+    """Window and idle information from the GNOME extension and Mutter.
 
+    Window switches are pushed by the extension's ActiveWindowChanged signal
+    (or the X11 helper without it), idle transitions by IdleMonitor watches:
+    the idle watch fires each time idle time reaches the threshold, the
+    one-shot user-active watch on the next input.
+    """
 
-class Watcher:
-    """Polls the GNOME Shell extension for active window info and records events."""
+    name = "gnome"
+    realtime = True
 
-    def __init__(self, poll_interval=None, idle_threshold=None):
-        self._running = False
+    def __init__(self):
         self._bus: MessageBus | None = None
-        self._current_wm_class = ""
-        self._current_title = ""
-        self._current_pid = 0
-        self._current_start: datetime | None = None
-        self._last_poll_time: datetime | None = None
-        self._is_idle = False
-        self._missing_window_since: datetime | None = None
-        self._filter_rules = []
-        self._stop_event = asyncio.Event()
-
-        # Configuration
-        self._poll_interval = poll_interval or DEFAULT_POLL_INTERVAL
-        self._idle_threshold = idle_threshold or DEFAULT_IDLE_THRESHOLD
-        self._last_settings_refresh = 0
-        self._manual_poll = poll_interval is not None
-        self._manual_idle = idle_threshold is not None
+        self._proxies: DBusProxyCache | None = None
+        self._changes: asyncio.Queue[Change] = asyncio.Queue()
+        # Failed subscriptions are retried at the safety-poll cadence
+        self._retry_interval = config.safety_poll_interval
 
-    async def start(self):
-        """Start the watcher loop."""
-        logger.info("Initializing database...")
-        await db.init_db()
+        self._signal_iface = None
+        self._signals_active = False
+        self._last_subscribe_attempt: float | None = None
 
-        logger.info("Connecting to session D-Bus...")
-        self._bus = await MessageBus(bus_type=BusType.SESSION).connect()
+        self._idle_iface = None
+        self._idle_watch_id: int | None = None
+        self._idle_watch_threshold = 0
+        self._active_watch_id: int | None = None
+        self._last_idle_watch_attempt: float | None = None
 
-        self._running = True
-        now = datetime.now()
-        self._current_start = now
-        self._last_poll_time = now
-
-        # Set up signal handlers for graceful shutdown
-        loop = asyncio.get_event_loop()
-        for sig in (signal.SIGINT, signal.SIGTERM):
-            loop.add_signal_handler(sig, lambda: asyncio.create_task(self.stop()))
-
-        logger.info(
-            "Watcher started — polling every %ds, idle threshold %ds",
-            self._poll_interval,
-            self._idle_threshold // 1000,
-        )
-
-        while self._running:
-            # Periodically refresh settings from DB
-            await self._refresh_settings()
-
-            # Check for time jumps (suspend/resume)
-            now = datetime.now()
-            if self._last_poll_time:
-                delta = (now - self._last_poll_time).total_seconds()
-                if delta > (self._poll_interval * 4):  # e.g. >20s gap
-                    logger.warning(
-                        "Time jump detected (%.1fs). Ending previous event at %s.",
-                        delta,
-                        self._last_poll_time,
-                    )
-                    await self._flush_current_event(end_time=self._last_poll_time)
-                    self._current_start = now
-
-            try:
-                await self._poll()
-                self._last_poll_time = datetime.now()
-            except Exception as e:
-                logger.exception("Poll error (will retry)")
-
-            try:
-                await asyncio.wait_for(
-                    self._stop_event.wait(), timeout=self._poll_interval
-                )
-            except asyncio.TimeoutError:
-                pass
+        # X11 fallback when the extension is unavailable
+        self._x11: X11ActiveWindow | None = None
+        self._last_x11_attempt: float | None = None
 
-    async def _refresh_settings(self):
-        """Refresh poll_interval and idle_threshold from database every 60s."""
-        now = datetime.now().timestamp()
-        if now - self._last_settings_refresh < 60:
-            return
+    @property
+    def pushes_windows(self) -> bool:
+        return self._signals_active or (self._x11 is not None and self._x11.running)
 
-        try:
-            settings = await db.get_settings()
-            if not self._manual_poll and "poll_interval" in settings:
-                new_interval = int(settings["poll_interval"])
-                if new_interval != self._poll_interval:
-                    logger.info(
-                        "Settings updated from DB: poll_interval = %ds", new_interval
-                    )
-                    self._poll_interval = new_interval
-            if not self._manual_idle and "idle_threshold" in settings:
-                # Dashboard saves idle_threshold in seconds
-                new_threshold = int(settings["idle_threshold"]) * 1000
-                if new_threshold != self._idle_threshold:
-                    logger.info(
-                        "Settings updated from DB: idle_threshold = %ds",
-                        new_threshold // 1000,
-                    )
-                    self._idle_threshold = new_threshold
-
-            # Refresh filter rules
-            self._filter_rules = await db.get_filter_rules()
-        except Exception as e:
-            logger.error("Failed to refresh settings: %s", e)
-        finally:
-            self._last_settings_refresh = now
+    @property
+    def pushes_idle(self) -> bool:
+        return self._idle_watch_id is not None
+
+    @property
+    def pushes_return(self) -> bool:
+        return self._active_watch_id is not None
+
+    async def start(self):
+        logger.info("Connecting to session D-Bus...")
+        self._bus = await MessageBus(bus_type=BusType.SESSION).connect()
+        self._proxies = DBusProxyCache(self._bus)
+        await self._proxies.watch(TRACKER_BUS_NAME, self._on_tracker_owner_changed)
+        await self._proxies.watch(IDLE_MONITOR_BUS_NAME, self._on_idle_monitor_owner_changed)
 
     async def stop(self):
-        """Stop the watcher and flush the current event."""
-        logger.info("Stopping watcher...")
-        self._running = False
-        self._stop_event.set()
-        await self._flush_current_event()
+        if self._x11 is not None:
+            await self._x11.stop()
         if self._bus:
             self._bus.disconnect()
-        logger.info("Watcher stopped.")
-
-    async def _poll(self):
-        """Poll active window and idle state."""
-        # Check if paused
-        if db.get_paused():
-            # If we were tracking something, flush it
-            if self._current_wm_class != "__paused__":
-                await self._flush_current_event()
-                self._current_wm_class = "__paused__"
-                self._current_title = "Paused"
-                self._current_start = datetime.now()
-                db.set_current_state(
-                    {
-                        "wm_class": "__paused__",
-                        "title": "Paused",
-                        "duration_secs": 0,
-                        "is_idle": False,
-                    }
-                )
-                broadcast_event({"type": "pause_state", "is_paused": True})
-            return
 
-        # Check idle state via org.gnome.Mutter.IdleMonitor
-        idle_ms = await self._get_idle_time()
-        was_idle = self._is_idle
-        self._is_idle = idle_ms > self._idle_threshold
-
-        if self._is_idle and not was_idle:
-            # Just became idle — flush active event, start idle event
-            await self._flush_current_event()
-            self._current_wm_class = "__idle__"
-            self._current_title = "Idle"
-            self._current_pid = 0
-            self._current_start = datetime.now()
-            db.set_current_state(
-                {
-                    "wm_class": "__idle__",
-                    "title": "Idle",
-                    "timestamp": self._current_start.isoformat(),
-                    "duration_secs": 0,
-                    "is_idle": True,
-                }
-            )
-            broadcast_event({"type": "idle"})
-            logger.debug("User went idle")
-            return
+    async def events(self) -> AsyncIterator[Change]:
+        while True:
+            yield await self._changes.get()
+
+    async def maintain(self, idle_threshold: int, is_idle: bool):
+        await self._subscribe_window_signal()
+        await self._setup_idle_watches(idle_threshold)
+        if is_idle and self._idle_watch_id is not None:
+            await self._add_active_watch(idle_threshold)
+
+    def _retry_due(self, last_attempt: float | None) -> bool:
+        now = asyncio.get_running_loop().time()
+        return last_attempt is None or now - last_attempt >= self._retry_interval
 
-        if was_idle and not self._is_idle:
-            # Came back from idle — flush idle event
-            await self._flush_current_event()
-            broadcast_event({"type": "resume"})
-            logger.debug("User returned from idle")
-
-        if self._is_idle:
-            return  # Still idle, nothing to do
-
-        # Get active window
-        win_info = await self._get_active_window()
-        if win_info is None:
-            if self._missing_window_since is None:
-                self._missing_window_since = datetime.now()
-            else:
-                missing_secs = (
-                    datetime.now() - self._missing_window_since
-                ).total_seconds()
-                if missing_secs >= MAX_MISSING_WINDOW_SECS:
-                    # Avoid extremely long events if window info disappears.
-                    await self._flush_current_event()
-                    self._current_wm_class = ""
-                    self._current_title = ""
-                    self._current_pid = 0
-                    self._current_start = datetime.now()
-                    db.set_current_state(None)
+    async def _subscribe_window_signal(self):
+        """Subscribe to the extension's ActiveWindowChanged signal, if it is running."""
+        if self._signals_active or not self._retry_due(self._last_subscribe_attempt):
             return
+        self._last_subscribe_attempt = asyncio.get_running_loop().time()
+        try:
+            iface = await self._proxies.interface(
+                TRACKER_BUS_NAME, TRACKER_PATH, TRACKER_BUS_NAME
+            )
+            if self._signal_iface is not None:
+                self._signal_iface.off_active_window_changed(self._on_active_window_changed)
+            iface.on_active_window_changed(self._on_active_window_changed)
+            self._signal_iface = iface
+            self._signals_active = True
+            logger.info("Following ActiveWindowChanged signals from the extension")
+            if self._x11 is not None:
+                await self._x11.stop()
+                self._x11 = None
+        except Exception as e:
+            logger.debug("Window-change signals unavailable, polling instead: %s", e)
+
+    def _on_tracker_owner_changed(self, new_owner: str):
+        """The extension was (re)loaded or went away: re-subscribe or fall back to polling."""
+        self._signals_active = False
+        self._last_subscribe_attempt = None
+        self._changes.put_nowait(Change(datetime.now(), "state"))
+        if new_owner:
+            logger.info("Window tracker extension (re)started, re-subscribing")
+            asyncio.ensure_future(self._subscribe_window_signal())
         else:
-            self._missing_window_since = None
-
-        wm_class = win_info.get("wm_class", "")
-        title = win_info.get("title", "")
-        pid = win_info.get("pid", 0)
-
-        # Window changed?
-        if wm_class != self._current_wm_class or title != self._current_title:
-            await self._flush_current_event()
-            self._current_wm_class = wm_class
-            self._current_title = title
-            self._current_pid = pid
-            self._current_start = datetime.now()
-            db.set_current_state(
-                {
-                    "wm_class": wm_class,
-                    "title": title,
-                    "timestamp": self._current_start.isoformat(),
-                    "duration_secs": 0,
-                    "is_idle": False,
-                }
+            logger.info("Window tracker extension went away, falling back to polling")
+
+    def _on_active_window_changed(self, window_json: str):
+        """D-Bus signal handler: timestamp the switch now, handle it in the loop."""
+        received_at = datetime.now()
+        try:
+            info = json.loads(window_json)
+        except ValueError:
+            logger.debug("Ignoring malformed ActiveWindowChanged payload")
+            return
+        self._changes.put_nowait(Change(received_at, "window", info))
+
+    async def _setup_idle_watches(self, idle_threshold: int):
+        """Register an IdleMonitor idle watch for the current threshold."""
+        if self._idle_watch_id is not None:
+            if self._idle_watch_threshold == idle_threshold:
+                return
+        elif not self._retry_due(self._last_idle_watch_attempt):
+            return
+        self._last_idle_watch_attempt = asyncio.get_running_loop().time()
+        try:
+            iface = await self._proxies.interface(
+                IDLE_MONITOR_BUS_NAME, IDLE_MONITOR_PATH, IDLE_MONITOR_BUS_NAME
             )
-            broadcast_event({"type": "activity", "wm_class": wm_class, "title": title})
-            logger.debug("Window changed: %s — %s", wm_class, title)
+            if iface is not self._idle_iface:
+                if self._idle_iface is not None:
+                    self._idle_iface.off_watch_fired(self._on_watch_fired)
+                iface.on_watch_fired(self._on_watch_fired)
+                self._idle_iface = iface
+            if self._idle_watch_id is not None:
+                old_id, self._idle_watch_id = self._idle_watch_id, None
+                await iface.call_remove_watch(old_id)
+            self._idle_watch_id = await iface.call_add_idle_watch(idle_threshold)
+            self._idle_watch_threshold = idle_threshold
+            logger.debug("Idle watch registered at %ds", idle_threshold // 1000)
+
+            # Already past the threshold: the watch only fires on the next crossing
+            idle_ms = await iface.call_get_idletime()
+            if idle_ms >= idle_threshold:
+                crossed = datetime.now() - timedelta(milliseconds=idle_ms - idle_threshold)
+                self._changes.put_nowait(Change(crossed, "idle"))
+        except Exception as e:
+            self._idle_watch_id = None
+            logger.debug("Idle watches unavailable, polling idle time instead: %s", e)
 
-    async def _get_active_window(self) -> dict | None:
+    async def _add_active_watch(self, idle_threshold: int):
+        """Register the one-shot watch that fires on the user's next input."""
+        if self._active_watch_id is not None or self._idle_iface is None:
+            return
+        try:
+            self._active_watch_id = await self._idle_iface.call_add_user_active_watch()
+            # Input between the idle watch firing and now wouldn't fire it
+            idle_ms = await self._idle_iface.call_get_idletime()
+            if idle_ms < idle_threshold:
+                watch_id, self._active_watch_id = self._active_watch_id, None
+                await self._idle_iface.call_remove_watch(watch_id)
+                returned = datetime.now() - timedelta(milliseconds=idle_ms)
+                self._changes.put_nowait(Change(returned, "active"))
+        except Exception as e:
+            logger.debug("Could not add user-active watch: %s", e)
+            self._active_watch_id = None
+
+    def _on_watch_fired(self, watch_id: int):
+        """D-Bus signal handler for IdleMonitor watches."""
+        fired_at = datetime.now()
+        if watch_id == self._idle_watch_id:
+            self._changes.put_nowait(Change(fired_at, "idle"))
+        elif watch_id == self._active_watch_id:
+            self._active_watch_id = None  # user-active watches fire once
+            self._changes.put_nowait(Change(fired_at, "active"))
+
+    def _on_idle_monitor_owner_changed(self, new_owner: str):
+        """Mutter restarted: its watches are gone, register them again on the next poll."""
+        self._idle_iface = None
+        self._idle_watch_id = None
+        self._active_watch_id = None
+        self._last_idle_watch_attempt = None
+        self._changes.put_nowait(Change(datetime.now(), "state"))
+
+    async def get_active_window(self) -> dict | None:
         """Call the GNOME extension's DBus method."""
         try:
-            introspection = await self._bus.introspect(
-                "org.atracker.WindowTracker",
-                "/org/atracker/WindowTracker",
+            iface = await self._proxies.interface(
+                TRACKER_BUS_NAME, TRACKER_PATH, TRACKER_BUS_NAME
             )
-            proxy = self._bus.get_proxy_object(
-                "org.atracker.WindowTracker",
-                "/org/atracker/WindowTracker",
-                introspection,
-            )
-            iface = proxy.get_interface("org.atracker.WindowTracker")
             result = await iface.call_get_active_window()
             return json.loads(result)
         except Exception as e:
             logger.debug("Could not get active window from extension: %s", e)
+            self._proxies.invalidate(TRACKER_BUS_NAME)
+            if self._signals_active:
+                logger.info("Extension unreachable, falling back to polling")
+                self._signals_active = False
             return await self._get_active_window_fallback()
 
     async def _get_active_window_fallback(self) -> dict | None:
-        """Fallback: try xdotool (works for XWayland windows)."""
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                "xdotool",
-                "getactivewindow",
-                "getwindowname",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, _ = await proc.communicate()
-            if proc.returncode == 0:
-                title = stdout.decode().strip()
-                # Try to get WM_CLASS via xprop
-                proc2 = await asyncio.create_subprocess_exec(
-                    "xdotool",
-                    "getactivewindow",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout2, _ = await proc2.communicate()
-                wid = stdout2.decode().strip()
-
-                proc3 = await asyncio.create_subprocess_exec(
-                    "xprop",
-                    "-id",
-                    wid,
-                    "WM_CLASS",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout3, _ = await proc3.communicate()
-                wm_class = ""
-                if proc3.returncode == 0:
-                    line = stdout3.decode().strip()
-                    # WM_CLASS(STRING) = "instance", "class"
-                    if '"' in line:
-                        parts = line.split('"')
-                        wm_class = parts[3] if len(parts) > 3 else parts[1]
-
-                return {"wm_class": wm_class, "title": title, "pid": 0}
-        except FileNotFoundError:
-            pass
-        return None
-
-    async def _get_idle_time(self) -> int:
+        """Fallback: the X11 active window (works for XWayland windows)."""
+        if self._x11 is None or not self._x11.running:
+            if not self._retry_due(self._last_x11_attempt):
+                return None
+            self._last_x11_attempt = asyncio.get_running_loop().time()
+            x11 = X11ActiveWindow(on_change=self._on_x11_window_changed)
+            if not await x11.start():
+                return None
+            self._x11 = x11
+        return self._x11.window
+
+    def _on_x11_window_changed(self, window: dict | None):
+        """The X11 helper saw a switch or title change."""
+        if window is not None and not self._signals_active:
+            self._changes.put_nowait(Change(datetime.now(), "window", window))
+
+    async def get_idle_time(self) -> int:
         """Get idle time in milliseconds from org.gnome.Mutter.IdleMonitor."""
         try:
-            introspection = await self._bus.introspect(
-                "org.gnome.Mutter.IdleMonitor",
-                "/org/gnome/Mutter/IdleMonitor/Core",
-            )
-            proxy = self._bus.get_proxy_object(
-                "org.gnome.Mutter.IdleMonitor",
-                "/org/gnome/Mutter/IdleMonitor/Core",
-                introspection,
+            iface = await self._proxies.interface(
+                IDLE_MONITOR_BUS_NAME, IDLE_MONITOR_PATH, IDLE_MONITOR_BUS_NAME
             )
-            iface = proxy.get_interface("org.gnome.Mutter.IdleMonitor")
             idle_time = await iface.call_get_idletime()
             return idle_time
         except Exception:
+            self._proxies.invalidate(IDLE_MONITOR_BUS_NAME)
             return 0
 
-    async def _flush_current_event(self, end_time: datetime | None = None):
-        """Save the current tracked event to the database."""
-        if self._current_start is None or not self._current_wm_class:
-            self._current_start = end_time or datetime.now()
-            return
 
-        now = end_time or datetime.now()
-        duration = (now - self._current_start).total_seconds()
-
-        if duration < 1:
-            return  # Skip sub-second events
-
-        wm_class = self._current_wm_class
-        title = self._current_title
-
-        # Special cases (idle, paused) don't get filtered
-        if wm_class not in ("__idle__", "__paused__"):
-            for rule in self._filter_rules:
-                match_class = True
-                if rule["wm_class_pattern"]:
-                    match_class = bool(
-                        re.search(rule["wm_class_pattern"], wm_class, re.I)
-                    )
-
-                match_title = True
-                if rule["title_pattern"]:
-                    match_title = bool(re.search(rule["title_pattern"], title, re.I))
-
-                if match_class and match_title:
-                    if rule["rule_type"] == "ignore":
-                        logger.debug("Ignoring event (matched rule %s)", rule["id"])
-                        self._current_start = now
-                        return
-                    elif rule["rule_type"] == "redact":
-                        logger.debug("Redacting event (matched rule %s)", rule["id"])
-                        title = "[Redacted]"
-
-        await db.insert_event(
-            timestamp=self._current_start.isoformat(),
-            end_timestamp=now.isoformat(),
-            wm_class=wm_class,
-            title=title,
-            pid=self._current_pid,
-            duration_secs=round(duration, 1),
-            is_idle=wm_class == "__idle__",
-        )
-        logger.debug(
-            "Recorded: %s — %.1fs %s",
-            self._current_wm_class,
-            duration,
-            "(idle)" if self._current_wm_class == "__idle__" else "",
-        )
-        self._current_start = now
+class Watcher(TrackerCore):
+    """Follows the GNOME Shell extension's active window and records events."""
+
+    def __init__(self, poll_interval=None, idle_threshold=None, journal=None):
+        super().__init__(GnomeSource(), poll_interval, idle_threshold, journal)
 
 
 async def run_watcher(poll_interval=None, idle_threshold=None):
@@ -384,7 +337,11 @@ async def run_watcher(poll_interval=None, idle_threshold=None):
         format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
         datefmt="%H:%M:%S",
     )
-    watcher = Watcher(poll_interval=poll_interval, idle_threshold=idle_threshold)
+    watcher = Watcher(
+        poll_interval=poll_interval,
+        idle_threshold=idle_threshold,
+        journal=InflightJournal(),
+    )
     try:
         await watcher.start()
     finally:
@@ -0,0 +1,164 @@
+"""Event-driven X11 active-window source for when the GNOME extension is missing.
+
+Two long-lived ``xprop -spy`` helpers replace forking xdotool/xprop on every
+poll: one follows ``_NET_ACTIVE_WINDOW`` on the root window, the other the
+title, WM_CLASS and pid of the current active window. xprop prints a line on
+each PropertyNotify, so a helper is only restarted when focus moves to another
+window.
+"""
+
+import asyncio
+import logging
+import os
+import re
+
+logger = logging.getLogger("atracker.x11")
+
+WINDOW_PROPERTIES = ("_NET_WM_NAME", "WM_NAME", "WM_CLASS", "_NET_WM_PID")
+
+# _NET_ACTIVE_WINDOW(WINDOW): window id # 0x3a00007
+_ROOT_LINE = re.compile(r"^_NET_ACTIVE_WINDOW\(WINDOW\): window id # (0x[0-9a-fA-F]+)")
+# WM_CLASS(STRING) = "instance", "class"   /   _NET_WM_NAME:  not found.
+_PROPERTY_LINE = re.compile(r"^(\w+)(?:\([^)]*\) = (.*)|:\s+not found\.)$")
+_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+_ESCAPE = re.compile(r"\\(.)")
+
+
+def _strings(value: str) -> list[str]:
+    return [_ESCAPE.sub(r"\1", s) for s in _STRING.findall(value)]
+
+
+class X11ActiveWindow:
+    """Follows the active X11 window; `window` is the latest {wm_class, title, pid}.
+
+    `on_change(window)` is called for every switch or title change once the
+    new window's properties are known.
+    """
+
+    def __init__(self, on_change=None):
+        self.window: dict | None = None
+        self._on_change = on_change
+        self._wid: str | None = None
+        self._props: dict[str, str | int] = {}
+        self._pending: set[str] = set()
+        self._root_proc: asyncio.subprocess.Process | None = None
+        self._window_proc: asyncio.subprocess.Process | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._root_proc is not None and self._root_proc.returncode is None
+
+    async def start(self) -> bool:
+        """Spawn the root-window helper. False if there is no X display or xprop."""
+        if not os.environ.get("DISPLAY"):
+            return False
+        try:
+            self._root_proc = await _spy("-root", "_NET_ACTIVE_WINDOW")
+        except FileNotFoundError:
+            logger.debug("xprop not found, no X11 fallback")
+            return False
+        self._tasks.append(asyncio.create_task(self._follow_root(self._root_proc)))
+        logger.info("Following _NET_ACTIVE_WINDOW through xprop")
+        return True
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for proc in (self._window_proc, self._root_proc):
+            _kill(proc)
+        self._root_proc = self._window_proc = None
+
+    def root_line(self, line: str) -> str | None:
+        """Handle a root-window line; returns the new active window id, if it changed."""
+        m = _ROOT_LINE.match(line)
+        if not m:
+            return None
+        wid = hex(int(m.group(1), 16))
+        if wid == self._wid:
+            return None
+        self._wid = wid
+        self._props = {}
+        self._pending = set(WINDOW_PROPERTIES)
+        if wid == "0x0":
+            self._pending.clear()
+            self._set(None)
+        return wid
+
+    def window_line(self, line: str):
+        """Handle a property line from the active-window helper."""
+        m = _PROPERTY_LINE.match(line)
+        if not m or m.group(1) not in WINDOW_PROPERTIES:
+            return
+        name, value = m.groups()
+        self._pending.discard(name)
+        if value is None:
+            self._props.pop(name, None)
+        elif name == "_NET_WM_PID":
+            self._props[name] = int(value) if value.isdigit() else 0
+        else:
+            strings = _strings(value)
+            if name == "WM_CLASS":
+                # instance, class: report the class like the extension does
+                self._props[name] = strings[-1] if strings else ""
+            else:
+                self._props[name] = strings[0] if strings else ""
+        if not self._pending:
+            self._set({
+                "wm_class": self._props.get("WM_CLASS", ""),
+                "title": self._props.get("_NET_WM_NAME", self._props.get("WM_NAME", "")),
+                "pid": self._props.get("_NET_WM_PID", 0),
+            })
+
+    def _set(self, window: dict | None):
+        if window == self.window:
+            return
+        self.window = window
+        if self._on_change is not None:
+            self._on_change(window)
+
+    async def _follow_root(self, proc: asyncio.subprocess.Process):
+        try:
+            async for raw in proc.stdout:
+                wid = self.root_line(raw.decode(errors="replace").rstrip("\n"))
+                if wid is None:
+                    continue
+                _kill(self._window_proc)
+                self._window_proc = None
+                if wid != "0x0":
+                    self._window_proc = await _spy("-id", wid, *WINDOW_PROPERTIES)
+                    self._tasks.append(
+                        asyncio.create_task(self._follow_window(self._window_proc))
+                    )
+        except Exception as e:
+            logger.debug("X11 root helper failed: %s", e)
+        finally:
+            _kill(proc)
+            logger.debug("X11 root helper exited")
+
+    async def _follow_window(self, proc: asyncio.subprocess.Process):
+        try:
+            async for raw in proc.stdout:
+                if proc is not self._window_proc:
+                    break
+                self.window_line(raw.decode(errors="replace").rstrip("\n"))
+        finally:
+            _kill(proc)
+            self._tasks = [t for t in self._tasks if not t.done()]
+
+
+async def _spy(*args: str) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        "xprop", "-spy", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+
+def _kill(proc: asyncio.subprocess.Process | None):
+    if proc is not None and proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
@@ -2,6 +2,10 @@
 """
 Simple script to merge events from multiple source SQLite databases
 into a master database using an idempotent UPSERT (ON CONFLICT DO UPDATE).
+
+Only the columns both databases have are copied. ts_start/ts_end and
+category_id are recomputed with the master's categories, so older sources
+merge cleanly.
 """
 
 import argparse
@@ -9,8 +13,93 @@ import sqlite3
 import sys
 from pathlib import Path
 
+from atracker import db
+from atracker.classify import Classifier
+from atracker.config import config
+from atracker.lock import acquire_watcher_lock, release_watcher_lock
+
+# Columns the store derives from the others. They are recomputed rather than
+# copied: the source may predate them, and category ids are per database.
+DERIVED_COLUMNS = ("ts_start", "ts_end", "category_id")
+
+
+def _master_classifier(master_conn: sqlite3.Connection) -> Classifier:
+    cursor = master_conn.execute("SELECT * FROM categories ORDER BY name")
+    names = [d[0] for d in cursor.description]
+    return Classifier([dict(zip(names, r)) for r in cursor.fetchall()])
+
+
+def _derive(row: dict, column: str, classifier: Classifier):
+    if column == "ts_start":
+        return db._to_epoch_ms(row.get("timestamp", ""))
+    if column == "ts_end":
+        return db._to_epoch_ms(row.get("end_timestamp", ""))
+    return db._category_id(classifier, row.get("wm_class", ""), row.get("title", ""))
+
+
+def _merge_table(
+    master_conn: sqlite3.Connection,
+    src_conn: sqlite3.Connection,
+    table: str,
+    classifier: Classifier,
+) -> int:
+    """Upsert every row of `table` from source into master; returns the row count."""
+    # Get column info from master to build upsert query dynamically
+    columns_info = master_conn.execute(f"PRAGMA table_info({table})").fetchall()
+    if not columns_info:
+        raise RuntimeError(f"table '{table}' not found in master")
+    source_columns = {col[1] for col in src_conn.execute(f"PRAGMA table_info({table})")}
+
+    # Copy what both schemas have; derive what the master has on top
+    master_columns = [col[1] for col in columns_info]
+    derived = [c for c in master_columns if c in DERIVED_COLUMNS]
+    copied = [c for c in master_columns if c in source_columns and c not in DERIVED_COLUMNS]
+    needed = {"timestamp", "end_timestamp", "wm_class", "title"} & source_columns
+    selected = copied + sorted(needed - set(copied))
+    columns = copied + derived
+
+    # Sort by pk position to ensure composite PK order is correct
+    pk_columns = [
+        col[1] for col in sorted(columns_info, key=lambda c: c[5]) if col[5] > 0
+    ]
+    if not set(pk_columns) <= set(copied):
+        raise RuntimeError(f"source '{table}' lacks primary key columns {pk_columns}")
+
+    col_names = ", ".join(columns)
+    placeholders = ", ".join("?" * len(columns))
+    if pk_columns:
+        pk_names = ", ".join(pk_columns)
+        update_cols = [col for col in columns if col not in pk_columns]
+        if update_cols:
+            set_clause = ", ".join(f"{col} = excluded.{col}" for col in update_cols)
+            query = (
+                f"INSERT INTO {table} ({col_names}) VALUES ({placeholders}) "
+                f"ON CONFLICT({pk_names}) DO UPDATE SET {set_clause}"
+            )
+        else:
+            query = (
+                f"INSERT INTO {table} ({col_names}) VALUES ({placeholders}) "
+                f"ON CONFLICT({pk_names}) DO NOTHING"
+            )
+    else:
+        query = f"INSERT OR IGNORE INTO {table} ({col_names}) VALUES ({placeholders})"
+
+    rows = [
+        dict(r) for r in src_conn.execute(f"SELECT {', '.join(selected)} FROM {table}")
+    ]
+    master_conn.executemany(
+        query,
+        [
+            tuple(r[c] for c in copied) + tuple(_derive(r, c, classifier) for c in derived)
+            for r in rows
+        ],
+    )
+    master_conn.commit()
+    return len(rows)
+
 
-def merge_databases(master_path: str, source_paths: list[str]):
+def merge_databases(master_path: str, source_paths: list[str]) -> bool:
+    """Merge sources into master; returns False if any source failed."""
     master_path = Path(master_path).expanduser().resolve()
     if not master_path.exists():
         print(f"Error: Master database '{master_path}' does not exist.")
@@ -18,7 +107,9 @@ def merge_databases(master_path: str, source_paths: list[str]):
 
     print(f"Master database: {master_path}")
 
+    ok = True
     with sqlite3.connect(master_path) as master_conn:
+        classifier = _master_classifier(master_conn)
         for source_path in source_paths:
             source = Path(source_path).expanduser().resolve()
             if not source.exists():
@@ -34,73 +125,28 @@ def merge_databases(master_path: str, source_paths: list[str]):
                     tables_to_sync = ["events"]
 
                     for table in tables_to_sync:
+                        # Check if table exists in source
+                        cur = src_conn.execute(
+                            "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+                            (table,),
+                        )
+                        if not cur.fetchone():
+                            print(f"  - Table '{table}' not found in source, skipping.")
+                            continue
                         try:
-                            # Check if table exists in source
-                            cur = src_conn.execute(
-                                "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-                                (table,),
-                            )
-                            if not cur.fetchone():
-                                print(
-                                    f"  - Table '{table}' not found in source, skipping."
-                                )
-                                continue
-
-                            # Get column info from master to build upsert query dynamically
-                            cur = master_conn.execute(f"PRAGMA table_info({table})")
-                            columns_info = cur.fetchall()
-                            if not columns_info:
-                                print(f"  - Table '{table}' not found in master.")
-                                continue
-
-                            # Sort by pk position to ensure composite PK order is correct
-                            columns = [col[1] for col in columns_info]
-                            pk_columns = [
-                                col[1]
-                                for col in sorted(columns_info, key=lambda c: c[5])
-                                if col[5] > 0
-                            ]
-
-                            col_names = ", ".join(columns)
-                            placeholders = ", ".join("?" * len(columns))
-
-                            if pk_columns:
-                                pk_names = ", ".join(pk_columns)
-                                update_cols = [
-                                    col for col in columns if col not in pk_columns
-                                ]
-
-                                if update_cols:
-                                    set_clause = ", ".join(
-                                        f"{col} = excluded.{col}" for col in update_cols
-                                    )
-                                    query = (
-                                        f"INSERT INTO {table} ({col_names}) VALUES ({placeholders}) "
-                                        f"ON CONFLICT({pk_names}) DO UPDATE SET {set_clause}"
-                                    )
-                                else:
-                                    query = (
-                                        f"INSERT INTO {table} ({col_names}) VALUES ({placeholders}) "
-                                        f"ON CONFLICT({pk_names}) DO NOTHING"
-                                    )
-                            else:
-                                query = f"INSERT OR IGNORE INTO {table} ({col_names}) VALUES ({placeholders})"
-
-                            # Fetch all rows from source and upsert into master
-                            rows = src_conn.execute(
-                                f"SELECT {col_names} FROM {table}"
-                            ).fetchall()
-                            master_conn.executemany(query, [tuple(row) for row in rows])
-                            master_conn.commit()
-                            print(f"  - {table}: Upserted {len(rows)} row(s)")
-
+                            count = _merge_table(master_conn, src_conn, table, classifier)
+                            print(f"  - {table}: Upserted {count} row(s)")
                         except Exception as e:
+                            master_conn.rollback()
                             print(f"  - Error merging table '{table}': {e}")
+                            ok = False
 
             except Exception as e:
                 print(f"Error reading from database '{source}': {e}")
+                ok = False
 
-    print("\nMerge complete!")
+    print("\nMerge complete!" if ok else "\nMerge failed for some sources (see above).")
+    return ok
 
 
 if __name__ == "__main__":
@@ -119,4 +165,14 @@ if __name__ == "__main__":
     )
 
     args = parser.parse_args()
-    merge_databases(args.master, args.sources)
+    # A running daemon would keep serving cached responses for the old rows
+    locked = Path(args.master).expanduser().resolve() == config.db_path.resolve()
+    if locked and not acquire_watcher_lock():
+        print("Error: stop the running atracker daemon before merging.")
+        sys.exit(1)
+    try:
+        ok = merge_databases(args.master, args.sources)
+    finally:
+        if locked:
+            release_watcher_lock()
+    sys.exit(0 if ok else 1)
@@ -19,12 +19,16 @@ def setup_test_db(tmp_path: Path):
 async def init_database(setup_test_db):
     from atracker import db
 
+    # Point the db module at this test's database file
+    db.DB_PATH = setup_test_db
+    db.DB_DIR = setup_test_db.parent
+
     # Set DEVICE_ID to a fixed test value
     db.DEVICE_ID = "testdevice"
 
     await db.init_db()
     yield
-    # No need to cleanup since we use tmp_path
+    await db.close_db()
 
 
 @pytest.fixture
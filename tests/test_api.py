@@ -11,6 +11,37 @@ async def test_status(async_client: AsyncClient):
     assert "db_path" in data
 
 
+@pytest.mark.asyncio
+async def test_live_snapshot_is_merged_and_skippable(async_client: AsyncClient):
+    from datetime import datetime, timedelta
+
+    from atracker import db
+
+    classifier = await db.get_classifier()
+    category_id = classifier.match("code", "main.py")["id"]
+    snap = db.set_current_state(
+        "code", "main.py", datetime.now() - timedelta(minutes=5),
+        category_id=category_id, category_version=classifier.version,
+    )
+    try:
+        with pytest.raises(AttributeError):
+            snap.title = "other"
+
+        data = (await async_client.get("/api/current")).json()
+        assert data["seq"] == snap.seq and data["current"]["title"] == "main.py"
+        assert data["current"]["duration_secs"] >= 300
+        unchanged = (await async_client.get(f"/api/current?since={snap.seq}")).json()
+        assert unchanged == {"seq": snap.seq, "changed": False}
+
+        live = (await async_client.get("/api/timeline")).json()["timeline"][-1]
+        assert (live["wm_class"], live["category_id"]) == ("code", category_id or "")
+        summary = (await async_client.get("/api/summary")).json()["summary"]
+        assert [r["wm_class"] for r in summary] == ["code"]
+    finally:
+        db.set_current_state()
+    assert (await async_client.get("/api/current")).json()["current"] is None
+
+
 @pytest.mark.asyncio
 async def test_events_empty(async_client: AsyncClient):
     response = await async_client.get("/api/events")
@@ -98,3 +129,354 @@ async def test_prune_events(async_client: AsyncClient, setup_test_db):
         cursor = await conn.execute("SELECT wm_class FROM events")
         row = await cursor.fetchone()
         assert row[0] == "new_app"
+
+
+@pytest.mark.asyncio
+async def test_export_streams_all_formats(async_client: AsyncClient, monkeypatch):
+    from atracker import api, db
+    import datetime
+    import json
+
+    monkeypatch.setattr(api, "EXPORT_PAGE_SIZE", 2)
+    start = datetime.datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    for i in range(5):
+        ts = start + datetime.timedelta(minutes=i)
+        await db.insert_event(
+            ts.isoformat(),
+            (ts + datetime.timedelta(seconds=60)).isoformat(),
+            f"app{i}",
+            "Window",
+            1,
+            60,
+        )
+    day = start.date().isoformat()
+
+    response = await async_client.get(f"/api/export?start={day}&end={day}&format=csv")
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "timestamp,end_timestamp,wm_class,title,duration_secs,is_idle"
+    assert [line.split(",")[2] for line in lines[1:]] == [f"app{i}" for i in range(5)]
+
+    response = await async_client.get(f"/api/export?start={day}&end={day}&format=ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["wm_class"] for r in rows] == [f"app{i}" for i in range(5)]
+
+    response = await async_client.get(f"/api/export?start={day}&end={day}&format=json")
+    data = response.json()
+    assert data["start"] == day
+    assert [r["wm_class"] for r in data["events"]] == [f"app{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_export_parquet_zip(async_client: AsyncClient):
+    pytest.importorskip("pyarrow")
+    from atracker import db
+    import io
+    import zipfile
+
+    await db.insert_event(
+        "2026-02-25T09:00:00", "2026-02-25T09:01:00", "code", "main.py", 1, 60
+    )
+    response = await async_client.get(
+        "/api/export?start=2026-02-01&end=2026-02-28&format=parquet&partition=month"
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    assert names == ["events/month=2026-02/part-0.parquet"]
+
+
+@pytest.mark.asyncio
+async def test_failed_parquet_export_removes_its_files(async_client: AsyncClient, monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    import tempfile
+
+    from atracker import api, db
+
+    await db.insert_event(
+        "2026-02-25T09:00:00", "2026-02-25T09:01:00", "code", "main.py", 1, 60
+    )
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    def disk_full(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(api, "_zip_files", disk_full)
+    with pytest.raises(OSError):
+        await async_client.get("/api/export?start=2026-02-01&end=2026-02-28&format=parquet")
+    assert not list(tmp_path.glob("atracker-export-*"))
+
+
+def _android_event(event_id: str, start: str, end: str) -> dict:
+    return {
+        "id": event_id,
+        "timestamp": start,
+        "end_timestamp": end,
+        "package_name": "com.android.chrome",
+        "app_label": "Chrome",
+        "duration_secs": 60,
+        "source_type": "BROWSER_TAB",
+        "domain": None,
+        "page_title": "Docs",
+    }
+
+
+@pytest.mark.asyncio
+async def test_android_delta_sync(async_client: AsyncClient):
+    import gzip
+    import json
+    from datetime import date
+
+    from atracker import db
+
+    response = await async_client.get("/api/sync/android/state?device_id=phone")
+    assert response.json()["sync_mark"] == 0
+
+    payload = {
+        "device_id": "phone",
+        "device_name": "Pixel",
+        "events": [
+            _android_event("a1", "2026-02-25T10:00:00", "2026-02-25T10:01:00"),
+            _android_event("a2", "2026-02-25T10:01:00", "2026-02-25T10:02:00"),
+        ],
+    }
+    response = await async_client.post(
+        "/api/sync/android/delta",
+        content=gzip.compress(json.dumps(payload).encode()),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["accepted"] == 2 and data["skipped"] == 0
+    mark = data["sync_mark"]
+    assert mark == db._to_epoch_ms("2026-02-25T10:02:00")
+
+    # Resending an overlapping window only stores what is past the mark
+    payload["events"].append(
+        _android_event("a3", "2026-02-25T10:02:00", "2026-02-25T10:03:00")
+    )
+    response = await async_client.post("/api/sync/android/delta", json=payload)
+    data = response.json()
+    assert data["accepted"] == 1 and data["skipped"] == 2
+    assert data["sync_mark"] > mark
+
+    response = await async_client.get("/api/sync/android/state?device_id=phone")
+    assert response.json()["sync_mark"] == data["sync_mark"]
+    events = await db.get_events(date(2026, 2, 25), device_ids=["phone"])
+    assert sorted(e["title"] for e in events) == ["Docs"] * 3
+
+
+@pytest.mark.asyncio
+async def test_full_android_sync_keeps_each_events_device(async_client: AsyncClient):
+    from datetime import date
+
+    from atracker import db
+
+    def event(event_id: str, device_id: str, hour: int) -> dict:
+        return {
+            **_android_event(event_id, f"2026-02-25T{hour}:00:00", f"2026-02-25T{hour}:01:00"),
+            "device_id": device_id,
+            "domain": "",
+        }
+
+    payload = {
+        "device_name": "Pixel",
+        "days": {"2026-02-25": [event("a1", "phone", 10), event("t1", "tablet", 11)]},
+    }
+    response = await async_client.post("/api/sync/android", json=payload)
+    assert response.json()["synced_events"] == 2
+
+    for device, hour in (("phone", "10"), ("tablet", "11")):
+        events = await db.get_events(date(2026, 2, 25), device_ids=[device])
+        assert [e["timestamp"][11:13] for e in events] == [hour]
+    assert await db.get_sync_mark("tablet") == db._to_epoch_ms("2026-02-25T11:01:00")
+
+
+@pytest.mark.asyncio
+async def test_filter_rules_validate_and_apply_to_android_sync(async_client: AsyncClient):
+    from datetime import date
+
+    from atracker import db
+
+    response = await async_client.post(
+        "/api/rules", json={"rule_type": "ignore", "title_pattern": "(unclosed"}
+    )
+    assert response.status_code == 400 and "Invalid pattern" in response.json()["error"]
+    response = await async_client.post("/api/rules", json={"rule_type": "hide", "title_pattern": "x"})
+    assert response.status_code == 400
+
+    await async_client.post("/api/rules", json={"rule_type": "ignore", "title_pattern": "^bank"})
+    await async_client.post("/api/rules", json={"rule_type": "redact", "title_pattern": "secret"})
+
+    events = [
+        _android_event("a1", "2026-02-25T10:00:00", "2026-02-25T10:01:00"),
+        _android_event("a2", "2026-02-25T10:01:00", "2026-02-25T10:02:00"),
+        _android_event("a3", "2026-02-25T10:02:00", "2026-02-25T10:03:00"),
+    ]
+    events[1]["page_title"] = "Bank login"
+    events[2]["page_title"] = "Secret plans"
+    response = await async_client.post(
+        "/api/sync/android/delta", json={"device_id": "phone", "events": events}
+    )
+    data = response.json()
+    assert data["accepted"] == 2 and data["filtered"] == 1
+    # the ignored event still advances the mark
+    assert data["sync_mark"] == db._to_epoch_ms("2026-02-25T10:03:00")
+
+    stored = await db.get_events(date(2026, 2, 25), device_ids=["phone"])
+    assert sorted(e["title"] for e in stored) == ["Docs", "[Redacted]"]
+
+
+@pytest.mark.asyncio
+async def test_android_delta_sync_msgpack(async_client: AsyncClient):
+    msgpack = pytest.importorskip("msgpack")
+
+    payload = {
+        "device_id": "phone",
+        "events": [_android_event("a1", "2026-02-25T10:00:00", "2026-02-25T10:01:00")],
+    }
+    response = await async_client.post(
+        "/api/sync/android/delta",
+        content=msgpack.packb(payload),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 1
+
+    response = await async_client.post(
+        "/api/sync/android/delta",
+        content=b"not gzip",
+        headers={"Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_past_ranges_are_cached_with_etags(async_client: AsyncClient, monkeypatch):
+    from datetime import date, datetime, timedelta
+
+    from atracker import db
+
+    day = date.today() - timedelta(days=3)
+    start = datetime.combine(day, datetime.min.time()).replace(hour=10)
+
+    async def add(hour: int):
+        s = start + timedelta(hours=hour)
+        await db.insert_event(
+            s.isoformat(), (s + timedelta(minutes=10)).isoformat(), "code", "main.py", 0, 600.0
+        )
+
+    await add(0)
+    url = f"/api/range/summary?start={day - timedelta(days=6)}&end={day}"
+    first = await async_client.get(url)
+    etag = first.headers["etag"]
+    assert first.json()["summary"][0]["total_secs"] == 600
+
+    async def no_sql(*args, **kwargs):
+        raise AssertionError("cache hit expected")
+
+    with monkeypatch.context() as m:
+        m.setattr(db, "get_summary_range", no_sql)
+        again = await async_client.get(url)
+        assert again.content == first.content and again.headers["etag"] == etag
+        not_modified = await async_client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+
+    # A write to a day in the range invalidates; other days are untouched
+    other_day = f"/api/range/history?start={day - timedelta(days=20)}&end={day - timedelta(days=10)}"
+    other_etag = (await async_client.get(other_day)).headers["etag"]
+    await add(2)
+    changed = await async_client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["summary"][0]["total_secs"] == 1200
+    assert (await async_client.get(other_day, headers={"If-None-Match": other_etag})).status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_timeline_delta_since_seq(async_client: AsyncClient):
+    from datetime import datetime, timedelta
+
+    from atracker import db
+
+    t0 = datetime.now().replace(hour=0, minute=1, second=0, microsecond=0)
+
+    async def record(minute: int, wm_class: str):
+        s = t0 + timedelta(minutes=minute)
+        await db.queue_event(
+            s.isoformat(), (s + timedelta(minutes=1)).isoformat(), wm_class, "t", 0, 60.0
+        )
+
+    await record(0, "code")
+    full = (await async_client.get("/api/timeline")).json()
+    assert [b["wm_class"] for b in full["timeline"]] == ["code"]
+
+    await record(1, "firefox")
+    await record(2, "kitty")
+    delta = (await async_client.get(f"/api/timeline?since={full['seq']}")).json()
+    assert [b["wm_class"] for b in delta["blocks"]] == ["firefox", "kitty"]
+    assert delta["seq"] == full["seq"] + 2 and delta["since"] == full["seq"]
+    assert delta["blocks"][0]["color"] and delta["device_id"] == full["device_id"]
+
+    # A write the log did not see: the client must reload
+    await db.insert_event(
+        (t0 + timedelta(minutes=5)).isoformat(), (t0 + timedelta(minutes=6)).isoformat(),
+        "manual", "", 0, 60.0,
+    )
+    assert "blocks" not in (await async_client.get(f"/api/timeline?since={delta['seq']}")).json()
+
+
+@pytest.mark.asyncio
+async def test_columnar_shape(async_client: AsyncClient):
+    from datetime import datetime, timedelta
+
+    from atracker import db
+
+    s = datetime.now().replace(hour=0, minute=1, second=0, microsecond=0)
+    await db.insert_event(s.isoformat(), (s + timedelta(minutes=1)).isoformat(), "code", "é", 0, 60.0)
+
+    rows = (await async_client.get("/api/events")).json()
+    cols = (await async_client.get("/api/events?shape=columns")).json()
+    assert [dict(zip(cols["columns"], r)) for r in cols["rows"]] == rows["events"]
+    assert rows["events"][0]["title"] == "é"
+
+    timeline = (await async_client.get("/api/timeline?shape=columns")).json()
+    block = dict(zip(timeline["columns"], timeline["rows"][0]))
+    assert block["wm_class"] == "code" and block["color"]
+    assert "current" in timeline and "seq" in timeline
+
+    response = await async_client.get("/api/events?shape=xml")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_range_timeline_buckets(async_client: AsyncClient):
+    from datetime import date, datetime, timedelta
+
+    from atracker import db
+
+    day = date.today() - timedelta(days=1)
+    nine = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+
+    async def record(start: datetime, minutes: float, wm_class: str, is_idle: bool = False):
+        end = start + timedelta(minutes=minutes)
+        await db.insert_event(start.isoformat(), end.isoformat(), wm_class, "", 0, minutes * 60, is_idle)
+
+    await record(nine + timedelta(minutes=10), 10, "code")  # spans 09:10-09:20
+    await record(nine + timedelta(minutes=20), 2, "firefox")
+    await record(nine + timedelta(minutes=22), 3, "", is_idle=True)
+
+    url = f"/api/range/timeline?start={day}&end={day}&bucket=15m"
+    body = (await async_client.get(url)).json()
+    assert body["bucket_secs"] == 900
+    buckets = body["buckets"]
+    assert [b["start"][11:16] for b in buckets] == ["09:00", "09:15"]
+    assert buckets[0]["active_secs"] == 300 and buckets[0]["app"] == "code"
+    assert buckets[1]["active_secs"] == 420 and buckets[1]["idle_secs"] == 180
+    assert buckets[1]["app"] == "code"  # 5 minutes of code beat 2 of firefox
+    assert sum(buckets[1]["categories"].values()) == 420
+    assert set(buckets[1]["categories"]) <= set(body["categories"])
+
+    cols = (await async_client.get(url + "&shape=columns")).json()
+    assert [dict(zip(cols["columns"], r)) for r in cols["rows"]] == buckets
+
+    assert (await async_client.get(url.replace("15m", "10m"))).status_code == 400
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from atracker.broadcast import Broadcaster
+
+
+class FakeSocket:
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.sent: list[dict] = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stalled:
+            await asyncio.sleep(3600)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+@pytest.fixture
+async def manager():
+    manager = Broadcaster(queue_size=3, send_timeout=0.05)
+    yield manager
+    manager.close()
+
+
+@pytest.mark.asyncio
+async def test_activity_bursts_coalesce_and_stalled_clients_are_evicted(manager):
+    fast, stalled = FakeSocket(), FakeSocket(stalled=True)
+    await manager.connect(fast)
+    await manager.connect(stalled)
+
+    # An alt-tab burst published before any sender task runs
+    for i in range(100):
+        manager.publish({"type": "activity", "n": i})
+    manager.publish({"type": "idle"})
+    await asyncio.sleep(0.2)
+
+    assert fast.sent == [{"type": "activity", "n": 99}, {"type": "idle"}]
+    assert stalled.closed
+    stats = manager.stats()
+    assert stats["clients"] == 1 and stats["evicted"] == 1
+
+    manager.publish({"type": "resume"})
+    await asyncio.sleep(0.05)
+    assert fast.sent[-1] == {"type": "resume"}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest(manager):
+    ws = FakeSocket()
+    await manager.connect(ws)
+    for kind in ("idle", "resume", "idle", "resume"):
+        manager.publish({"type": kind})
+    await asyncio.sleep(0.05)
+    assert [m["type"] for m in ws.sent] == ["resume", "idle", "resume"]
+    assert manager.stats()["dropped"] == 1
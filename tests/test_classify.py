@@ -0,0 +1,117 @@
+import re
+
+import pytest
+
+from atracker.classify import UNCATEGORIZED, Classifier, FilterRules
+
+
+def _cat(name, wm="", title="", cs=False):
+    return {
+        "id": name,
+        "name": name,
+        "color": "#000000",
+        "wm_class_pattern": wm,
+        "title_pattern": title,
+        "is_case_sensitive": int(cs),
+    }
+
+
+def _sequential(categories, wm_class, title):
+    """Reference semantics: try each pattern in order, titles first."""
+    for field, text in (("title_pattern", title), ("wm_class_pattern", wm_class)):
+        for cat in categories:
+            pattern = cat[field]
+            if not pattern:
+                continue
+            flags = 0 if cat["is_case_sensitive"] else re.IGNORECASE
+            try:
+                if re.search(pattern, text, flags):
+                    return cat
+            except re.error:
+                continue
+    return UNCATEGORIZED
+
+
+CATEGORIES = [
+    _cat("Browser", wm="firefox|chrom(e|ium)"),
+    _cat("Docs", title="Firefox Docs", cs=True),
+    _cat("Media", title="youtube|netflix"),
+    _cat("Terminal", wm="^gnome-terminal$|kitty"),
+    _cat("Broken", title="(unclosed"),
+    _cat("Work", title="jira|^\\[PROJ-\\d+\\]"),
+]
+
+SAMPLES = [
+    ("firefox", "YouTube - Mozilla Firefox"),
+    ("firefox", "Firefox Docs - youtube"),
+    ("firefox", "firefox docs"),
+    ("Chromium", "New Tab"),
+    ("gnome-terminal", "vim"),
+    ("gnome-terminal-server", "vim"),
+    ("code", "[PROJ-12] fix bug"),
+    ("code", "see [PROJ-12]"),
+    ("slack", "general\nJIRA"),
+    ("", ""),
+]
+
+
+@pytest.mark.parametrize("wm_class,title", SAMPLES)
+def test_combined_match_keeps_priority(wm_class, title):
+    classifier = Classifier(CATEGORIES)
+    assert classifier._titles.combined is not None
+    assert classifier.match(wm_class, title) is _sequential(CATEGORIES, wm_class, title)
+
+
+def test_first_category_wins_over_earlier_match_position():
+    # "Later" matches at position 0 but "First" has priority
+    cats = [_cat("First", title="tail"), _cat("Later", title="head")]
+    assert Classifier(cats).match("", "head ... tail")["name"] == "First"
+
+
+def test_backreference_falls_back_to_sequential():
+    cats = [_cat("Repeat", title=r"(ab)\1"), _cat("Other", title="x")]
+    classifier = Classifier(cats)
+    assert classifier._titles.combined is None
+    assert classifier.match("", "xabab")["name"] == "Repeat"
+
+
+def test_matches_are_memoized():
+    classifier = Classifier(CATEGORIES)
+    for _ in range(3):
+        classifier.match("firefox", "YouTube")
+    info = classifier.match.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_classifier_follows_category_version(init_database):
+    from atracker import db
+
+    first = await db.get_classifier()
+    assert await db.get_classifier() is first
+    assert first.match("obscure-app", "")["name"] == "Uncategorized"
+
+    await db.add_category(name="Obscure", wm_class_pattern="obscure", color="#ffffff")
+    second = await db.get_classifier()
+    assert second is not first
+    assert second.match("obscure-app", "")["name"] == "Obscure"
+
+
+def _rule(rule_type, wm="", title=""):
+    return {"id": title or wm, "rule_type": rule_type, "wm_class_pattern": wm, "title_pattern": title}
+
+
+def test_filter_rules_single_pass():
+    rules = FilterRules([
+        _rule("redact", title="private|secret"),
+        _rule("ignore", wm="^keepass"),
+        _rule("ignore", wm="firefox", title="bank"),
+        _rule("redact", title="(unclosed"),  # stored before validation: skipped
+        _rule("redact", title=r"(ab)\1"),  # backreference: matched on its own
+    ])
+    assert rules._checks["ignore"][1].combined is not None
+    assert rules.evaluate("KeePassXC", "Vault") == "ignore"
+    assert rules.evaluate("firefox", "Bank - Private") == "ignore"  # ignore beats redact
+    assert rules.evaluate("chromium", "Bank - Private") == "redact"
+    assert rules.evaluate("code", "xabab") == "redact"
+    assert rules.evaluate("code", "main.py") is None
@@ -0,0 +1,71 @@
+import pytest
+from httpx import AsyncClient
+
+from atracker.compression import PayloadMetrics, negotiate
+
+
+def test_negotiate():
+    encodings = ("zstd", "br", "gzip")
+    assert negotiate("gzip, deflate, br", encodings) == "br"
+    assert negotiate("br;q=0, gzip;q=0.5", encodings) == "gzip"
+    assert negotiate("*", ("gzip",)) == "gzip"
+    assert negotiate("identity", encodings) is None
+    assert negotiate(None, encodings) is None
+
+
+def test_payload_budgets():
+    metrics = PayloadMetrics({"/api/events": 100})
+    metrics.record("/api/events", 50, 20)
+    metrics.record("/api/events", 150, 40)
+    stats = metrics.stats()["/api/events"]
+    assert stats == {
+        "responses": 2, "bytes": 200, "sent": 60, "max_bytes": 150, "over_budget": 1, "ratio": 0.3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_api_responses_are_compressed_above_threshold(async_client: AsyncClient):
+    from datetime import datetime, timedelta
+
+    from atracker import db
+
+    s = datetime.now().replace(hour=0, minute=1, second=0, microsecond=0)
+    for i in range(50):
+        t = s + timedelta(minutes=i)
+        await db.insert_event(t.isoformat(), (t + timedelta(minutes=1)).isoformat(), "code", "main.py", 0, 60.0)
+
+    from atracker.api import payloads
+
+    before = payloads.stats().get("/api/events", {"responses": 0, "bytes": 0, "sent": 0})
+    big = await async_client.get("/api/events", headers={"Accept-Encoding": "gzip"})
+    assert big.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in big.headers["vary"]
+    assert len(big.json()["events"]) == 50
+
+    small = await async_client.get("/api/current", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    plain = await async_client.get("/api/events", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    stats = (await async_client.get("/api/status")).json()["payloads"]["/api/events"]
+    assert stats["responses"] - before["responses"] == 2
+    assert stats["sent"] - before["sent"] < stats["bytes"] - before["bytes"]
+
+
+@pytest.mark.asyncio
+async def test_dashboard_assets_are_precompressed(async_client: AsyncClient):
+    from atracker.api import DASHBOARD_DIR
+
+    response = await async_client.get("/app.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert response.content == (DASHBOARD_DIR / "app.js").read_bytes()
+
+    raw = await async_client.get("/app.js", headers={"Accept-Encoding": "identity"})
+    assert raw.headers["etag"] != response.headers["etag"]
+
+    revalidated = await async_client.get(
+        "/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
@@ -0,0 +1,351 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+
+async def _count_events() -> int:
+    from atracker import db
+
+    async with db._aconn() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM events")
+        row = await cursor.fetchone()
+        return row[0]
+
+
+@pytest.mark.asyncio
+async def test_queue_event_batches_until_flush(init_database, monkeypatch):
+    from atracker import db
+
+    queue = db.EventWriteQueue(batch_size=10, flush_interval=60)
+    monkeypatch.setattr(db, "_event_queue", queue)
+
+    start = datetime.now().replace(microsecond=0)
+    for i in range(3):
+        ts = start + timedelta(seconds=i * 10)
+        await db.queue_event(
+            timestamp=ts.isoformat(),
+            end_timestamp=(ts + timedelta(seconds=10)).isoformat(),
+            wm_class=f"app{i}",
+            title="Window",
+            pid=1,
+            duration_secs=10,
+        )
+
+    assert queue.depth == 3
+    assert await _count_events() == 0
+
+    assert await db.flush_events() == 3
+    assert queue.depth == 0
+    assert await _count_events() == 3
+
+    stats = queue.stats()
+    assert stats["flushed"] == 3
+    assert stats["flush_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_event_flushes_at_batch_size(init_database, monkeypatch):
+    from atracker import db
+
+    queue = db.EventWriteQueue(batch_size=2, flush_interval=60)
+    monkeypatch.setattr(db, "_event_queue", queue)
+
+    ts = datetime.now().replace(microsecond=0).isoformat()
+    for _ in range(2):
+        await db.queue_event(ts, ts, "app", "Window", 1, 5)
+
+    assert queue.depth == 0
+    assert await _count_events() == 2
+
+
+@pytest.mark.asyncio
+async def test_reads_see_queued_events(init_database, monkeypatch):
+    from atracker import db
+
+    queue = db.EventWriteQueue(batch_size=100, flush_interval=60)
+    monkeypatch.setattr(db, "_event_queue", queue)
+
+    ts = datetime.now().replace(microsecond=0)
+    await db.queue_event(
+        ts.isoformat(), (ts + timedelta(seconds=30)).isoformat(), "app", "W", 1, 30
+    )
+
+    rows = await db.get_events(date.today())
+    assert [r["wm_class"] for r in rows] == ["app"]
+
+
+@pytest.mark.asyncio
+async def test_connections_use_wal_and_readonly_readers(init_database):
+    import sqlite3
+    from atracker import db
+
+    async with db._aconn() as conn:
+        cursor = await conn.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+
+    async with db._rconn() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            await conn.execute("DELETE FROM events")
+
+
+@pytest.mark.asyncio
+async def test_migration_v4_backfills_epoch_columns(setup_test_db):
+    import sqlite3
+    from atracker import db
+
+    db.DB_PATH = setup_test_db
+    db.DB_DIR = setup_test_db.parent
+    db.DEVICE_ID = "testdevice"
+
+    # A version 3 database: ISO TEXT timestamps only
+    conn = sqlite3.connect(str(setup_test_db))
+    conn.executescript("""
+        CREATE TABLE events (
+            id TEXT NOT NULL, device_id TEXT NOT NULL DEFAULT '',
+            timestamp TEXT NOT NULL DEFAULT '', end_timestamp TEXT NOT NULL DEFAULT '',
+            wm_class TEXT NOT NULL DEFAULT '', title TEXT NOT NULL DEFAULT '',
+            pid INTEGER NOT NULL DEFAULT 0, duration_secs REAL NOT NULL DEFAULT 0,
+            is_idle INTEGER NOT NULL DEFAULT 0, PRIMARY KEY(device_id, id)
+        );
+        CREATE INDEX idx_events_timestamp ON events(timestamp);
+        INSERT INTO events VALUES
+            ('a', 'testdevice', '2026-03-01T09:00:00', '2026-03-01T09:30:00', 'code', 'main.py', 1, 1800, 0);
+        PRAGMA user_version = 3;
+    """)
+    conn.close()
+
+    await db.init_db()
+
+    conn = sqlite3.connect(str(setup_test_db))
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] >= 4
+        ts_start, ts_end = conn.execute(
+            "SELECT ts_start, ts_end FROM events WHERE id = 'a'"
+        ).fetchone()
+        assert ts_start == int(datetime(2026, 3, 1, 9, 0).timestamp() * 1000)
+        assert ts_end - ts_start == 1800 * 1000
+        indexes = {r[1] for r in conn.execute("PRAGMA index_list(events)")}
+        assert "idx_events_device_ts" in indexes
+        assert "idx_events_timestamp" not in indexes
+    finally:
+        conn.close()
+
+    rows = await db.get_timeline_range(date(2026, 3, 1), date(2026, 3, 1))
+    assert [r["title"] for r in rows] == ["main.py"]
+    totals = await db.get_daily_totals_range(date(2026, 2, 28), date(2026, 3, 2))
+    assert totals == [
+        {"day": "2026-03-01", "active_secs": 1800.0, "idle_secs": 0, "event_count": 1}
+    ]
+    await db.close_db()
+
+
+async def _rollups() -> list[tuple]:
+    from atracker import db
+
+    async with db._aconn() as conn:
+        cursor = await conn.execute(
+            """SELECT device_id, day, wm_class, title, is_idle, active_secs, idle_secs, event_count
+               FROM daily_rollups ORDER BY device_id, day, wm_class, title, is_idle"""
+        )
+        return [tuple(r) for r in await cursor.fetchall()]
+
+
+@pytest.mark.asyncio
+async def test_rollups_track_inserts_syncs_and_prunes(init_database):
+    from atracker import db
+
+    today = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    old = today - timedelta(days=100)
+    for ts, wm_class, secs, idle in [
+        (today, "code", 600, False),
+        (today + timedelta(minutes=10), "code", 300, False),
+        (today + timedelta(minutes=15), "__idle__", 120, True),
+        (old, "firefox", 60, False),
+    ]:
+        await db.insert_event(
+            ts.isoformat(),
+            (ts + timedelta(seconds=secs)).isoformat(),
+            wm_class,
+            "Window",
+            1,
+            secs,
+            idle,
+        )
+
+    android = {
+        "id": "a1",
+        "device_id": "android-1",
+        "timestamp": today.isoformat(),
+        "end_timestamp": (today + timedelta(minutes=5)).isoformat(),
+        "package_name": "com.browser",
+        "app_label": "Browser",
+        "duration_secs": 300,
+        "source_type": "BROWSER_TAB",
+        "domain": "example.com",
+    }
+    await db.sync_android_day(today.date().isoformat(), [android])
+    # Re-syncing the same event with a new duration replaces its contribution
+    await db.sync_android_day(
+        today.date().isoformat(), [{**android, "duration_secs": 200}]
+    )
+    await db.prune_events(90)
+
+    incremental = await _rollups()
+    assert await db.rebuild_rollups() == len(incremental)
+    assert await _rollups() == incremental
+
+    totals = await db.get_daily_totals_range(today.date(), today.date())
+    assert totals == [
+        {
+            "day": today.date().isoformat(),
+            "active_secs": 1100.0,
+            "idle_secs": 120.0,
+            "event_count": 4,
+        }
+    ]
+    summary = await db.get_summary(today.date())
+    assert [(r["wm_class"], r["title"], r["total_secs"]) for r in summary] == [
+        ("code", "Window", 900.0),
+        ("com.browser", "example.com", 200.0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_parquet_round_trip(init_database, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from atracker import columnar, db
+
+    day = datetime(2026, 2, 25, 9, 0)
+    for i in range(3):
+        ts = day + timedelta(days=i)
+        await db.insert_event(
+            ts.isoformat(), (ts + timedelta(seconds=30)).isoformat(),
+            "code", f"file{i}.py", 1, 30,
+        )
+    await db.sync_android_day("2026-02-25", [{
+        "id": "a1", "device_id": "phone", "timestamp": "2026-02-25T10:00:00",
+        "end_timestamp": "2026-02-25T10:01:00", "package_name": "com.android.chrome",
+        "app_label": "Chrome", "duration_secs": 60, "source_type": "BROWSER_TAB",
+        "domain": "example.com", "page_title": "Example",
+    }])
+
+    files = await columnar.export_parquet(
+        tmp_path / "out", date(2026, 2, 1), date(2026, 2, 28), partition="day"
+    )
+    names = sorted(f.relative_to(tmp_path / "out").as_posix() for f in files)
+    assert names == [
+        "android_events/day=2026-02-25/part-0.parquet",
+        "events/day=2026-02-25/part-0.parquet",
+        "events/day=2026-02-26/part-0.parquet",
+        "events/day=2026-02-27/part-0.parquet",
+    ]
+    table = pq.read_table(tmp_path / "out" / "events" / "day=2026-02-25" / "part-0.parquet")
+    assert str(table.schema.field("wm_class").type) == "dictionary<values=string, indices=int32, ordered=0>"
+
+    before = await db.get_daily_totals_range(date(2026, 2, 1), date(2026, 2, 28))
+    await db.close_db()
+    db.DB_PATH.unlink()
+    for suffix in ("-wal", "-shm"):
+        db.DB_PATH.with_name(db.DB_PATH.name + suffix).unlink(missing_ok=True)
+    await db.init_db()
+
+    counts = await columnar.import_parquet(tmp_path / "out")
+    assert counts == {"events": 3, "android_events": 1}
+    # Idempotent: importing again upserts the same rows
+    await columnar.import_parquet(tmp_path / "out")
+    assert await db.get_daily_totals_range(date(2026, 2, 1), date(2026, 2, 28)) == before
+    timeline = await db.get_timeline_range(date(2026, 2, 25), date(2026, 2, 25))
+    assert {r["title"] for r in timeline} == {"file0.py", "Example"}
+
+
+async def _category_ids(table: str) -> dict[str, str]:
+    from atracker import db
+
+    async with db._aconn() as conn:
+        cursor = await conn.execute(f"SELECT id, category_id FROM {table}")
+        return {r[0]: r[1] for r in await cursor.fetchall()}
+
+
+@pytest.mark.asyncio
+async def test_category_id_assigned_on_insert(init_database):
+    from atracker import db
+
+    categories = {c["name"]: c["id"] for c in await db.get_categories()}
+    firefox = await db.insert_event(
+        "2026-02-25T09:00:00", "2026-02-25T09:05:00", "firefox", "Mail", 1, 300
+    )
+    other = await db.insert_event(
+        "2026-02-25T09:05:00", "2026-02-25T09:10:00", "obscure-app", "", 1, 300
+    )
+    await db.sync_android_day("2026-02-25", [{
+        "id": "a1", "device_id": "phone", "timestamp": "2026-02-25T10:00:00",
+        "end_timestamp": "2026-02-25T10:01:00", "package_name": "com.slack",
+        "app_label": "Slack", "duration_secs": 60,
+    }])
+
+    ids = await _category_ids("events")
+    assert ids[firefox] == categories["Browser"]
+    assert ids[other] == ""
+    assert (await _category_ids("android_events"))["a1"] == categories["Communication"]
+
+    summary = await db.get_summary(date(2026, 2, 25))
+    by_app = {r["wm_class"]: r for r in summary}
+    assert by_app["firefox"]["category_name"] == "Browser"
+    assert by_app["obscure-app"]["category_name"] == "Uncategorized"
+    assert by_app["obscure-app"]["color"] == "#64748b"
+
+
+@pytest.mark.asyncio
+async def test_category_edit_reclassifies_affected_rows(init_database):
+    from atracker import db
+
+    firefox = await db.insert_event(
+        "2026-02-25T09:00:00", "2026-02-25T09:05:00", "firefox", "Mail", 1, 300
+    )
+    other = await db.insert_event(
+        "2026-02-25T09:05:00", "2026-02-25T09:10:00", "obscure-app", "", 1, 300
+    )
+    before = await _category_ids("events")
+
+    cat_id = await db.add_category(name="Obscure", wm_class_pattern="obscure", color="#123456")
+    await db._reclassify_task
+    after = await _category_ids("events")
+    assert after[other] == cat_id
+    assert after[firefox] == before[firefox]
+
+    summary = {r["wm_class"]: r for r in await db.get_summary(date(2026, 2, 25))}
+    assert summary["obscure-app"]["category_name"] == "Obscure"
+    assert summary["obscure-app"]["color"] == "#123456"
+
+    # Nothing left to move once the pass has run
+    assert await db.reclassify_events() == 0
+
+    await db.delete_category(cat_id)
+    await db._reclassify_task
+    assert (await _category_ids("events"))[other] == ""
+    summary = {r["wm_class"]: r for r in await db.get_summary(date(2026, 2, 25))}
+    assert summary["obscure-app"]["category_name"] == "Uncategorized"
+
+
+@pytest.mark.asyncio
+async def test_reclassify_after_insert_with_new_category(init_database, monkeypatch):
+    from atracker import db
+
+    editor = next(c for c in await db.get_categories() if c["name"] == "Editor")
+    first = await db.insert_event(
+        "2026-02-25T09:00:00", "2026-02-25T09:05:00", "code", "main.py", 1, 300
+    )
+    assert (await _category_ids("events"))[first] == editor["id"]
+
+    # The edit lands, then another event for the same (app, title, day) is
+    # written before the background pass gets to run
+    monkeypatch.setattr(db, "_schedule_reclassify", lambda: None)
+    await db.update_category(
+        editor["id"], editor["name"], "antigravity|DBeaver|jetbrains", editor["color"]
+    )
+    second = await db.insert_event(
+        "2026-02-25T10:00:00", "2026-02-25T10:05:00", "code", "main.py", 1, 300
+    )
+
+    assert await db.reclassify_events() == 1
+    ids = await _category_ids("events")
+    assert ids[first] == ids[second] == ""
@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from atracker import db
+from atracker.journal import SLOT_SIZE, InflightJournal
+from atracker.tracker import Change, ReplaySource, TrackerCore
+
+T0 = datetime(2026, 3, 2, 9, 0, 0)
+
+
+def _at(secs: float) -> datetime:
+    return T0 + timedelta(seconds=secs)
+
+
+def _win(wm_class: str, title: str) -> dict:
+    return {"wm_class": wm_class, "title": title, "pid": 1}
+
+
+async def _replay(changes: list[Change]) -> list[dict]:
+    core = TrackerCore(ReplaySource(changes), poll_interval=5, idle_threshold=60_000)
+    await core.start(handle_signals=False)
+    return await db.get_events(T0.date())
+
+
+@pytest.mark.asyncio
+async def test_replay_records_switches_idle_and_return(init_database):
+    events = await _replay([
+        Change(_at(0), "window", _win("code", "main.py")),
+        Change(_at(30), "window", _win("firefox", "Docs")),
+        Change(_at(30.5), "window", _win("firefox", "Docs - edited")),
+        Change(_at(100), "idle"),
+        Change(_at(110), "window", _win("firefox", "ignored while idle")),
+        Change(_at(400), "active", _win("kitty", "vim")),
+        Change(_at(460), "idle"),
+    ])
+
+    got = [(e["wm_class"], e["title"], e["duration_secs"]) for e in events]
+    assert got == [
+        ("code", "main.py", 30.0),
+        # the 0.5s "Docs" event is below the 1s minimum
+        ("firefox", "Docs - edited", 69.5),
+        ("__idle__", "Idle", 300.0),
+        ("kitty", "vim", 60.0),
+    ]
+    assert events[2]["is_idle"] and events[2]["timestamp"] == _at(100).isoformat()
+
+
+@pytest.mark.asyncio
+async def test_replay_applies_filter_rules(init_database):
+    await db.add_filter_rule(wm_class_pattern="keepass", rule_type="ignore")
+    await db.add_filter_rule(title_pattern="secret", rule_type="redact")
+    events = await _replay([
+        Change(_at(0), "window", _win("keepass", "Vault")),
+        Change(_at(10), "window", _win("code", "secret.txt")),
+        Change(_at(20), "window", _win("code", "main.py")),
+        Change(_at(30), "idle"),
+    ])
+    assert [(e["wm_class"], e["title"]) for e in events] == [
+        ("code", "[Redacted]"),
+        ("code", "main.py"),
+    ]
+
+
+class _RuleAddingReplay(ReplaySource):
+    """Adds an ignore rule while the engine tracks the secret window."""
+
+    core: TrackerCore | None = None
+
+    async def events(self):
+        async for change in super().events():
+            if change.kind == "idle":
+                while self.core._current_title != "secret.txt":
+                    await asyncio.sleep(0)
+                await db.add_filter_rule(rule_type="ignore", title_pattern="secret")
+            yield change
+
+
+@pytest.mark.asyncio
+async def test_rule_added_in_process_applies_before_next_flush(init_database):
+    changes = [
+        Change(_at(0), "window", _win("code", "main.py")),
+        Change(_at(10), "window", _win("code", "secret.txt")),
+        Change(_at(20), "idle"),
+    ]
+    source = _RuleAddingReplay(changes)
+    core = source.core = TrackerCore(source, poll_interval=5, idle_threshold=60_000)
+    await core.start(handle_signals=False)
+    events = await db.get_events(T0.date())
+    assert [e["title"] for e in events] == ["main.py"]
+
+
+def test_journal_survives_a_torn_write(tmp_path):
+    journal = InflightJournal(tmp_path / "j")
+    journal.open()
+    journal.write({"wm_class": "code", "last_seen": "a"})
+    journal.write({"wm_class": "code", "last_seen": "b"})
+    # Tear the newer slot: the previous checkpoint is still there
+    offset = (journal._seq % 2) * SLOT_SIZE
+    journal._mm[offset + 30] ^= 0xFF
+    journal.close()
+
+    reopened = InflightJournal(tmp_path / "j")
+    reopened.open()
+    assert reopened.read() == {"wm_class": "code", "last_seen": "a"}
+    reopened.clear()
+    assert reopened.read() is None
+
+
+@pytest.mark.asyncio
+async def test_inflight_event_is_recovered_once(init_database, tmp_path):
+    record = {
+        "timestamp": _at(0).isoformat(),
+        "last_seen": _at(600).isoformat(),
+        "wm_class": "code",
+        "title": "main.py",
+        "pid": 1,
+    }
+    # Twice: the second time as if the watcher died after flushing the
+    # recovered event but before clearing the journal
+    for _ in range(2):
+        crashed = InflightJournal(tmp_path / "j")
+        crashed.open()
+        crashed.write(record)
+        crashed.close()
+        core = TrackerCore(
+            ReplaySource([]), poll_interval=5, idle_threshold=60_000,
+            journal=InflightJournal(tmp_path / "j"),
+        )
+        await core.start(handle_signals=False)
+
+    events = await db.get_events(T0.date())
+    assert [(e["wm_class"], e["duration_secs"], e["end_timestamp"]) for e in events] == [
+        ("code", 600.0, _at(600).isoformat()),
+    ]
+
+
+class _EndlessSource(ReplaySource):
+    """Pushes two windows, then nothing until stopped; records stop()."""
+
+    def __init__(self):
+        super().__init__([
+            Change(_at(0), "window", _win("code", "main.py")),
+            Change(_at(30), "window", _win("firefox", "Docs")),
+        ])
+        self.stopped = False
+
+    async def events(self):
+        async for change in super().events():
+            yield change
+        await asyncio.Event().wait()
+
+    async def stop(self):
+        await asyncio.sleep(0.01)
+        self.stopped = True
+
+
+@pytest.mark.asyncio
+async def test_sigterm_stops_cleanly_before_start_returns(init_database):
+    import os
+    import signal
+
+    source = _EndlessSource()
+    core = TrackerCore(source, poll_interval=5, idle_threshold=60_000)
+    run = asyncio.create_task(core.start())
+    await asyncio.sleep(0.1)
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(run, 5)
+
+    assert source.stopped
+    assert [e["wm_class"] for e in await db.get_events(T0.date())][:1] == ["code"]
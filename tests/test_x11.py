@@ -0,0 +1,36 @@
+from atracker.x11 import X11ActiveWindow
+
+
+def test_switch_reports_window_once_properties_are_known():
+    seen = []
+    x11 = X11ActiveWindow(on_change=seen.append)
+
+    assert x11.root_line("_NET_ACTIVE_WINDOW(WINDOW): window id # 0x3a00007") == "0x3a00007"
+    assert x11.root_line("_NET_ACTIVE_WINDOW(WINDOW): window id # 0x3a00007") is None
+    x11.window_line('_NET_WM_NAME(UTF8_STRING) = "main.py — \\"code\\""')
+    x11.window_line("WM_NAME:  not found.")
+    x11.window_line('WM_CLASS(STRING) = "code", "Code"')
+    assert seen == []  # still waiting for _NET_WM_PID
+    x11.window_line("_NET_WM_PID(CARDINAL) = 42")
+    assert seen == [{"wm_class": "Code", "title": 'main.py — "code"', "pid": 42}]
+
+    # PropertyNotify on the title
+    x11.window_line('_NET_WM_NAME(UTF8_STRING) = "other.py"')
+    assert seen[-1]["title"] == "other.py"
+
+
+def test_legacy_title_and_no_active_window():
+    seen = []
+    x11 = X11ActiveWindow(on_change=seen.append)
+    x11.root_line("_NET_ACTIVE_WINDOW(WINDOW): window id # 0x4200003")
+    for line in (
+        "_NET_WM_NAME:  not found.",
+        'WM_NAME(STRING) = "xterm"',
+        'WM_CLASS(STRING) = "xterm", "XTerm"',
+        "_NET_WM_PID:  not found.",
+    ):
+        x11.window_line(line)
+    assert x11.window == {"wm_class": "XTerm", "title": "xterm", "pid": 0}
+
+    assert x11.root_line("_NET_ACTIVE_WINDOW(WINDOW): window id # 0x0") == "0x0"
+    assert x11.window is None and seen[-1] is None